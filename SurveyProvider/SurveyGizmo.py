@@ -1,9 +1,8 @@
-import requests
 from flask import current_app as app
 
 from model.Survey import Survey
 from model.SurveyResult import SurveyResult
-from service import eids_service
+from service import eids_service, http_service
 
 
 class SurveyGizmo:
@@ -30,7 +29,7 @@ class SurveyGizmo:
         survey_data_url = 'https://restapi.surveygizmo.eu/v5/survey/{}/surveyresponse?api_token={}&api_token_secret={}&filter[value][0]=Complete&filter[field][0]=status&filter[operator][0]==&filter[field][1]=is_test_data&filter[field][1]==&filter[field][1]=0'
 
         # retrieve the structure of the survey in order to identify the keys to the individual answer blocks
-        r = requests.get(survey_structure_url.format(survey_id, self._key, self._secret))
+        r = http_service.get(survey_structure_url.format(survey_id, self._key, self._secret))
         judgment_eids = []
         if r.status_code == 200:
             print('collected survey structure')
@@ -81,7 +80,7 @@ class SurveyGizmo:
                             self._add_terminology_to_search_number = question['id']
                 else:
                     continue
-            r = requests.get(survey_data_url.format(survey_id, self._key, self._secret))
+            r = http_service.get(survey_data_url.format(survey_id, self._key, self._secret))
             survey_results = []
             if r.status_code == 200:
                 self._survey_data = r.json()
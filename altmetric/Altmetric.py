@@ -1,535 +1,105 @@
-import requests
-
 from flask import current_app as app
 
+from service import http_service
 
-class Altmetric:
-    """A class representing the results when querying the altmetric API.
-    Currently only the free API is supported but further support will be implemented. """
-
-    def __init__(self, doi):
-        with app.app_context():
-            api_key = app.config.get("ALTMETRIC_API_KEY")
-            secret = app.config.get("ALTMETRIC_API_SECRET")
-
-        self.altmetric_url = "https://api.altmetric.com/v1"
-        self.api_key = api_key
-        url = self.altmetric_url + '/doi/' + doi # + '?key=' + self.api_key
-        r = requests.get(url)
-        # print("queryied URL: " + url + " with status code " + str(r.status_code))
-        if r.status_code == 200:
-            self.json = r.json()
-            try:
-                self._title = self.json['title']
-            except KeyError:
-                self._tile = None
-            try:
-                self._doi = self.json['doi']
-            except KeyError:
-                self._doi = None
-            try:
-                self._pmid = self.json['pmid']
-            except KeyError:
-                self._pmid = None
-            try:
-                self._tq = self.json['tq']
-            except KeyError:
-                self._tq = None
-            try:
-                self._uri = self.json['uri']
-            except KeyError:
-                self._uri = None
-            try:
-                self._altmetric_jid = self.json['altmetric_jid']
-            except KeyError:
-                self._altmetric_jid = None
-            try:
-                self._issns = self.json['issns']
-            except KeyError:
-                self._issns = None
-            try:
-                self._journal = self.json['journal']
-            except KeyError:
-                self._journal = None
-            try:
-                self._cohorts = self.json['cohorts']
-            except KeyError:
-                self._cohorts = None
-            try:
-                self._abstract = self.json['abstract']
-            except KeyError:
-                self._abstract = None
-            try:
-                self._abstract_source = self.json['abstract_source']
-            except KeyError:
-                self._abstract_source = None
-            try:
-                self._context = self.json['context']
-            except KeyError:
-                self._context = None
-            try:
-                self._authors = self.json['authors']
-            except KeyError:
-                self._authors = None
-            try:
-                self._type = self.json['type']
-            except KeyError:
-                self._type = None
-            try:
-                self._altmetric_id = self.json['altmetric_id']
-            except KeyError:
-                self._altmetric_id = None
-            try:
-                self._schema = self.json['schema']
-            except KeyError:
-                self._schema = None
-            try:
-                self._is_oa = self.json['is_oa']
-            except KeyError:
-                self._is_oa = None
-            try:
-                self._publisher_subjects = self.json['publisher_subjects']
-            except KeyError:
-                self._publisher_subjects = None
-            try:
-                self._cited_by_fbwalls_count = self.json['cited_by_fbwalls_count']
-            except KeyError:
-                self._cited_by_fbwalls_count = None
-            try:
-                self._cited_by_feeds_count = self.json['cited_by_feeds_count']
-            except KeyError:
-                self._cited_by_feeds_count = None
-            try:
-                self._cited_by_gplus_count = self.json['cited_by_gplus_count']
-            except KeyError:
-                self._cited_by_gplus_count = None
-            try:
-                self._cited_by_msm_count = self.json['cited_by_msm_count']
-            except KeyError:
-                self._cited_by_msm_count = None
-            try:
-                self._cited_by_policies_count = self.json['cited_by_policies_count']
-            except KeyError:
-                self._cited_by_policies_count = None
-            try:
-                self._cited_by_posts_count = self.json['cited_by_posts_count']
-            except KeyError:
-                self._cited_by_posts_count = None
-            try:
-                self._cited_by_rdts_count = self.json['cited_by_rdts_count']
-            except KeyError:
-                self._cited_by_rdts_count = None
-            try:
-                self._cited_by_tweeters_count = self.json['cited_by_tweeters_count']
-            except KeyError:
-                self._cited_by_tweeters_count = None
-            try:
-                self._cited_by_videos_count = self.json['cited_by_videos_count']
-            except KeyError:
-                self._cited_by_videos_count = None
-            try:
-                self._cited_by_wikipedia_count = self.json['cited_by_wikipedia_count']
-            except KeyError:
-                self._cited_by_wikipedia_count = None
-            try:
-                self._cited_by_patents_count = self.json['cited_by_patents_count']
-            except KeyError:
-                self._cited_by_patents_count = None
-            try:
-                self._cited_by_accounts_count = self.json['cited_by_accounts_count']
-            except KeyError:
-                self._cited_by_accounts_count = None
-            try:
-                self._last_updated = self.json['last_updated']
-            except KeyError:
-                self._last_updated = None
-            try:
-                self._score = self.json['score']
-            except KeyError:
-                self._score = None
-            try:
-                self._history = self.json['history']
-            except KeyError:
-                self._history = None
-            try:
-                self._url = self.json['url']
-            except KeyError:
-                self._url = None
-            try:
-                self._added_on = self.json['added_on']
-            except KeyError:
-                self._added_on = None
-            try:
-                self._published_on = self.json['published_on']
-            except KeyError:
-                self._published_on = None
-            try:
-                self._subjects = self.json['subjects']
-            except KeyError:
-                self._subjects = None
-            try:
-                self._scopus_subjects = self.json['scopus_subjects']
-            except KeyError:
-                self._scopus_subjects = None
-            try:
-                self._readers = self.json['readers']
-            except KeyError:
-                self._readers = None
-            try:
-                self._readers_count = self.json['readers_count']
-            except KeyError:
-                self._readers_count = None
-            try:
-                self._images = self.json['images']
-            except KeyError:
-                self._images = None
-            try:
-                self._details_url = self.json['details_url']
-            except KeyError:
-                self._details_url = None
-        else:
-            self._tile = None
-            self._doi = None
-            self._pmid = None
-            self._tq = None
-            self._uri = None
-            self._altmetric_jid = None
-            self._issns = None
-            self._journal = None
-            self._cohorts = None
-            self._abstract = None
-            self._abstract_source = None
-            self._context = None
-            self._authors = None
-            self._type = None
-            self._altmetric_id = None
-            self._schema = None
-            self._is_oa = None
-            self._publisher_subjects = None
-            self._cited_by_fbwalls_count = None
-            self._cited_by_feeds_count = None
-            self._cited_by_gplus_count = None
-            self._cited_by_msm_count = None
-            self._cited_by_policies_count = None
-            self._cited_by_posts_count = None
-            self._cited_by_rdts_count = None
-            self._cited_by_tweeters_count = None
-            self._cited_by_videos_count = None
-            self._cited_by_wikipedia_count = None
-            self._cited_by_patents_count = None
-            self._cited_by_accounts_count = None
-            self._last_updated = None
-            self._score = None
-            self._history = None
-            self._url = None
-            self._added_on = None
-            self._published_on = None
-            self._subjects = None
-            self._scopus_subjects = None
-            self._readers = None
-            self._readers_count = None
-            self._images = None
-            self._details_url = None
-    @property
-    def title(self):
-        try:
-            return self._title
-        except AttributeError:
-            return None
-
-    @property
-    def doi(self):
-        try:
-            return self._doi
-        except AttributeError:
-            return None
-
-    @property
-    def pmid(self):
-        try:
-            return self._pmid
-        except AttributeError:
-            return None
-
-    @property
-    def tq(self):
-        try:
-            return self._tq
-        except AttributeError:
-            return None
-
-    @property
-    def uri(self):
-        try:
-            return self._uri
-        except AttributeError:
-            return None
-
-    @property
-    def altmetric_jid(self):
-        try:
-            return self._altmetric_jid
-        except AttributeError:
-            return None
-
-    @property
-    def issns(self):
-        try:
-            return self._issns
-        except AttributeError:
-            return None
-
-    @property
-    def journal(self):
-        try:
-            return self._journal
-        except AttributeError:
-            return None
-
-    @property
-    def cohorts(self):
-        try:
-            return self._cohorts
-        except AttributeError:
-            return None
-
-    @property
-    def abstract(self):
-        try:
-            return self._abstract
-        except AttributeError:
-            return None
-
-    @property
-    def abstract_source(self):
-        try:
-            return self._abstract_source
-        except AttributeError:
-            return None
-
-    @property
-    def context(self):
-        try:
-            return self._context
-        except AttributeError:
-            return None
-
-    @property
-    def authors(self):
-        try:
-            return self._authors
-        except AttributeError:
-            return None
-
-    @property
-    def type(self):
-        try:
-            return self._type
-        except AttributeError:
-            return None
-
-    @property
-    def altmetric_id(self):
-        try:
-            return self._altmetric_id
-        except AttributeError:
-            return None
-
-    @property
-    def schema(self):
-        try:
-            return self._schema
-        except AttributeError:
-            return None
-
-    @property
-    def is_oa(self):
-        try:
-            return self._is_oa
-        except AttributeError:
-            return None
-
-    @property
-    def publisher_subjects(self):
-        try:
-            return self._publisher_subjects
-        except AttributeError:
-            return None
+# the fields of an Altmetric response stored in the index, in the order of the index documents
+FIELDS = ('title', 'doi', 'pmid', 'tq', 'uri', 'altmetric_jid', 'issns', 'journal', 'cohorts', 'abstract',
+          'abstract_source', 'context', 'authors', 'type', 'altmetric_id', 'schema', 'is_oa', 'publisher_subjects',
+          'cited_by_fbwalls_count', 'cited_by_feeds_count', 'cited_by_gplus_count', 'cited_by_msm_count',
+          'cited_by_policies_count', 'cited_by_posts_count', 'cited_by_rdts_count', 'cited_by_tweeters_count',
+          'cited_by_videos_count', 'cited_by_wikipedia_count', 'cited_by_patents_count', 'cited_by_accounts_count',
+          'last_updated', 'score', 'history', 'url', 'added_on', 'published_on', 'subjects', 'scopus_subjects',
+          'readers', 'readers_count', 'images', 'details_url')
 
-    @property
-    def cited_by_fbwalls_count(self):
-        try:
-            return self._cited_by_fbwalls_count
-        except AttributeError:
-            return None
 
-    @property
-    def cited_by_feeds_count(self):
-        try:
-            return self._cited_by_feeds_count
-        except AttributeError:
-            return None
+def _field(name):
+    """creates a property reading a field of the record, None if the response does not hold it"""
+    return property(lambda self: self._fields().get(name), doc='The {} of the Altmetric record.'.format(name))
 
-    @property
-    def cited_by_gplus_count(self):
-        try:
-            return self._cited_by_gplus_count
-        except AttributeError:
-            return None
 
-    @property
-    def cited_by_msm_count(self):
-        try:
-            return self._cited_by_msm_count
-        except AttributeError:
-            return None
-
-    @property
-    def cited_by_policies_count(self):
-        try:
-            return self._cited_by_policies_count
-        except AttributeError:
-            return None
-
-    @property
-    def cited_by_posts_count(self):
-        try:
-            return self._cited_by_posts_count
-        except AttributeError:
-            return None
-
-    @property
-    def cited_by_rdts_count(self):
-        try:
-            return self._cited_by_rdts_count
-        except AttributeError:
-            return None
-
-    @property
-    def cited_by_tweeters_count(self):
-        try:
-            return self._cited_by_tweeters_count
-        except AttributeError:
-            return None
-
-    @property
-    def cited_by_videos_count(self):
-        try:
-            return self._cited_by_videos_count
-        except AttributeError:
-            return None
-
-    @property
-    def cited_by_wikipedia_count(self):
-        try:
-            return self._cited_by_wikipedia_count
-        except AttributeError:
-            return None
-
-    @property
-    def cited_by_patents_count(self):
-        try:
-            return self._cited_by_patents_count
-        except AttributeError:
-            return None
-
-    @property
-    def cited_by_accounts_count(self):
-        try:
-            return self._cited_by_accounts_count
-        except AttributeError:
-            return None
-
-    @property
-    def last_updated(self):
-        try:
-            return self._last_updated
-        except AttributeError:
-            return None
-
-    @property
-    def score(self):
-        try:
-            return self._score
-        except AttributeError:
-            return None
-
-    @property
-    def history(self):
-        try:
-            return self._history
-        except AttributeError:
-            return None
-
-    @property
-    def url(self):
-        try:
-            return self._url
-        except AttributeError:
-            return None
-
-    @property
-    def added_on(self):
-        try:
-            return self._added_on
-        except AttributeError:
-            return None
-
-    @property
-    def published_on(self):
-        try:
-            return self._published_on
-        except AttributeError:
-            return None
-
-    @property
-    def subjects(self):
-        try:
-            return self._subjects
-        except AttributeError:
-            return None
-
-    @property
-    def scopus_subjects(self):
-        try:
-            return self._scopus_subjects
-        except AttributeError:
-            return None
-
-    @property
-    def readers(self):
-        try:
-            return self._readers
-        except AttributeError:
-            return None
-
-    @property
-    def readers_count(self):
-        try:
-            return self._readers_count
-        except AttributeError:
-            return None
-
-    @property
-    def images(self):
-        try:
-            return self._images
-        except AttributeError:
-            return None
-
-    @property
-    def details_url(self):
-        try:
-            return self._details_url
-        except AttributeError:
-            return None
+class Altmetric:
+    """A class representing the results when querying the altmetric API.
+    Currently only the free API is supported but further support will be implemented. The fields stored in the index
+    are read from the response on first access, afterwards only these fields are kept."""
+
+    __slots__ = ('_response', '_values')
+
+    title = _field('title')
+    doi = _field('doi')
+    pmid = _field('pmid')
+    tq = _field('tq')
+    uri = _field('uri')
+    altmetric_jid = _field('altmetric_jid')
+    issns = _field('issns')
+    journal = _field('journal')
+    cohorts = _field('cohorts')
+    abstract = _field('abstract')
+    abstract_source = _field('abstract_source')
+    context = _field('context')
+    authors = _field('authors')
+    type = _field('type')
+    altmetric_id = _field('altmetric_id')
+    schema = _field('schema')
+    is_oa = _field('is_oa')
+    publisher_subjects = _field('publisher_subjects')
+    cited_by_fbwalls_count = _field('cited_by_fbwalls_count')
+    cited_by_feeds_count = _field('cited_by_feeds_count')
+    cited_by_gplus_count = _field('cited_by_gplus_count')
+    cited_by_msm_count = _field('cited_by_msm_count')
+    cited_by_policies_count = _field('cited_by_policies_count')
+    cited_by_posts_count = _field('cited_by_posts_count')
+    cited_by_rdts_count = _field('cited_by_rdts_count')
+    cited_by_tweeters_count = _field('cited_by_tweeters_count')
+    cited_by_videos_count = _field('cited_by_videos_count')
+    cited_by_wikipedia_count = _field('cited_by_wikipedia_count')
+    cited_by_patents_count = _field('cited_by_patents_count')
+    cited_by_accounts_count = _field('cited_by_accounts_count')
+    last_updated = _field('last_updated')
+    score = _field('score')
+    history = _field('history')
+    url = _field('url')
+    added_on = _field('added_on')
+    published_on = _field('published_on')
+    subjects = _field('subjects')
+    scopus_subjects = _field('scopus_subjects')
+    readers = _field('readers')
+    readers_count = _field('readers_count')
+    images = _field('images')
+    details_url = _field('details_url')
+
+    def __init__(self, doi, response_json=None):
+        """queries the Altmetric API for the given DOI. If the response has already been retrieved (e.g. by the
+        enrichment service), it can be provided as response_json and no request is sent. An empty dict marks a DOI
+        unknown to Altmetric."""
+        if response_json is None:
+            with app.app_context():
+                altmetric_url = app.config.get("ALTMETRIC_URL", "https://api.altmetric.com/v1")
+            url = altmetric_url.rstrip('/') + '/doi/' + doi
+            r = http_service.get(url)
+            if r.status_code == 200:
+                response_json = r.json()
+        self._response = response_json or None
+        self._values = None
+
+    def _fields(self):
+        """returns the indexed fields, read from the response and releasing it on the first call"""
+        # the response is read before the fields: once another thread has released it, the fields are set
+        response = self._response
+        values = self._values
+        if values is None:
+            values = {name: response[name] for name in FIELDS if name in response} if response else {}
+            self._values = values
+            self._response = None
+        return values
 
     def __getstate__(self):
-        state = self.__dict__.copy()
-        try:
-            del state['json']
-        except KeyError:
-            print('no Altmetric data found data')
-        del state['api_key']
-        del state['altmetric_url']
-        return state
+        """returns the document stored in the index, holding all indexed fields. The document of a DOI unknown to
+        Altmetric is empty."""
+        values = self._fields()
+        if not values:
+            return {}
+        return {name: values.get(name) for name in FIELDS}
+
+    def __setstate__(self, state):
+        self._response = None
+        self._values = {name: value for name, value in state.items() if value is not None}
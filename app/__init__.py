@@ -38,9 +38,21 @@ def create_app(config_filename=None):
     base_location = app.config.get("LIBINTEL_DATA_DIR")
     create_folders(base_location)
 
+    # optionally run a worker of the distributed data collection within the application
+    if app.config.get("LIBINTEL_COLLECTION_BACKEND") == 'redis' and app.config.get("LIBINTEL_REDIS_LOCAL_WORKER"):
+        start_local_worker(app)
+
     return app
 
 
+def start_local_worker(app):
+    from threading import Thread
+    from service import distributed_service
+    app.logger.info('starting a worker of the distributed data collection')
+    Thread(target=distributed_service.run_worker, args=(app, app.config.get("LIBINTEL_SCOPUS_KEYS")),
+           daemon=True).start()
+
+
 def create_folders(base_location):
     if not os.path.exists(base_location):
         os.makedirs(base_location)
@@ -68,6 +80,7 @@ def register_blueprints(app):
     from app.query_viewer import query_viewer_blueprint
     from app.main import main_blueprint
     from app.identifiers import identifiers_blueprint
+    from app.jobs import jobs_blueprint
 
     app.register_blueprint(eids_blueprint, url_prefix='/eids')
     app.register_blueprint(identifiers_blueprint, url_prefix='/identifiers')
@@ -85,4 +98,5 @@ def register_blueprints(app):
     app.register_blueprint(crossref_blueprint, url_prefix='/crossref')
     app.register_blueprint(wheel_blueprint, url_prefix='/wheel')
     app.register_blueprint(query_viewer_blueprint, url_prefix='/viewer')
+    app.register_blueprint(jobs_blueprint, url_prefix='/jobs')
 
@@ -2,21 +2,13 @@
 #    imports    #
 #################
 
-from collections import Counter
-import math
 from flask import Response, request, current_app as app, jsonify
-from pybliometrics import scopus
 
-from threading import Thread
-
-from altmetric.Altmetric import Altmetric
-from model.AllResponses import AllResponses
 from model.Status import Status
 from model.UpdateContainer import UpdateContainer
-from scival.Scival import Scival
 from service import project_service, status_service, eids_service, \
-    elasticsearch_service, counter_service, query_service
-from unpaywall.Unpaywall import Unpaywall
+    elasticsearch_service, counter_service, query_service, journal_service, data_collector_service, dead_letter_service, \
+    job_service, distributed_service, scopus_service
 from . import collector_blueprint
 
 
@@ -28,9 +20,10 @@ from . import collector_blueprint
 @collector_blueprint.route('/collect_data/<project_id>', methods=['POST'])
 def data_collection_execution(project_id):
     """
-    run the data collection
+    run the data collection as a job
 
     :parameter project_id the id of the current project
+    :return: the ID of the job with a status of 202, 204 if there is nothing to collect
 
     """
 
@@ -39,14 +32,26 @@ def data_collection_execution(project_id):
     if request.args.get('mode') is not None:
         mode = request.args.get('mode')
 
+    # the maximum age in days of locally cached Scopus records, overrides the configured freshness policy
+    max_age = scopus_service.get_max_age(request.args)
+
     app.logger.info('project {}: collecting data with mode {}'.format(project_id, mode))
 
-    # load project, set status bools, and load and eid list. initialize missed eid list
+    # load project, set status bools, and load and eid list. when resuming, only the EIDs not yet indexed according
+    # to the progress journal are collected. an incremental collection only fetches the EIDs not yet in the index
+    # and removes the documents no longer in the list
     project = project_service.load_project(project_id)
     project.isDataCollecting = True
     project.isDataCollected = False
-    eids = eids_service.load_eid_list(project_id, mode)
-    missed_eids = []
+    if mode == 'resume':
+        eids = journal_service.get_pending_eids(project_id, eids_service.load_eid_list(project_id))
+    elif mode == 'incremental':
+        eids = data_collector_service.prepare_incremental_collection(project_id,
+                                                                     eids_service.load_eid_list(project_id))
+    elif mode == 'missed':
+        eids = eids_service.load_eid_list(project_id, 'missed_')
+    else:
+        eids = eids_service.load_eid_list(project_id, mode)
 
     with app.app_context():
         keys = app.config.get("LIBINTEL_SCOPUS_KEYS")
@@ -57,153 +62,42 @@ def data_collection_execution(project_id):
     status_service.save_status(project_id, status)
 
     if status.total > 0:
-        if mode != 'missed':
-            elasticsearch_service.delete_index(project.project_id)
+        if mode == 'resume':
+            app.logger.info('project {}: resuming data collection, {} EIDs left'.format(project_id, status.total))
         else:
-            eids_service.deleteMissedEids()
+            dead_letter_service.reset_dead_letters(project.project_id)
+            if mode == 'incremental':
+                app.logger.info('project {}: collecting {} new EIDs'.format(project_id, status.total))
+            elif mode == 'missed':
+                app.logger.info('project {}: collecting {} missed EIDs'.format(project_id, status.total))
+            else:
+                elasticsearch_service.delete_index(project.project_id)
+                journal_service.reset_journal(project.project_id)
+        if app.config.get("LIBINTEL_COLLECTION_BACKEND") == 'redis':
+            # the distributed workers pull the EIDs from a shared queue in Redis, using their own API keys
+            app.logger.info('project {}: collecting data with the distributed workers'.format(project_id))
+            job = job_service.submit(project_id, 'collect_data', distributed_service.collect, eids, project, status,
+                                     app._get_current_object(), mode, max_age)
+            return jsonify({'job_id': job.job_id}), 202
         if type(keys) is tuple:
-
-            # the number of threads is given by the number of available API keys
-            number_of_threads = len(keys)
-            app.logger.info('project {}: collecting data in {} threads'.format(project_id, number_of_threads))
-
-            # gather the individual chunks provided to each process
-            length_of_chunks = math.ceil(status.total / number_of_threads)
-            list_chunks = list(chunks(eids, length_of_chunks))
-            # make asynchronous calls and delegate the individual collection to the individual threads
-            for key_index, key in enumerate(keys):
-                if len(list_chunks) > key_index:
-                    thread = Thread(target=collect_data,
-                                    args=(list_chunks[key_index], project.project_id, project.name, key_index, key,
-                                          app._get_current_object()))
-                    thread.start()
-            return Response('finished', status=204)
-
-        collect_data(eids=eids, project_id=project.project_id, project_name=project.name, i=0, key=keys,
-                     app=app._get_current_object())
-
-        # if only one API-Key is given, collect data sequentially
-        for idx, eid in enumerate(eids):
-
-            # set scopus api-key to the provided key
-            scopus.config['Authentication']['APIKEy'] = keys
-
-            # update the progress status and save the status to disk
-            status.progress = idx + 1
-            status_service.save_status(project_id, status)
-
-            # print progress
-            app.logger.info('project {}: processing entry ' + str(idx) + 'of ' + str(status.total) + ' entries: ' +
-                            str(idx / status.total * 100) + '%')
-
-            # retrieve data from scopus
-            try:
-                scopus_abstract = scopus.AbstractRetrieval(identifier=eid, id_type='eid', view="FULL", refresh=True)
-                app.logger.info('project {}: collected scopus data for EID {}'.format(project_id, eid))
-            except Exception as inst:
-                app.logger.error(
-                    'project {}: could not collect scopus data for EID {}, exception: {}'.format(project_id, eid,
-                                                                                                 type(inst)))
-                missed_eids.append(eid)
-                continue
-
-            # create new AllResponses object to hold the individual information
-            response = AllResponses(eid, project.name, project.project_id)
-
-            # add scopus abstract to AllResponses object
-            response.scopus_abstract_retrieval = scopus_abstract
-
-            # get doi and collect unpaywall data and Altmetric data
-            doi = scopus_abstract.doi
-            if doi is not None:
-                if doi is not "":
-                    response.unpaywall_response = Unpaywall(doi)
-                    response.altmetric_response = Altmetric(doi)
-                    response.scival_data = Scival([])
-
-            # send response to elastic search index
-            elasticsearch_service.send_to_index(response, project.project_id)
-            app.logger.info('project {}: saved EID {} to elasticsearch'.format(project_id, eid))
-    eids_service.save_eid_list(project_id=project.project_id, eids=missed_eids, prefix='missed_')
-    app.logger.info('project {}: all EID data collected'.format(project_id))
-    status.status = "DATA_COLLECTED"
-    status_service.save_status(project_id, status)
-    project.isDataCollecting = False
-    project.isDataCollected = True
-    project_service.save_project(project)
+            # the individual API keys work on a shared queue of EIDs
+            app.logger.info('project {}: collecting data with {} API keys'.format(project_id, len(keys)))
+        job = job_service.submit(project_id, 'collect_data', data_collector_service.collect, eids, project, status,
+                                 keys, app._get_current_object(), mode, max_age)
+        return jsonify({'job_id': job.job_id}), 202
+    data_collector_service.finish_data_collection(project, status, [])
     return Response({"status": "FINISHED"}, status=204)
 
 
-# cuts lists into chunks
-# Thanks to Ned Batchelder on Stack overflow (https://stackoverflow.com/questions/312443/how-do-you-split-a-list-into-evenly-sized-chunks)
-def chunks(l, n):
-    """Yield successive n-sized chunks from list l
-    :parameter l inital lists
-    :parameter n number of chunks
-
-    returns an array of arrays
-    """
-    for i in range(0, len(l), n):
-        yield l[i:i + n]
-
-
-def collect_data(eids, project_id, project_name, i, key, app):
-    """collects the data for a provided list of eids and stores them into a elasticsearch
-    function to be called upon parrallization.
-
-    :parameter eids list of EIDs
-    :parameter project_id the ID of the current project
-    :parameter project_name the name of the current project
-    :parameter i the index of the API-key being used
-    :parameter key the API-key value to be used
-    :parameter app the app object to retrieve the context from
-    """
-    with app.app_context():
-        scopus.config['Authentication']['APIKEy'] = key
-        missed_eids = []
-        for idx, eid in enumerate(eids):
-
-            # retrieve data from scopus
-            try:
-                scopus_abstract = scopus.AbstractRetrieval(identifier=eid, id_type='eid', view="FULL", refresh=True)
-                app.logger.info('project {}: collected scopus data for EID {}'.format(project_id, eid))
-            except:
-                app.logger.error('project {}: could not collect scopus data for EID {}'.format(project_id, eid))
-                missed_eids.append(eid)
-                continue
-
-            # create new AllResponses object to hold the individual information
-            response = AllResponses(eid, project_name, project_id=project_id)
-
-            # add scopus abstract to AllResponses object
-            response.scopus_abstract_retrieval = scopus_abstract
-
-            # get doi and collect unpaywall data and Altmetric data
-            doi = scopus_abstract.doi
-            if doi is not None:
-                if doi is not "":
-                    response.unpaywall_response = Unpaywall(doi)
-                    response.altmetric_response = Altmetric(doi)
-                    response.scival_data = Scival([])
-
-            # send response to elastic search index
-            elasticsearch_service.send_to_index(response, project_id)
-            app.logger.info('project {}: saved EID {} to elasticsearch'.format(project_id, eid))
-        eids_service.save_eid_list(project_id=project_id, eids=missed_eids, prefix=(str(i) + '_missed_'))
-        app.logger.info('project {}: saved {} missed EIDs'.format(project_id, len(missed_eids)))
-
-
 @collector_blueprint.route('/collect_references/<project_id>', methods=['POST'])
 def references_collection_execution(project_id):
     """
-    collects the references for a given collection of publications
+    collects the references for a given collection of publications as a job
     :param project_id: the ID of the current project
-    :return: 204 if successful
+    :return: the ID of the job with a status of 202
     """
-    # initialize lists, read sample size from request and load eid list
+    # read sample size from request and load eid list
     sample_size = int(request.args.get('sample_size'))
-    missed_eids = []
-    references_eids = []
     eids = eids_service.load_eid_list(project_id)
 
     # load project and set booleans
@@ -212,77 +106,39 @@ def references_collection_execution(project_id):
     project.isReferencesCollected = False
     project_service.save_project(project)
 
+    with app.app_context():
+        keys = app.config.get("LIBINTEL_SCOPUS_KEYS")
+
     # prepare status
     status = Status("REFERENCES_COLLECTING")
     status.total = eids.__len__()
     status_service.save_status(project_id, status)
 
-    # if eids are given, cycle through all of them
-    if status.total > 0:
-        for idx, eid in enumerate(eids):
-            # update the progress status and save the status to disk
-            status.progress = idx + 1
-            status_service.save_status(project_id, status)
-
-            # print progress
-            app.logger.info('project {}: processing entry ' + str(idx) + 'of ' + str(status.total) + ' entries: ' +
-                            str(idx / status.total * 100) + '%')
-
-            # retrieve refereces from scopus
-            try:
-                scopus_abstract = scopus.AbstractRetrieval(eid, view="FULL")
-                app.logger.info('project {}: collected scopus data for EID {}'.format(project_id, eid))
-                if scopus_abstract.references is not None:
-                    references_eids = references_eids + scopus_abstract.references
-                else:
-                    app.logger.warn(
-                        'project {}: no references given in scopus export for EID {}.'.format(project_id, eid))
-            except IOError:
-                app.logger.error('project {}: could not collect scopus data for EID {}'.format(project_id, eid))
-                missed_eids.append(eid)
-                continue
-    # transform references eids into tuple and calculate the occurences
-    references_eids_tuple = tuple(references_eids)
-    occurences = Counter(references_eids_tuple)
-    most_occurences = occurences.most_common(sample_size)
-
-    # save the counter with the most occurences to disk
-    counter_service.save_counter(project_id, most_occurences, 'references_')
-    eids_service.save_eid_list(project_id, missed_eids, prefix='missed_')
+    # the most frequent references found so far are saved in intervals
+    job = job_service.submit(project_id, 'collect_references', data_collector_service.collect_references, eids,
+                             project, status, keys, app._get_current_object(), sample_size)
+    return jsonify({'job_id': job.job_id}), 202
 
-    # set the status and save it to disk
-    status.status = "DATA_COLLECTED"
-    status_service.save_status(project_id, status)
-
-    # set the project booleans and save it to disk
-    project.isReferencesCollecting = False
-    project.isReferencesCollected = True
-    project_service.save_project(project)
 
-    return Response({"status": "FINISHED"}, status=204)
+@collector_blueprint.route('/references/<project_id>', methods=['GET'])
+def get_references(project_id):
+    """
+    returns the most frequent references, during a running collection those found so far
+    :param project_id: the ID of the current project
+    :return: a JSON list of pairs of reference and number of occurrences
+    """
+    try:
+        return jsonify(counter_service.load_counter(project_id, 'references_'))
+    except FileNotFoundError:
+        return Response('no references collected', status=404)
 
 
 @collector_blueprint.route('/set_query_ids/<project_id>', methods=['Post'])
 def add_query_ids(project_id):
     query_ids = query_service.load_scopus_queries(project_id).search_ids
-    for query_id in query_ids:
-        eids = eids_service.load_eid_list(project_id, prefix=query_id + '_')
-        for eid in eids:
-            try:
-                record = elasticsearch_service.get_record(project_id, eid)
-            except:
-                app.logger.warning('eid not in index: '.format(eid))
-                continue
-            try:
-                if query_id in record['query_id']:
-                    continue
-                if record['query_id'] == '':
-                    record['query_id'] = query_id
-                else:
-                    record['query_id'] = record['query_id'] + '; ' + query_id
-            except KeyError:
-                record['query_id'] = query_id
-
-            elasticsearch_service.append_to_index(record, eid, project_id)
-            app.logger.info('set query id {} to entry {}'.format(query_id, eid))
+    eids_by_query = {query_id: eids_service.load_eid_list(project_id, prefix=query_id + '_') for query_id in query_ids}
+    counts = elasticsearch_service.tag_query_ids(project_id, eids_by_query)
+    app.logger.info('project {}: set the IDs of {} queries, {} documents updated, {} unchanged, {} not in index, {} '
+                    'failed'.format(project_id, len(query_ids), counts['updated'], counts['unchanged'],
+                                    counts['missing'], counts['failed']))
     return Response({"status": "FINISHED"}, status=204)
@@ -2,7 +2,7 @@
 #    imports   #
 ################
 
-from flask import request
+from flask import request, jsonify
 
 from app.crossref import crossref_blueprint
 from flask import current_app as app
@@ -10,6 +10,7 @@ from flask import current_app as app
 from pybliometrics import scopus
 
 from crossref.CrossRefSearch import CrossRefSearch
+from service import scopus_service, job_service
 
 
 ################
@@ -19,15 +20,24 @@ from crossref.CrossRefSearch import CrossRefSearch
 @crossref_blueprint.route('/titles2dois/<project_id>', methods=['POST'])
 def titles_to_dois(project_id):
     """
-    takes lines of citations from a file, and queries the crossref API for a doi.
+    takes lines of citations from a file, and queries the crossref API for a doi as a job.
     :param project_id:
-    :return: 'finished' when all entries have been processed.
+    :return: the ID of the job with a status of 202
     """
+    refresh = scopus_service.get_refresh(scopus_service.CROSSREF, project_id,
+                                         scopus_service.get_max_age(request.args))
+    filename = request.form['filename']
+    job = job_service.submit(project_id, 'titles2dois', _titles_to_dois, project_id, filename, refresh)
+    return jsonify({'job_id': job.job_id}), 202
+
+
+def _titles_to_dois(project_id, filename, refresh):
+    """writes the CrossRef and Scopus data for each citation of the file, returns 'finished' when all entries have
+    been processed"""
     n_crossref = 0
     n_scopus = 0
     delimiter = ";"
 
-    filename = request.form['filename']
     with app.app_context():
         location = app.config.get("LIBINTEL_DATA_DIR")
     file_folder = location + '/out/' + project_id + '/'
@@ -40,11 +50,14 @@ def titles_to_dois(project_id):
     file_data.write("references; CrossRef Response; MyCoRe Response; Scopus Response")
     lines = file.readlines()
     for line in lines:
+        if job_service.is_cancelled():
+            break
         data = CrossRefSearch(line)
         if data is not None:
             n_crossref += 1
             try:
-                scopus_abstract = scopus.AbstractRetrieval(identifier=data.doi, id_type='doi', view="FULL", refresh=True)
+                scopus_abstract = scopus.AbstractRetrieval(identifier=data.doi, id_type='doi', view="FULL",
+                                                           refresh=refresh)
                 n_scopus += 1
                 output_line = data.to_output(delimiter) + delimiter + scopus_abstract.eid
             except:
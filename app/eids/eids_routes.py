@@ -11,7 +11,7 @@ from pybliometrics import scopus
 
 from model.RelevanceMeasures import RelevanceMeasure
 import utilities.utils as utils
-from service import eids_service, project_service, relevance_measure_service
+from service import eids_service, project_service, relevance_measure_service, scopus_service
 from service.elasticsearch_service import PropertyEncoder
 from . import eids_blueprint
 from flask import current_app as app
@@ -122,6 +122,7 @@ def get_date_of_sample_eids(project_id):
 @cross_origin('*')
 @eids_blueprint.route("/<project_id>/<query_id>/publicationSample", methods=['GET'])
 def retrieve_publications_sample(project_id, query_id):
+    refresh = scopus_service.get_refresh(scopus_service.SAMPLE, project_id, scopus_service.get_max_age(request.args))
     session_id = request.args.get('session')
     sample_size = int(request.args.get('sample_size'))
     if sample_size is None:
@@ -133,7 +134,7 @@ def retrieve_publications_sample(project_id, query_id):
     except:
         random_sample_eids = generate_sample_publication_list(project_id, sample_size, session_id)
     search_string = utils.generate_scopus_search_from_eid_list(random_sample_eids)
-    search = scopus.ScopusSearch(search_string, refresh=True, project_id=project_id)
+    search = scopus.ScopusSearch(search_string, refresh=refresh, project_id=project_id)
     sample_publications_json = json.dumps(search.results, cls=PropertyEncoder)
     return Response(sample_publications_json, status=200, mimetype='application/json')
 
@@ -141,6 +142,7 @@ def retrieve_publications_sample(project_id, query_id):
 @cross_origin('*')
 @eids_blueprint.route("/publication_sample/<project_id>", methods=['GET'])
 def retrieve_sampled_publications(project_id):
+    refresh = scopus_service.get_refresh(scopus_service.SAMPLE, project_id, scopus_service.get_max_age(request.args))
     session_id = request.args.get('session')
     sample_size = int(request.args.get('sample_size'))
     if sample_size is None:
@@ -152,7 +154,7 @@ def retrieve_sampled_publications(project_id):
     except:
         random_sample_eids = generate_sample_publication_list(project_id, sample_size, session_id)
     search_string = utils.generate_scopus_search_from_eid_list(random_sample_eids)
-    search = scopus.ScopusSearch(search_string, refresh=True, project_id=project_id)
+    search = scopus.ScopusSearch(search_string, refresh=refresh, project_id=project_id)
     sample_publications_json = json.dumps(search.results, cls=PropertyEncoder)
     app.logger.info('project {}: retrieved {} sample publications for session {}'.format(project_id, sample_size, session_id))
     return Response(sample_publications_json, status=200, mimetype='application/json')
@@ -96,6 +96,7 @@ def retrieve_identifier_sample(project_id, query_id):
 @cross_origin('*')
 @identifiers_blueprint.route("/<project_id>/query/<query_id>/calculateSamplePublications", methods=['GET'])
 def retrieve_publications_sample(project_id, query_id):
+    refresh = scopus_service.get_refresh(scopus_service.SAMPLE, project_id, scopus_service.get_max_age(request.args))
     session_id = request.args.get('session')
     sample_size = int(request.args.get('sample_size'))
     if sample_size is None:
@@ -107,7 +108,7 @@ def retrieve_publications_sample(project_id, query_id):
     except:
         random_sample_eids = generate_sample_identifiers_list(project_id, query_id, sample_size, session_id)
     search_string = utils.generate_scopus_search_from_eid_list(random_sample_eids)
-    search = scopus.ScopusSearch(search_string, refresh=True, project_id=project_id)
+    search = scopus.ScopusSearch(search_string, refresh=refresh, project_id=project_id)
     sample_publications_json = json.dumps(search.results, cls=PropertyEncoder)
     return Response(sample_publications_json, status=200, mimetype='application/json')
 
@@ -278,6 +279,8 @@ def execute_query(project_id, query_id):
     :return: 'finished' with a status of 204 when the query was executed successfully
     """
     app.logger.info('project {}: running query {}'.format(project_id, query_id))
+    refresh = scopus_service.get_refresh(scopus_service.SEARCH, project_id, scopus_service.get_max_age(request.args))
+
     # reads the saved Scopus search string from disk
     scopus_queries = query_service.load_scopus_queries(project_id, query_id)
 
@@ -287,7 +290,7 @@ def execute_query(project_id, query_id):
     project.isEidsCollecting = True
     project_service.save_project(project)
 
-    eids = scopus_service.execute_query(scopus_queries)
+    eids = scopus_service.execute_query(scopus_queries, refresh)
 
     # print the results to the command line for logging
     app.logger.info('project {}: found {} entries in Scopus'.format(project_id, len(eids)))
@@ -0,0 +1,8 @@
+"""
+The jobs Blueprint handles the jobs running the long-running tasks of the projects
+"""
+from flask import Blueprint
+
+jobs_blueprint = Blueprint('jobs', __name__, template_folder='jobs')
+
+from . import jobs_routes
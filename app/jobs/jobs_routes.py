@@ -0,0 +1,67 @@
+#################
+#    imports    #
+#################
+
+from flask import Response, request, jsonify
+
+from service import job_service
+from . import jobs_blueprint
+
+
+#################
+#    routes     #
+#################
+
+@jobs_blueprint.route("/")
+def get_jobs():
+    """
+    lists the queued, running and recently finished jobs
+    :return: a JSON list of jobs, the newest first. The jobs can be filtered with the parameter project_id
+    """
+    jobs = job_service.list_jobs(request.args.get('project_id'))
+    return jsonify([job.__getstate__() for job in jobs])
+
+
+@jobs_blueprint.route("/statistics")
+def get_statistics():
+    """
+    returns the depth of the job queue, the numbers of running, finished, failed and cancelled jobs
+    :return: a JSON object holding the statistics
+    """
+    return jsonify(job_service.statistics())
+
+
+@jobs_blueprint.route("/history/<project_id>")
+def get_history(project_id):
+    """
+    returns the finished jobs of a project, including those of former runs of the application
+    :param project_id: the ID of the project
+    :return: a JSON list of jobs, the newest first
+    """
+    return jsonify(job_service.load_history(project_id))
+
+
+@jobs_blueprint.route("/<job_id>")
+def get_job(job_id):
+    """
+    returns the state of a job
+    :param job_id: the ID of the job
+    :return: a JSON object describing the job, 404 if the job is unknown
+    """
+    job = job_service.get_job(job_id)
+    if job is None:
+        return Response('job not found', status=404)
+    return jsonify(job.__getstate__())
+
+
+@jobs_blueprint.route("/<job_id>/cancel", methods=['POST'])
+def cancel_job(job_id):
+    """
+    cancels a job. A queued job is removed from the queue, a running job stops as soon as possible
+    :param job_id: the ID of the job
+    :return: a JSON object describing the job, 404 if the job is unknown
+    """
+    job = job_service.cancel_job(job_id)
+    if job is None:
+        return Response('job not found', status=404)
+    return jsonify(job.__getstate__())
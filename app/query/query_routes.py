@@ -5,7 +5,7 @@
 import json
 import os
 
-from flask import Response, request, send_file
+from flask import Response, request, send_file, jsonify
 from pybliometrics import scopus
 
 from model.RelevanceMeasures import RelevanceMeasure
@@ -13,7 +13,8 @@ from model.Status import Status
 from query.Query import Query
 from query.QueryDefinitions import QueryDefinitions
 from flask import current_app as app
-from service import project_service, query_service, status_service, eids_service, relevance_measure_service
+from service import project_service, query_service, status_service, eids_service, relevance_measure_service, \
+    scopus_service, job_service
 from . import query_blueprint
 
 
@@ -136,11 +137,13 @@ def save_query_as_xml(project_id):
 @query_blueprint.route('/execution/<project_id>', methods=['POST'])
 def query_execution(project_id):
     """
-    executes the defined and saved query in scopus
+    executes the defined and saved query in scopus as a job
     :param project_id: the ID of the current project
-    :return: 'finished' with a status of 204 when the query was executed successfully
+    :return: the ID of the job with a status of 202
     """
     app.logger.info('project {}: running queries'.format(project_id))
+    refresh = scopus_service.get_refresh(scopus_service.SEARCH, project_id, scopus_service.get_max_age(request.args))
+
     # reads the saved Scopus search string from disk
     scopus_queries = query_service.load_scopus_queries(project_id)
 
@@ -154,14 +157,30 @@ def query_execution(project_id):
     status = Status("EIDS_COLLECTING")
     status_service.save_status(project_id, status)
 
+    job = job_service.submit(project_id, 'query_execution', _execute_queries, project, scopus_queries, status,
+                             refresh)
+    return jsonify({'job_id': job.job_id}), 202
+
+
+def _execute_queries(project, scopus_queries, status, refresh):
+    """runs the Scopus searches of the project and saves the EIDs found"""
+    project_id = project.project_id
+
     # prepare EIDs list
     eids = []
 
     for index, search_strings in enumerate(scopus_queries.search_strings):
         individual_eids = []
         for search_string in search_strings:
+            if job_service.is_cancelled():
+                app.logger.info('project {}: query execution cancelled'.format(project_id))
+                status.status = "CANCELLED"
+                status_service.save_status(project_id, status)
+                project.isEidsCollecting = False
+                project_service.save_project(project)
+                return
             app.logger.info('project {}: executing search {} - {}'.format(project_id, index, search_string))
-            search = scopus.ScopusSearch(search_string, refresh=True, field='eid', view='STANDARD')
+            search = scopus.ScopusSearch(search_string, refresh=refresh, field='eid', view='STANDARD')
             if search.results is not None:
                 app.logger.info('project {}: result search {} - {} entries found'.format(project_id, index, len(search.results)))
                 for result in search.results:
@@ -197,8 +216,6 @@ def query_execution(project_id):
     project.isEidsCollecting = False
     project_service.save_project(project)
 
-    return Response({"status": "FINISHED"}, status=204)
-
 
 # uploads the scival data and saves it as scival_data.csv in the working directory
 @query_blueprint.route('/save_xml_upload/<project_id>', methods=['POST'])
@@ -2,12 +2,10 @@
 #    imports   #
 ################
 
-import csv
 import os
 
-from model.ScivalUpdate import ScivalUpdate
-from scival.Scival import Scival
-from service import project_service, elasticsearch_service
+from scival.Scival import read_export
+from service import project_service, elasticsearch_service, job_service
 from . import scival_blueprint
 from flask import current_app as app
 from flask import jsonify, Response, request
@@ -59,25 +57,33 @@ def upload_scival_file(project_id):
 @scival_blueprint.route('/import/<project_id>', methods=['GET'])
 def import_scival_data(project_id):
     """
-    imports the scival data into the data store
+    imports the scival data into the data store as a job
     :param project_id: the ID of the current project
-    :return: a status of 200 when the data have been imported
+    :return: the ID of the job with a status of 202
     """
+    job = job_service.submit(project_id, 'scival_import', _import_scival_data, project_id)
+    return jsonify({'job_id': job.job_id}), 202
+
+
+def _import_scival_data(project_id):
+    """imports the rows of the uploaded scival data into the index with bulk partial updates, returns a message with
+    the numbers of imported and failed rows. Rows of EIDs not yet in the index create a document holding the scival
+    data only."""
     app.logger.info('project {}: importing Scival data'.format(project_id))
     with app.app_context():
         location = app.config.get("LIBINTEL_DATA_DIR")
-    with open(location + '/out/' + project_id + '/' + 'scival_data.csv', 'r', encoding='utf-8-sig') as csvfile:
-        scivals = []
-        linereader = csv.DictReader(csvfile, delimiter=',')
-        rows = list(linereader)
-        app.logger.info('project {}: importing {} lines of scival data'.format(project_id, str(len(rows))))
-        for index, row in enumerate(rows):
-            app.logger.info('project {}: processed entry {} of {} '.format(project_id, str(index), str(len(rows))))
-            if len(row) < 10:
-                continue
-            scival = Scival(row)
-            elasticsearch_service.append_to_index(ScivalUpdate(scival), scival.eid, project_id)
-            scivals.append(scival)
-        csvfile.close()
-        app.logger.info('project {}: imported {} Scival data out of  {}'.format(project_id, str(len(scivals)), str(len(rows))))
-    return Response("imported " + str(len(scivals)) + " Scival data", status=200)
+    failures = []
+    read = 0
+    with elasticsearch_service.BulkIndexer(project_id, on_failure=failures.extend) as indexer:
+        for documents in read_export(location + '/out/' + project_id + '/' + 'scival_data.csv'):
+            if job_service.is_cancelled():
+                break
+            for document in documents:
+                indexer.update(document['eid'], {'scival_data': document})
+            read += len(documents)
+            app.logger.info('project {}: read {} rows of Scival data, {} imported, {} failed'
+                            .format(project_id, read, indexer.indexed, indexer.failed))
+    for eid, reason in failures:
+        app.logger.warning('project {}: could not import Scival data for {}, reason: {}'.format(project_id, eid, reason))
+    app.logger.info('project {}: imported {} Scival data out of {}'.format(project_id, indexer.indexed, read))
+    return "imported {} Scival data, {} failed".format(indexer.indexed, indexer.failed)
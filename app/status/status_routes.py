@@ -4,7 +4,9 @@
 
 import json
 
-from service import status_service, elasticsearch_service
+from flask import Response, stream_with_context
+
+from service import status_service, elasticsearch_service, job_service
 from . import status_blueprint
 
 
@@ -25,3 +27,37 @@ def get_collection_progress(project_id):
     except:
         status.progress = 0
     return json.dumps(status, default=lambda o: o.__getstate__())
+
+
+@status_blueprint.route("/collection_progress/<project_id>/stream")
+def stream_collection_progress(project_id):
+    """
+    streams the progress of a running job as server-sent events. Each event holds the status, the progress, the number
+    of failed items, the throughput in items per second and the estimated remaining time in seconds. The values are
+    pushed by the collector, neither the status file nor the index are read while the job is running. While the job
+    is queued or has not yet registered its status, comments are sent as heartbeats. The stream ends with the final
+    status read from disc when no job of the project is left.
+    :param project_id: the ID of the current project
+    :return: a stream of the type text/event-stream
+    """
+    def generate():
+        version = None
+        while True:
+            progress, version = status_service.wait_for_progress(project_id, version)
+            if progress is None:
+                if job_service.has_active_jobs(project_id):
+                    # the job is queued, or has not yet registered or has just unregistered its status
+                    yield ': waiting for the job\n\n'
+                    status_service.wait_for_registration(project_id, timeout=1)
+                    version = None
+                    continue
+                try:
+                    status = status_service.load_status(project_id)
+                    yield 'event: finished\ndata: {}\n\n'.format(json.dumps(status.__getstate__()))
+                except FileNotFoundError:
+                    yield 'event: finished\ndata: {}\n\n'
+                return
+            yield 'data: {}\n\n'.format(json.dumps(progress))
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
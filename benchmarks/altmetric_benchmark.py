@@ -0,0 +1,92 @@
+"""
+Measures the memory held by Altmetric records, compared to the former Altmetric class copying every field into an
+attribute and keeping the full response. Run from the project folder with
+
+    python -m benchmarks.altmetric_benchmark
+"""
+import json
+import tracemalloc
+
+from altmetric.Altmetric import Altmetric, FIELDS
+
+
+class LegacyAltmetric:
+    """the Altmetric class before the introduction of the slots, holding the response and a copy of each field"""
+
+    def __init__(self, doi, response_json=None):
+        self.altmetric_url = 'https://api.altmetric.com/v1'
+        self.api_key = None
+        self.json = response_json or {}
+        for name in FIELDS:
+            setattr(self, '_' + name, self.json.get(name))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['json']
+        del state['api_key']
+        del state['altmetric_url']
+        return state
+
+
+def build_response(index=1):
+    """builds an Altmetric response resembling one of the API, including fields which are not indexed"""
+    doi = '10.1000/{}'.format(index)
+    response = {'title': 'Title of record {}'.format(index), 'doi': doi, 'pmid': str(30000000 + index),
+                'altmetric_jid': '4f6fa50a3cf058f610003160', 'issns': ['1234-5678', '8765-4321'],
+                'journal': 'Journal of Tests', 'cohorts': {'pub': 12, 'sci': 3, 'com': 1},
+                'abstract': 'An abstract. ' * 40, 'context': {
+                    'all': {'count': 12000000, 'mean': 8.1, 'rank': 300000, 'pct': 97, 'higher_than': 11000000},
+                    'journal': {'count': 2000, 'mean': 5.3, 'rank': 50, 'pct': 97, 'higher_than': 1900}},
+                'authors': ['Author{} A.'.format(author) for author in range(8)], 'type': 'article',
+                'altmetric_id': 1000000 + index, 'schema': '1.5.4', 'is_oa': False,
+                'publisher_subjects': [{'name': 'Computer Science', 'scheme': 'era'}],
+                'cited_by_posts_count': 16, 'cited_by_tweeters_count': 15, 'cited_by_accounts_count': 16,
+                'last_updated': 1577836800, 'score': 12.5,
+                'history': {period: 12.5 for period in ('1y', '6m', '3m', '1m', '1w', '6d', '5d', '4d', '3d', '2d',
+                                                        '1d', 'at')},
+                'url': 'http://dx.doi.org/' + doi, 'added_on': 1546300800, 'published_on': 1546300800,
+                'subjects': ['computerscience'], 'scopus_subjects': ['Computer Science'],
+                'readers': {'citeulike': '0', 'mendeley': '42', 'connotea': '0'}, 'readers_count': 42,
+                'images': {'small': 'https://badges.altmetric.com/?size=64&score=13&types=tttttttt',
+                           'medium': 'https://badges.altmetric.com/?size=100&score=13&types=tttttttt',
+                           'large': 'https://badges.altmetric.com/?size=180&score=13&types=tttttttt'},
+                'details_url': 'http://www.altmetric.com/details.php?citation_id={}'.format(1000000 + index),
+                # fields returned by the API but not stored in the index
+                'isbns': [], 'handles': [], 'nlmid': '0404511', 'ads_id': '2019JTest...12....1A',
+                'arxiv_id': '1901.0{}'.format(index), 'pubdate': 1546300800, 'epubdate': 1546300800,
+                'altmetric_score': {'score': 12.5, 'score_history': {'1y': 12.5, 'at': 12.5},
+                                    'context_for_score': {'all': {'rank': 300000, 'total_number_of_other_articles': 1}}},
+                'demographics': {'poster_types': {'member_of_the_public': 10, 'researcher': 5},
+                                 'geo': {'twitter': {'DE': 4, 'GB': 3, 'US': 8}}},
+                'counts': {'readers': {'mendeley': 42}, 'twitter': {'posts_count': 16, 'unique_users_count': 15}}}
+    return json.dumps(response)
+
+
+def bytes_per_record(cls, payloads):
+    """returns the memory held per record once its index document has been built, as done by the collector, including
+    the parts of the response kept by the record"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [cls(None, response_json=json.loads(payload)) for payload in payloads]
+    for record in records:
+        record.__getstate__()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(records)
+
+
+def main():
+    payloads = [build_response(index) for index in range(2000)]
+    for payload in payloads[:10]:
+        legacy = {key.lstrip('_'): value for key, value in LegacyAltmetric(None, json.loads(payload)).__getstate__()
+                  .items()}
+        assert Altmetric(None, response_json=json.loads(payload)).__getstate__() == legacy
+    before = bytes_per_record(LegacyAltmetric, payloads)
+    after = bytes_per_record(Altmetric, payloads)
+    print('attribute copies and response: {:8.0f} bytes per record'.format(before))
+    print('slots with lazy fields:        {:8.0f} bytes per record'.format(after))
+    print('reduction:                     {:8.1%}'.format(1 - after / before))
+
+
+if __name__ == '__main__':
+    main()
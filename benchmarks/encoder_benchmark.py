@@ -0,0 +1,119 @@
+"""
+Measures the number of records per second encoded by the PropertyEncoder, compared to the former encoder looking up
+the fields with dir() for every object. Run from the project folder with
+
+    python -m benchmarks.encoder_benchmark
+"""
+import json
+import timeit
+
+from flask import Flask
+from pybliometrics.scopus import AbstractRetrieval
+
+from altmetric.Altmetric import Altmetric
+from model.AllResponses import AllResponses
+from scival.Scival import Scival
+from service.elasticsearch_service import PropertyEncoder
+from unpaywall.Unpaywall import Unpaywall
+
+
+class LegacyPropertyEncoder(json.JSONEncoder):
+    """the encoder before the introduction of the cached extractors"""
+
+    def default(self, input_object):
+        keys = dir(input_object)
+        return_object = {}
+        own_classes = ['AllResponses', 'Altmetric', 'Scival']
+        object_type = type(input_object).__name__
+        if object_type in own_classes:
+            for key, value in input_object.__getstate__().items():
+                return_object[key.lstrip('_')] = value
+                continue
+        elif object_type == 'Unpaywall':
+            fields = ['doi', 'doi_resolver', 'evidence', 'free_fulltext_url', 'is_boai_license',
+                      'is_free_to_read', 'is_subscription_journal', 'license', 'oa_color',
+                      'reported_noncompliant_copies', 'title']
+            for key in keys:
+                if key in fields:
+                    return_object[key] = getattr(input_object, key)
+        elif object_type == 'AbstractRetrieval':
+            fields = ['abstract', 'affiliation', 'authkeywords', 'authorgroup', 'authors', 'citedby-count',
+                      'citedby-link', 'correspondence', 'coverDate', 'description', 'doi', 'eid', 'endingPage',
+                      'funding', 'isbn', 'issn', 'identifier', 'idxterms', 'issueIdentifier',
+                      'issuetitle', 'language', 'pageRange', 'publicationName', 'publisher', 'publisheraddress',
+                      'refcount', 'references', 'scopus_link', 'self_link', 'source_id', 'title',
+                      'sourcetitle_abbreviation', 'srctype', 'startingPage', 'subject_areas', 'url',
+                      'volume', 'website', 'auid', 'indexed_name', 'surname', 'given_name', 'affiliation']
+            for key in keys:
+                if key in fields:
+                    try:
+                        return_object[key] = getattr(input_object, key)
+                    except TypeError:
+                        print('could not save key: ' + key)
+                    except AttributeError:
+                        print('could not save key: ' + key)
+        elif object_type == '_ScopusAuthor':
+            fields = ['indexed_name', 'given_name', 'surname', 'initials', 'author_url', 'auid', 'scopusid', 'seq']
+            for key in keys:
+                if key in fields:
+                    return_object[key] = getattr(input_object, key)
+        return return_object
+
+
+def build_record(index=1, number_of_authors=8):
+    """builds a record resembling a collected publication, without sending requests"""
+    eid = '2-s2.0-{}'.format(index)
+    doi = '10.1000/{}'.format(index)
+    abstract = AbstractRetrieval.__new__(AbstractRetrieval)
+    abstract._json = {
+        'coredata': {'eid': eid, 'dc:title': 'Title of record {}'.format(index), 'prism:doi': doi,
+                     'dc:description': 'An abstract. ' * 20, 'prism:coverDate': '2019-01-01',
+                     'prism:publicationName': 'Journal of Tests', 'prism:volume': '12', 'prism:startingPage': '1',
+                     'prism:endingPage': '10', 'srctype': 'j', 'source-id': '12345', 'citedby-count': '3',
+                     'link': [{'@rel': 'self', '@href': 'https://api.elsevier.com/' + eid},
+                              {'@rel': 'scopus', '@href': 'https://www.scopus.com/' + eid}]},
+        'authors': {'author': [{'@auid': str(author), '@seq': str(author), 'ce:initials': 'A.',
+                                'ce:indexed-name': 'Author{} A.'.format(author), 'ce:surname': 'Author{}'.format(author),
+                                'ce:given-name': 'Anna', 'author-url': 'https://api.elsevier.com/' + str(author),
+                                'affiliation': {'@id': '60000001'}}
+                               for author in range(number_of_authors)]},
+        'affiliation': [{'@id': '60000001', 'affilname': 'A University', 'affiliation-city': 'Duisburg',
+                         'affiliation-country': 'Germany', '@href': 'https://api.elsevier.com/60000001'}],
+        'subject-areas': {'subject-area': [{'@abbrev': 'COMP', '@code': '1700', '$': 'Computer Science'}]},
+        'language': {'@xml:lang': 'eng'},
+        'idxterms': {'mainterm': [{'$': 'Term {}'.format(term)} for term in range(5)]},
+        'authkeywords': {'author-keyword': [{'$': 'keyword {}'.format(keyword)} for keyword in range(5)]}}
+    abstract._head = {}
+    abstract._confevent = {}
+    abstract._ref = {}
+    abstract._view = 'FULL'
+    record = AllResponses(eid, 'benchmark', 'benchmark')
+    record.scopus_abstract_retrieval = abstract
+    record.unpaywall_response = Unpaywall(doi, response_json={'results': [{'doi': doi, 'oa_color': 'gold',
+                                                                          'is_free_to_read': True}]})
+    record.altmetric_response = Altmetric(doi, response_json={'doi': doi, 'score': 4.5, 'cited_by_tweeters_count': 3})
+    record.scival_data = Scival([])
+    return record
+
+
+def records_per_second(encoder, records, repeat=5):
+    seconds = min(timeit.repeat(lambda: [json.dumps(record, cls=encoder) for record in records], number=1,
+                                repeat=repeat))
+    return len(records) / seconds
+
+
+def main():
+    app = Flask(__name__)
+    with app.app_context():
+        records = [build_record(index) for index in range(1000)]
+        for record in records[:10]:
+            assert json.dumps(record, cls=PropertyEncoder) == json.dumps(record, cls=LegacyPropertyEncoder)
+        before = records_per_second(LegacyPropertyEncoder, records)
+        after = records_per_second(PropertyEncoder, records)
+    print('dir() lookup:        {:8.0f} records per second'.format(before))
+    print('cached extractors:   {:8.0f} records per second'.format(after))
+    print('speed-up:            {:8.2f}'.format(after / before))
+
+
+if __name__ == '__main__':
+    main()
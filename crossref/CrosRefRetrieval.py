@@ -1,10 +1,9 @@
 import re
 
-import requests
-
 from flask import current_app as app
 
 from model.Author import Author
+from service import http_service
 
 
 class CrossRefRetrieval:
@@ -18,7 +17,7 @@ class CrossRefRetrieval:
         with app.app_context():
             email = app.config.get("LIBINTEL_USER_EMAIL")
         self._crossref_url = "https://api.crossref.org/"
-        r = requests.get(self._crossref_url + "works/" + doi + "?mailto=" + email)
+        r = http_service.get(self._crossref_url + "works/" + doi + "?mailto=" + email)
         if r.status_code == 200:
             crossref_data = r.json()
             status = crossref_data["status"]
@@ -1,9 +1,9 @@
 import re
 
-import requests
 from flask import current_app as app
 
 from model.Author import Author
+from service import http_service
 
 
 class CrossRefSearch:
@@ -18,7 +18,7 @@ class CrossRefSearch:
             email = app.config.get("LIBINTEL_USER_EMAIL")
         self._crossref_url = "https://api.crossref.org/"
         self._reference = cleanup(reference)
-        r = requests.get(self._crossref_url + "works?mailto=" + email + "&rows=1&query=" + self._reference.replace(" ", "+"))
+        r = http_service.get(self._crossref_url + "works?mailto=" + email + "&rows=1&query=" + self._reference.replace(" ", "+"))
         if r.status_code == 200:
             crossref_data = r.json()
             status = crossref_data["status"]
@@ -0,0 +1,31 @@
+import sys
+from logging.config import dictConfig
+
+from app import create_app
+from service import unpaywall_service
+
+dictConfig({
+    'version': 1,
+    'formatters': {'default': {
+        'format': '[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
+    }},
+    'handlers': {'wsgi': {
+        'class': 'logging.StreamHandler',
+        'stream': 'ext://flask.logging.wsgi_errors_stream',
+        'formatter': 'default'
+    }},
+    'root': {
+        'level': 'INFO',
+        'handlers': ['wsgi']
+    }
+})
+
+# imports an Unpaywall snapshot (gzipped JSON lines) into the local index read in offline mode, e.g.
+# python import_unpaywall_snapshot.py unpaywall_snapshot_2020-04-27.jsonl.gz
+if len(sys.argv) != 2:
+    print('usage: python import_unpaywall_snapshot.py <snapshot file>')
+    sys.exit(1)
+app = create_app()
+with app.app_context():
+    imported = unpaywall_service.import_snapshot(sys.argv[1])
+    app.logger.info('imported {} records into the Unpaywall snapshot index'.format(imported))
@@ -0,0 +1,142 @@
+from collections import namedtuple
+
+from pybliometrics.scopus import AbstractRetrieval
+
+# the authors and affiliations in the form of an AbstractRetrieval
+Author = namedtuple('Author', 'auid indexed_name surname given_name affiliation')
+Affiliation = namedtuple('Affiliation', 'id name city country')
+
+# the short source types of an AbstractRetrieval by the aggregation types returned by the search
+_SOURCE_TYPES = {'Journal': 'j', 'Book': 'b', 'Book Series': 'k', 'Conference Proceeding': 'p',
+                 'Trade Journal': 'd', 'Report': 'r'}
+
+
+class ScopusRecord:
+    """A Scopus record built from a result of the Scopus Search API (view COMPLETE). It provides the fields of an
+    AbstractRetrieval the search also returns, all other fields of an AbstractRetrieval are None."""
+
+    # the fields of an AbstractRetrieval which are provided by the search results
+    SEARCH_FIELDS = ('affiliation', 'aggregationType', 'authkeywords', 'authors', 'citedby_count', 'coverDate',
+                     'description', 'doi', 'eid', 'identifier', 'issn', 'issueIdentifier', 'pageRange', 'pii',
+                     'publicationName', 'pubmed_id', 'source_id', 'srctype', 'title', 'volume')
+
+    @property
+    def affiliation(self):
+        document = self._document
+        if not document.afid:
+            return None
+        ids = document.afid.split(';')
+        return [Affiliation(*values) for values in zip(ids, _split(document.affilname, len(ids)),
+                                                        _split(document.affiliation_city, len(ids)),
+                                                        _split(document.affiliation_country, len(ids)))]
+
+    @property
+    def aggregationType(self):
+        return self._document.aggregationType
+
+    @property
+    def authkeywords(self):
+        if self._document.authkeywords is None:
+            return None
+        return self._document.authkeywords.split(' | ')
+
+    @property
+    def authors(self):
+        document = self._document
+        if not document.author_ids:
+            return None
+        auids = document.author_ids.split(';')
+        authors = []
+        for auid, name, afids in zip(auids, _split(document.author_names, len(auids)),
+                                     _split(document.author_afids, len(auids))):
+            surname, _, given_name = (name or '').partition(', ')
+            authors.append(Author(auid=auid, indexed_name=None, surname=surname or None, given_name=given_name or None,
+                                  affiliation=afids.split('-') if afids else None))
+        return authors
+
+    @property
+    def citedby_count(self):
+        if self._document.citedby_count is None:
+            return None
+        return int(self._document.citedby_count)
+
+    @property
+    def coverDate(self):
+        return self._document.coverDate
+
+    @property
+    def description(self):
+        return self._document.description
+
+    @property
+    def doi(self):
+        return self._document.doi
+
+    @property
+    def eid(self):
+        return self._document.eid
+
+    @property
+    def identifier(self):
+        return int(self._document.eid.split('-')[-1])
+
+    @property
+    def issn(self):
+        return self._document.issn
+
+    @property
+    def issueIdentifier(self):
+        return self._document.issueIdentifier
+
+    @property
+    def pageRange(self):
+        return self._document.pageRange
+
+    @property
+    def pii(self):
+        return self._document.pii
+
+    @property
+    def publicationName(self):
+        return self._document.publicationName
+
+    @property
+    def pubmed_id(self):
+        return self._document.pubmed_id
+
+    @property
+    def source_id(self):
+        return self._document.source_id
+
+    @property
+    def srctype(self):
+        return _SOURCE_TYPES.get(self._document.aggregationType)
+
+    @property
+    def title(self):
+        return self._document.title
+
+    @property
+    def volume(self):
+        return self._document.volume
+
+    def __init__(self, document):
+        """
+        :param document: the search result, a Document as returned by ScopusSearch.results
+        """
+        self._document = document
+
+    def __getattr__(self, name):
+        # only called for the fields not returned by the search
+        if name.startswith('_') or not hasattr(AbstractRetrieval, name):
+            raise AttributeError(name)
+        return None
+
+
+def _split(value, length):
+    """splits a value of the search results joined with semicolons into the given number of values. The search skips
+    missing values when joining them, so if the number does not match, the values cannot be assigned and are None."""
+    values = value.split(';') if value is not None else []
+    if len(values) != length:
+        return [None] * length
+    return values
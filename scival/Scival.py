@@ -1,209 +1,113 @@
+import pandas as pd
+
+# the columns of a SciVal export and the fields of the index documents, with the separator of multi-value columns
+COLUMNS = (('Title', 'title', None),
+           ('Authors', 'authors', None),
+           ('Number of Authors', 'number_of_authors', None),
+           ('Scopus Author Ids', 'scopus_author_ids', ', '),
+           ('Year', 'year', None),
+           ('Scopus Source title', 'scopus_source_title', None),
+           ('Volume', 'volume', None),
+           ('Issue', 'issue', None),
+           ('Pages', 'pages', None),
+           ('ISSN', 'issn', None),
+           ('Source ID', 'source_id', None),
+           ('Source type', 'source_type', None),
+           ('SNIP (publication year)', 'snip', None),
+           ('CiteScore (publication year)', 'cite_score', None),
+           ('SJR (publication year)', 'sjr', None),
+           ('Field-Weighted View Impact', 'field_weighted_view_impact', None),
+           ('Views', 'views', None),
+           ('Citations', 'citations', None),
+           ('Field-Weighted Citation Impact', 'field_weighted_citation_impact', None),
+           ('Outputs in Top Citation Percentiles, per percentile', 'output_in_top_percentiles', None),
+           ('Field-Weighted Outputs in Top Citation Percentiles, per percentile',
+            'field_weighted_output_in_top_citation_percentiles', None),
+           ('Reference', 'reference', None),
+           ('Abstract', 'abstract_url', None),
+           ('DOI', 'doi', None),
+           ('Publication type', 'publication_type', None),
+           ('EID', 'eid', None),
+           ('PubMed ID', 'pubmed_id', None),
+           ('Institutions', 'institutions', ', '),
+           ('Scopus Affiliation IDs', 'scopus_affil_ids', ', '),
+           ('Scopus Affiliation names', 'scopus_affil_names', '; '),
+           ('Country/Region', 'country', ', '),
+           ('All Science Journal Classification (ASJC) code', 'all_science_classification_code', '; '),
+           ('All Science Journal Classification (ASJC) field name', 'all_science_classification_name', None),
+           ('Topic Cluster name', 'topic_cluster_name', None),
+           ('Topic Cluster number', 'topic_cluster_number', None),
+           ('Topic name', 'topic_name', None),
+           ('Topic number', 'topic_number', None))
+
+FIELDS = tuple(field for _, field, _ in COLUMNS)
+
+# SciVal marks missing values with a dash
+_MISSING = '-'
+
+
 class Scival:
     """A class representing the results of analyzing publication sets with Scival by importing rows from a
     spreadsheet."""
 
     def __init__(self, row):
-        if row.__len__() > 36:
-            if row['Title'] is not "-":
-                self._title = row['Title']
-            else:
-                self._title = None
-            if row['Authors'] is not "-":
-                self._authors = row['Authors']
-            else:
-                self._authors = None
-            if row['Number of Authors'] is not "-":
-                self._number_of_authors = row['Number of Authors']
-            else:
-                self._number_of_authors = None
-            if row['Scopus Author Ids'] is not "-":
-                if row['Scopus Author Ids'] is not None:
-                    self._scopus_author_ids = row['Scopus Author Ids'].split(', ')
-            else:
-                self._scopus_author_ids = []
-            if row['Year'] is not "-":
-                self._year = row['Year']
-            else:
-                self._year = None
-            if row['Scopus Source title'] is not "-":
-                self._scopus_source_title = row['Scopus Source title']
-            else:
-                self._scopus_source_title = None
-            if row['Volume'] is not "-":
-                self._volume = row['Volume']
-            else:
-                self._volume = None
-            if row['Issue'] is not "-":
-                self._issue = row['Issue']
-            else:
-                self._issue = None
-            if row['Pages'] is not "-":
-                self._pages = row['Pages']
-            else:
-                self._pages = None
-            if row['ISSN'] is not "-":
-                self._issn = row['ISSN']
-            else:
-                self._issn = None
-            if row['Source ID'] is not "-":
-                self._source_id = row['Source ID']
-            else:
-                self._source_id = None
-            if row['Source type'] is not "-":
-                self._source_type = row['Source type']
-            else:
-                self._source_type = None
-            if row['SNIP (publication year)'] is not "-":
-                self._snip = row['SNIP (publication year)']
-            else:
-                self._snip = None
-            if row['CiteScore (publication year)'] is not "-":
-                self._cite_score = row['CiteScore (publication year)']
-            else:
-                self._cite_score = None
-            if row['SJR (publication year)'] is not "-":
-                self._sjr = row['SJR (publication year)']
-            else:
-                self._sjr = None
-            if row['Field-Weighted View Impact'] is not "-":
-                self._field_weighted_view_impact = row['Field-Weighted View Impact']
-            else:
-                self._field_weighted_view_impact = None
-            if row['Views'] is not "-":
-                self._views = row['Views']
-            else:
-                self._views = None
-            if row['Citations'] is not "-":
-                self._citations = row['Citations']
-            else:
-                self._citations = None
-            if row['Field-Weighted Citation Impact'] is not "-":
-                self._field_weighted_citation_impact = row['Field-Weighted Citation Impact']
-            else:
-                self._field_weighted_citation_impact = None
-            if row['Outputs in Top Citation Percentiles, per percentile'] is not "-":
-                self._output_in_top_percentiles = row['Outputs in Top Citation Percentiles, per percentile']
-            else:
-                self._output_in_top_percentiles = None
-            if row['Field-Weighted Outputs in Top Citation Percentiles, per percentile'] is not "-":
-                self._field_weighted_output_in_top_citation_percentiles = row['Field-Weighted Outputs in Top Citation Percentiles, per percentile']
-            else:
-                self._field_weighted_output_in_top_citation_percentiles = None
-            if row['Reference'] is not "-":
-                self._reference = row['Reference']
-            else:
-                self._reference = None
-            if row['Abstract'] is not "-":
-                self._abstract_url = row['Abstract']
-            else:
-                self._abstract_url = None
-            if row['DOI'] is not "-":
-                self._doi = row['DOI']
-            else:
-                self._doi = None
-            if row['Publication type'] is not "-":
-                self._publication_type = row['Publication type']
-            else:
-                self._publication_type = None
-            if row['EID'] is not "-":
-                self._eid = row['EID']
-            else:
-                self._eid = None
-            if row['PubMed ID'] is not "-":
-                self._pubmed_id = row['PubMed ID']
-            else:
-                self._pubmed_id = None
-            if row['Institutions'] is not "-":
-                if row['Institutions'] is not None:
-                    self._institutions = row['Institutions'].split(', ')
-            else:
-                self._institutions = None
-            if row['Scopus Affiliation IDs'] is not "-":
-                if row['Scopus Affiliation IDs'] is not None:
-                    self._scopus_affil_ids = row['Scopus Affiliation IDs'].split(', ')
-            else:
-                self._scopus_affil_ids = None
-            if row['Scopus Affiliation names'] is not "-":
-                if row['Scopus Affiliation names'] is not None:
-                    self._scopus_affil_names = row['Scopus Affiliation names'].split('; ')
-            else:
-                self._scopus_affil_names = None
-            if row['Country/Region'] is not "-":
-                if row['Country/Region'] is not None:
-                    self._country = row['Country/Region'].split(', ')
-            else:
-                self._country = None
-            if row['All Science Journal Classification (ASJC) code'] is not "-":
-                if row['All Science Journal Classification (ASJC) code'] is not None:
-                    self._all_science_classification_code = row['All Science Journal Classification (ASJC) code'].split('; ')
-            else:
-                self._all_science_classification_code = None
-            if row['All Science Journal Classification (ASJC) field name'] is not "-":
-                self._all_science_classification_name = row['All Science Journal Classification (ASJC) field name']
-            else:
-                self._all_science_classification_name = None
-            if row['Topic Cluster name'] is not "-":
-                self._topic_cluster_name = row['Topic Cluster name']
-            else:
-                self._topic_cluster_name = None
-            if row['Topic Cluster number'] is not "-":
-                self._topic_cluster_number = row['Topic Cluster number']
-            else:
-                self._topic_cluster_number = None
-            if row['Topic name'] is not "-":
-                self._topic_name = row['Topic name']
-            else:
-                self.topic_name = None
-            if row['Topic number'] is not "-":
-                self.topic_number = row['Topic number']
-            else:
-                self.topic_number = None
-        else:
-            self._title = None
-            self._authors = None
-            self._number_of_authors = None
-            self._scopus_author_ids = None
-            self._year = None
-            self._scopus_source_title = None
-            self._volume = None
-            self._issue = None
-            self._pages = None
-            self._issn = None
-            self._source_id = None
-            self._source_type = None
-            self._snip = None
-            self._cite_score = None
-            self._sjr = None
-            self._field_weighted_view_impact = None
-            self._views = None
-            self._citations = None
-            self._field_weighted_citation_impact = None
-            self._output_in_top_percentiles = None
-            self._field_weighted_output_in_top_citation_percentiles = None
-            self._reference = None
-            self._abstract_url = None
-            self._doi = None
-            self._publication_type = None
-            self._eid = None
-            self._pubmed_id = None
-            self._institutions = []
-            self._scopus_affil_ids = []
-            self._scopus_affil_names = []
-            self._country = []
-            self._all_science_classification = []
-            self._topic_cluster_name = None
-            self._topic_cluster_number = None
-            self._topic_name = None
-            self.topic_number = None
+        """
+        :param row: a row of a SciVal export as dictionary keyed by column, e.g. from a csv.DictReader. An empty row
+        gives an object without data.
+        """
+        self._values = parse_row(row) if row else dict.fromkeys(FIELDS)
 
     def __getstate__(self):
-        state = self.__dict__.copy()
-        return state
+        return dict(self._values)
+
+    def __setstate__(self, state):
+        self._values = dict(state)
 
     @property
     def eid(self):
-        return self._eid
+        return self._values['eid']
 
     @property
     def title(self):
-        return self._title
+        return self._values['title']
+
+
+def parse_row(row):
+    """
+    converts a row of a SciVal export into the document stored in the index. Missing values are set to None,
+    multi-value columns are split into lists.
+    :param row: the row as dictionary keyed by column
+    :return: the document
+    """
+    document = {}
+    for column, field, separator in COLUMNS:
+        value = row.get(column)
+        if value is None or value == _MISSING:
+            document[field] = None
+        elif separator is not None:
+            document[field] = value.split(separator)
+        else:
+            document[field] = value
+    return document
+
+
+def read_export(source, chunk_size=5000):
+    """
+    reads a SciVal export (CSV) in chunks and converts the rows into the documents stored in the index. The values of
+    each chunk are normalized and split column by column. Rows without EID, e.g. the notes at the end of an export,
+    are skipped.
+    :param source: the path to the CSV file or a file object
+    :param chunk_size: the number of rows converted at once
+    :return: a generator of lists of documents, one list per chunk
+    """
+    columns = {column: field for column, field, _ in COLUMNS}
+    chunks = pd.read_csv(source, dtype=str, na_values=[_MISSING], keep_default_na=False, encoding='utf-8-sig',
+                         chunksize=chunk_size)
+    for chunk in chunks:
+        frame = chunk.reindex(columns=list(columns)).rename(columns=columns)
+        frame = frame[frame['eid'].notnull() & (frame['eid'] != '')].astype(object)
+        for _, field, separator in COLUMNS:
+            if separator is not None:
+                frame[field] = frame[field].str.split(separator)
+        frame = frame.where(frame.notnull(), None)
+        yield frame.to_dict('records')
@@ -0,0 +1,575 @@
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock, local
+
+from flask import current_app as app
+from pybliometrics.scopus.exception import Scopus429Error
+
+from model.AllResponses import AllResponses
+from model.ScopusRecord import ScopusRecord
+from scival.Scival import Scival
+from service import counter_service, dead_letter_service, eids_service, elasticsearch_service, enrichment_service, \
+    http_service, job_service, journal_service, project_service, scopus_service, status_service
+from utilities.KeyScheduler import KeyScheduler, KeyExhaustedError
+from utilities.Pipeline import Pipeline, StageStatistics
+from utilities.RetryPolicy import RetryPolicy
+from utilities.ScopusClient import ScopusClient
+
+
+def collect(eids, project, status, keys, app, mode='', max_age=None):
+    """
+    collects the data for a list of EIDs and stores them in the elasticsearch index of the project. The collection runs
+    as a pipeline of stages connected by bounded queues: the Scopus records are fetched by the workers of all API keys
+    from a shared queue of EIDs, enriched with Unpaywall and Altmetric data, serialized to JSON and sent to the index
+    in bulk. A slow stage blocks the stages in front of it, so the memory used does not depend on the number of EIDs.
+    EIDs failing for a transient reason are put back into the shared queue after an exponential backoff, EIDs failing
+    permanently or too often are added to the dead-letter store of the project.
+    If the collection runs as a job and the job is cancelled, the batches not yet started are left pending in the
+    progress journal, so a collection in mode 'resume' continues with them.
+    With the retrieval mode 'search', the records are retrieved in batches with the Scopus Search API if the search
+    returns all fields required for the index, see _fetch_by_search.
+    :param eids: the list of EIDs
+    :param project: the current project
+    :param status: the status object of the current collection
+    :param keys: a single API-key or a tuple of API-keys
+    :param app: the app object to retrieve the context from
+    :param mode: the collection mode. when resuming, EIDs already retrieved are read from the local Scopus cache
+    :param max_age: the maximum age in days of locally cached Scopus records, overrides the freshness policy
+    """
+    with app.app_context():
+        project_id = project.project_id
+        refresh = scopus_service.get_refresh(scopus_service.ABSTRACT, project_id, max_age)
+        batch_size = app.config.get("LIBINTEL_ENRICHMENT_BATCH_SIZE", 50)
+        queue_size = app.config.get("LIBINTEL_PIPELINE_QUEUE_SIZE", 100)
+        workers_per_key = app.config.get("LIBINTEL_SCOPUS_WORKERS_PER_KEY", 1)
+        rate = app.config.get("LIBINTEL_SCOPUS_REQUESTS_PER_SECOND")
+        throttle_pause = app.config.get("LIBINTEL_SCOPUS_THROTTLE_PAUSE", 60)
+        retrieval = app.config.get("LIBINTEL_SCOPUS_RETRIEVAL", 'abstract')
+        fields = app.config.get("LIBINTEL_SCOPUS_FIELDS")
+        max_query_length = app.config.get("LIBINTEL_SCOPUS_QUERY_LENGTH", 2000)
+        if retrieval == 'search' and fields is None:
+            app.logger.warning('project {}: the fields of the index are not restricted with LIBINTEL_SCOPUS_FIELDS, '
+                               'retrieving the records one by one'.format(project_id))
+            retrieval = 'abstract'
+        elif retrieval == 'search' and not set(fields) <= set(ScopusRecord.SEARCH_FIELDS):
+            app.logger.warning('project {}: the Scopus search does not return the fields {}, retrieving the records '
+                               'one by one'.format(project_id, sorted(set(fields) - set(ScopusRecord.SEARCH_FIELDS))))
+            retrieval = 'abstract'
+        cached_eids = set()
+        if mode == 'resume':
+            cached_eids = journal_service.load_progress(project_id)[journal_service.RETRIEVED]
+        scheduler = KeyScheduler(keys, workers_per_key=workers_per_key, rate=rate)
+        clients = _ScopusClients(scheduler, app.config.get("LIBINTEL_SCOPUS_TIMEOUT", 60))
+        job = job_service.get_current_job()
+        if job is not None:
+            job.on_cancel(scheduler.cancel)
+        retry_policy = RetryPolicy(dead_letter_service.TRANSIENT,
+                                   max_attempts=app.config.get("LIBINTEL_RETRY_MAX_ATTEMPTS", 5),
+                                   base_delay=app.config.get("LIBINTEL_RETRY_BASE_DELAY", 2),
+                                   max_delay=app.config.get("LIBINTEL_RETRY_MAX_DELAY", 300))
+        attempts = {}
+        missed_eids = []
+        attempts_lock = Lock()
+        status_service.register_status(project_id, status)
+        try:
+            indexer = _create_bulk_indexer(project_id, missed_eids)
+
+            def retry_or_give_up(eid, exception):
+                """puts the EID back into the queue if the failure is transient, returns True if so"""
+                reason = dead_letter_service.classify(exception)
+                with attempts_lock:
+                    attempts[eid] = attempts.get(eid, 0) + 1
+                    attempt = attempts[eid]
+                if retry_policy.should_retry(reason, attempt):
+                    delay = retry_policy.delay(attempt)
+                    app.logger.warning('project {}: retrying EID {} in {:.1f} seconds, reason: {}'
+                                       .format(project_id, eid, delay, reason))
+                    scheduler.submit([eid], delay=delay)
+                    return True
+                app.logger.error('project {}: could not collect scopus data for EID {} after {} attempts, reason: {}'
+                                 .format(project_id, eid, attempt, reason))
+                dead_letter_service.record(project_id, eid, reason, attempt, str(exception))
+                journal_service.record(project_id, journal_service.MISSED, [eid], sync=False)
+                missed_eids.append(eid)
+                return False
+
+            def on_error(batch, exception):
+                eids_of_batch = [_get_identifier(item) for item in batch]
+                app.logger.error('project {}: could not process {} EIDs, reason: {}'.format(project_id,
+                                                                                             len(eids_of_batch),
+                                                                                             type(exception)))
+                journal_service.record(project_id, journal_service.MISSED, eids_of_batch)
+                for eid in eids_of_batch:
+                    dead_letter_service.record(project_id, eid, dead_letter_service.ERROR, message=str(exception))
+                missed_eids.extend(eids_of_batch)
+                status_service.advance_progress(project_id, 0, failed=len(eids_of_batch))
+
+            pipeline = Pipeline(context=app.app_context)
+            pipeline.add_stage('enrich', lambda responses: _enrich(responses, project_id),
+                               workers=app.config.get("LIBINTEL_ENRICHMENT_WORKERS", 2), queue_size=queue_size,
+                               batch_size=batch_size, on_error=on_error)
+            # the records are serialized in threads or, if configured, in a pool of processes
+            processes = app.config.get("LIBINTEL_SERIALIZATION_PROCESSES", 0)
+            serialization_pool = None
+            serialize = _serialize
+            serialization_workers = app.config.get("LIBINTEL_SERIALIZATION_WORKERS", 2)
+            if processes > 0:
+                serialization_pool = ProcessPoolExecutor(max_workers=processes,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                serialize = lambda response: _serialize(response, serialization_pool)
+                serialization_workers = max(serialization_workers, 2 * processes)
+            pipeline.add_stage('serialize', serialize, workers=serialization_workers, queue_size=queue_size,
+                               on_error=on_error)
+            pipeline.add_stage('index', lambda document: indexer.add_source(document[0], document[1]),
+                               workers=app.config.get("LIBINTEL_INDEX_WORKERS", 1), queue_size=queue_size,
+                               on_error=on_error)
+            fetch_statistics = StageStatistics('fetch', len(scheduler.keys) * workers_per_key, scheduler.queue_depth)
+            pipeline.start()
+
+            def work(batch, key_index):
+                with app.app_context():
+                    retried = []
+                    failed = []
+
+                    def on_failure(eid, exception):
+                        if retry_or_give_up(eid, exception):
+                            retried.append(eid)
+                        else:
+                            failed.append(eid)
+
+                    done = len(batch)
+                    try:
+                        if retrieval == 'search':
+                            _fetch_by_search(batch, project, clients.get(key_index), pipeline, on_failure,
+                                             fetch_statistics, max_query_length=max_query_length,
+                                             throttle_pause=throttle_pause, cached_eids=cached_eids, refresh=refresh)
+                        else:
+                            _fetch(batch, project, clients.get(key_index), pipeline, on_failure, fetch_statistics,
+                                   throttle_pause=throttle_pause, cached_eids=cached_eids, refresh=refresh)
+                    except KeyExhaustedError as error:
+                        done -= len(error.remaining)
+                        raise
+                    finally:
+                        # update the progress status, retried EIDs are counted when done
+                        status_service.advance_progress(project_id, done - len(retried), failed=len(failed))
+
+            def on_fetch_error(batch, exception):
+                reason = dead_letter_service.classify(exception)
+                app.logger.error('project {}: could not retrieve {} EIDs, reason: {}'.format(project_id, len(batch),
+                                                                                           reason))
+                journal_service.record(project_id, journal_service.MISSED, batch)
+                for eid in batch:
+                    dead_letter_service.record(project_id, eid, reason, attempts.get(eid, 0) + 1, str(exception))
+                missed_eids.extend(batch)
+                status_service.advance_progress(project_id, 0, failed=len(batch))
+
+            remaining = scheduler.run(list(chunks(eids, batch_size)), work, on_error=on_fetch_error)
+            clients.close()
+            pipeline.close()
+            if serialization_pool is not None:
+                serialization_pool.shutdown()
+            indexer.close()
+            cancelled = job is not None and job.cancel_requested
+            for batch in remaining:
+                if cancelled:
+                    break
+                missed_eids.extend(batch)
+                for eid in batch:
+                    dead_letter_service.record(project_id, eid, dead_letter_service.THROTTLED, attempts.get(eid, 0),
+                                               'all API keys are exhausted')
+            for stage_statistics in [fetch_statistics.__getstate__()] + pipeline.statistics():
+                app.logger.info('project {}: stage {}'.format(project_id, stage_statistics))
+            cache = enrichment_service.get_response_cache()
+            if cache is not None:
+                app.logger.info('project {}: response cache {}'.format(project_id, cache.statistics()))
+            for host, pool_statistics in http_service.statistics().items():
+                app.logger.info('project {}: connection pool of {} {}'.format(project_id, host, pool_statistics))
+            for key_index, number in scheduler.processed.items():
+                app.logger.info('project {}: API key {} processed {} batches with {} requests'
+                                .format(project_id, key_index, number, clients.requests(key_index)))
+            if scheduler.retired_keys:
+                app.logger.warning('project {}: API keys {} are exhausted'.format(project_id, scheduler.retired_keys))
+            if cancelled:
+                app.logger.warning('project {}: data collection cancelled, {} batches left'.format(project_id,
+                                                                                              len(remaining)))
+                cancel_data_collection(project, status, missed_eids)
+            else:
+                finish_data_collection(project, status, missed_eids)
+        except Exception:
+            app.logger.exception('project {}: data collection failed'.format(project_id))
+            cancel_data_collection(project, status, missed_eids, state="FAILED")
+            raise
+        finally:
+            # a failed collection must not leave its status registered
+            status_service.unregister_status(project_id)
+
+
+def collect_references(eids, project, status, keys, app, sample_size):
+    """
+    collects the references of a list of EIDs and counts how often each reference occurs. The workers of all API keys
+    take batches of EIDs from a shared queue and add the references to one counter, so the memory used depends on the
+    number of distinct references only. While the collection is running, the most frequent references found so far are
+    saved every LIBINTEL_REFERENCES_SAVE_INTERVAL seconds.
+    :param eids: the list of EIDs
+    :param project: the current project
+    :param status: the status object of the current collection
+    :param keys: a single API-key or a tuple of API-keys
+    :param app: the app object to retrieve the context from
+    :param sample_size: the number of most frequent references to save
+    """
+    with app.app_context():
+        project_id = project.project_id
+        batch_size = app.config.get("LIBINTEL_REFERENCES_BATCH_SIZE", 25)
+        save_interval = app.config.get("LIBINTEL_REFERENCES_SAVE_INTERVAL", 30)
+        throttle_pause = app.config.get("LIBINTEL_SCOPUS_THROTTLE_PAUSE", 60)
+        workers_per_key = app.config.get("LIBINTEL_SCOPUS_WORKERS_PER_KEY", 1)
+        scheduler = KeyScheduler(keys, workers_per_key=workers_per_key,
+                                 rate=app.config.get("LIBINTEL_SCOPUS_REQUESTS_PER_SECOND"))
+        clients = _ScopusClients(scheduler, app.config.get("LIBINTEL_SCOPUS_TIMEOUT", 60))
+        job = job_service.get_current_job()
+        if job is not None:
+            job.on_cancel(scheduler.cancel)
+        references = Counter()
+        missed_eids = []
+        lock = Lock()
+        last_saved = [time.monotonic()]
+        status_service.register_status(project_id, status)
+        try:
+            def work(batch, key_index):
+                with app.app_context():
+                    done = len(batch)
+                    failed = []
+                    try:
+                        _fetch_references(batch, project_id, clients.get(key_index), references, lock, failed,
+                                          throttle_pause=throttle_pause)
+                    except KeyExhaustedError as error:
+                        done -= len(error.remaining)
+                        raise
+                    finally:
+                        status_service.advance_progress(project_id, done, failed=len(failed))
+                        with lock:
+                            missed_eids.extend(failed)
+                            is_due = time.monotonic() - last_saved[0] >= save_interval
+                            if is_due:
+                                last_saved[0] = time.monotonic()
+                        if is_due:
+                            _save_references(project_id, references, lock, sample_size)
+
+            remaining = scheduler.run(list(chunks(eids, batch_size)), work)
+            clients.close()
+            cancelled = job is not None and job.cancel_requested
+            for batch in remaining:
+                missed_eids.extend(batch)
+            if scheduler.retired_keys:
+                app.logger.warning('project {}: API keys {} are exhausted'.format(project_id, scheduler.retired_keys))
+            app.logger.info('project {}: found {} distinct references'.format(project_id, len(references)))
+            _save_references(project_id, references, lock, sample_size)
+            eids_service.save_eid_list(project_id, missed_eids, prefix='missed_')
+
+            # set the status and the project booleans and save them to disk
+            status.status = "CANCELLED" if cancelled else "DATA_COLLECTED"
+            status_service.save_status(project_id, status)
+            status_service.unregister_status(project_id)
+            project.isReferencesCollecting = False
+            project.isReferencesCollected = not cancelled
+            project_service.save_project(project)
+        except Exception:
+            app.logger.exception('project {}: reference collection failed'.format(project_id))
+            status.status = "FAILED"
+            status_service.save_status(project_id, status)
+            project.isReferencesCollecting = False
+            project.isReferencesCollected = False
+            project_service.save_project(project)
+            raise
+        finally:
+            # a failed collection must not leave its status registered
+            status_service.unregister_status(project_id)
+
+
+def collect_batch(eids, project, client, throttle_pause=60, refresh=True):
+    """
+    collects the data for a batch of EIDs in the calling thread, as done by the distributed workers: the records are
+    retrieved with the given ScopusClient, enriched and sent to the elasticsearch index of the project in one bulk
+    request.
+    :param eids: the list of EIDs
+    :param project: the current project
+    :param client: the ScopusClient to retrieve the records with
+    :param throttle_pause: the pause in seconds of a throttled API key
+    :param refresh: the refresh parameter, see scopus_service.get_refresh
+    :return: a tuple of the list of indexed EIDs, a list of (EID, reason code, message) triples of the failed EIDs and
+    a KeyExhaustedError holding the EIDs not retrieved if Scopus rejected the API key, None otherwise
+    """
+    project_id = project.project_id
+    retrieved = _Batch()
+    failures = []
+    exhausted = None
+    try:
+        _fetch(eids, project, client, retrieved,
+               lambda eid, exception: failures.append((eid, dead_letter_service.classify(exception), str(exception))),
+               StageStatistics('fetch'), throttle_pause=throttle_pause, refresh=refresh)
+    except KeyExhaustedError as error:
+        exhausted = error
+    if not retrieved.items:
+        return [], failures, exhausted
+    try:
+        responses = _enrich(retrieved.items, project_id)
+    except Exception as exception:
+        failures.extend((response.id, dead_letter_service.ERROR, str(exception)) for response in retrieved.items)
+        return [], failures, exhausted
+    indexed = []
+
+    def on_index_failure(index_failures):
+        failures.extend((eid, dead_letter_service.INDEX_ERROR, reason) for eid, reason in index_failures)
+
+    with elasticsearch_service.BulkIndexer(project_id, on_success=indexed.extend, on_failure=on_index_failure,
+                                           max_documents=len(responses) + 1,
+                                           max_bytes=app.config.get("LIBINTEL_BULK_BYTES", 10 * 1024 * 1024),
+                                           flush_interval=60) as indexer:
+        for response in responses:
+            try:
+                indexer.add_source(*_serialize(response))
+            except Exception as exception:
+                failures.append((response.id, dead_letter_service.ERROR, str(exception)))
+    return indexed, failures, exhausted
+
+
+def prepare_incremental_collection(project_id, eids):
+    """
+    compares the list of EIDs with the documents in the index of the project. Documents no longer in the list are
+    deleted from the index, all others are kept.
+    :param project_id: the ID of the current project
+    :param eids: the list of EIDs to collect
+    :return: the list of EIDs not yet in the index, in the original order
+    """
+    indexed_eids = elasticsearch_service.get_indexed_ids(project_id)
+    obsolete_eids = indexed_eids - set(eids)
+    deleted = 0
+    if obsolete_eids:
+        deleted = elasticsearch_service.delete_documents(project_id, obsolete_eids)
+    new_eids = [eid for eid in eids if eid not in indexed_eids]
+    app.logger.info('project {}: {} EIDs indexed, {} new, {} removed from the index'
+                    .format(project_id, len(indexed_eids), len(new_eids), deleted))
+    return new_eids
+
+
+def finish_data_collection(project, status, missed_eids):
+    """
+    saves the list of missed EIDs and marks the data collection as finished in the status and the project
+    :param project: the current project
+    :param status: the status object of the current collection
+    :param missed_eids: list of EIDs which could not be collected
+    """
+    eids_service.save_eid_list(project_id=project.project_id, eids=missed_eids, prefix='missed_')
+    status.status = "DATA_COLLECTED"
+    status_service.save_status(project.project_id, status)
+    status_service.unregister_status(project.project_id)
+    project.isDataCollecting = False
+    project.isDataCollected = True
+    project_service.save_project(project)
+
+
+def cancel_data_collection(project, status, missed_eids, state="CANCELLED"):
+    """
+    saves the list of missed EIDs and marks the data collection as cancelled in the status and the project
+    :param project: the current project
+    :param status: the status object of the current collection
+    :param missed_eids: list of EIDs which could not be collected
+    :param state: the final status, e.g. FAILED for a collection which could not be completed
+    """
+    eids_service.save_eid_list(project_id=project.project_id, eids=missed_eids, prefix='missed_')
+    status.status = state
+    status_service.save_status(project.project_id, status)
+    status_service.unregister_status(project.project_id)
+    project.isDataCollecting = False
+    project.isDataCollected = False
+    project_service.save_project(project)
+
+
+# cuts lists into chunks
+# Thanks to Ned Batchelder on Stack overflow (https://stackoverflow.com/questions/312443/how-do-you-split-a-list-into-evenly-sized-chunks)
+def chunks(l, n):
+    """Yield successive n-sized chunks from list l
+    :parameter l inital lists
+    :parameter n number of chunks
+
+    returns an array of arrays
+    """
+    for i in range(0, len(l), n):
+        yield l[i:i + n]
+
+
+def _fetch_by_search(eids, project, client, pipeline, on_failure, statistics, max_query_length=2000, throttle_pause=60,
+                     cached_eids=None, refresh=True):
+    """retrieves the Scopus records for a list of EIDs with EID(... OR ...) searches of up to 25 EIDs and puts them into
+    the pipeline. EIDs not found by the search are retrieved with an AbstractRetrieval. Raises a KeyExhaustedError
+    holding the EIDs not yet processed if Scopus rejects the API-key of the client."""
+    done = 0
+    for search_eids in scopus_service.split_for_search(eids, max_query_length):
+        try:
+            documents = scopus_service.search_documents(search_eids, refresh=refresh, client=client)
+        except Scopus429Error as error:
+            pause = None if 'quota' in str(error).lower() else throttle_pause
+            raise KeyExhaustedError(remaining=eids[done:], pause=pause, message=str(error))
+        except Exception as exception:
+            app.logger.warning('project {}: could not search {} EIDs, retrieving them one by one, reason: {}'
+                               .format(project.project_id, len(search_eids), type(exception)))
+            documents = {}
+        done += len(search_eids)
+        for eid in search_eids:
+            if eid in documents:
+                journal_service.record(project.project_id, journal_service.RETRIEVED, [eid], sync=False)
+                _put(ScopusRecord(documents[eid]), eid, project, pipeline, statistics)
+        try:
+            _fetch([eid for eid in search_eids if eid not in documents], project, client, pipeline, on_failure,
+                   statistics, throttle_pause=throttle_pause, cached_eids=cached_eids, refresh=refresh)
+        except KeyExhaustedError as error:
+            raise KeyExhaustedError(remaining=error.remaining + eids[done:], pause=error.pause, message=str(error))
+
+
+def _fetch(eids, project, client, pipeline, on_failure, statistics, throttle_pause=60, cached_eids=None, refresh=True):
+    """retrieves the Scopus records for a list of EIDs with the given ScopusClient and puts them into the pipeline. EIDs
+    which cannot be retrieved are passed to on_failure together with the exception. Raises a KeyExhaustedError holding
+    the EIDs not yet processed if Scopus rejects the API-key of the client."""
+    if cached_eids is None:
+        cached_eids = set()
+    for idx, eid in enumerate(eids):
+        # records retrieved before a resume are read from the cache
+        refresh_eid = refresh if eid not in cached_eids else False
+
+        # retrieve data from scopus
+        try:
+            scopus_abstract = client.abstract_retrieval(eid, id_type='eid', view="FULL", refresh=refresh_eid)
+            journal_service.record(project.project_id, journal_service.RETRIEVED, [eid], sync=False)
+        except Scopus429Error as error:
+            # hand back the remaining EIDs. if the quota is exceeded the key is retired, otherwise paused
+            pause = None if 'quota' in str(error).lower() else throttle_pause
+            raise KeyExhaustedError(remaining=eids[idx:], pause=pause, message=str(error))
+        except Exception as exception:
+            statistics.add(failed=1)
+            on_failure(eid, exception)
+            continue
+
+        _put(scopus_abstract, eid, project, pipeline, statistics)
+
+
+def _put(scopus_abstract, eid, project, pipeline, statistics):
+    # create new AllResponses object to hold the individual information and hand it to the enrichment stage
+    response = AllResponses(eid, project.name, project_id=project.project_id)
+    response.scopus_abstract_retrieval = scopus_abstract
+    statistics.add(processed=1)
+    pipeline.put(response)
+
+
+def _fetch_references(eids, project_id, client, references, lock, failed, throttle_pause=60):
+    """adds the references of a list of EIDs to the counter. EIDs which cannot be retrieved are added to the list of
+    failed EIDs. Raises a KeyExhaustedError holding the EIDs not yet processed if Scopus rejects the API-key of the
+    client."""
+    for idx, eid in enumerate(eids):
+        try:
+            scopus_abstract = client.abstract_retrieval(eid, view="FULL")
+        except Scopus429Error as error:
+            pause = None if 'quota' in str(error).lower() else throttle_pause
+            raise KeyExhaustedError(remaining=eids[idx:], pause=pause, message=str(error))
+        except Exception as exception:
+            app.logger.error('project {}: could not collect scopus data for EID {}, reason: {}'
+                             .format(project_id, eid, type(exception)))
+            failed.append(eid)
+            continue
+        if scopus_abstract.references is None:
+            app.logger.warning('project {}: no references given in scopus export for EID {}.'.format(project_id, eid))
+            continue
+        with lock:
+            references.update(scopus_abstract.references)
+
+
+def _save_references(project_id, references, lock, sample_size):
+    with lock:
+        most_common = references.most_common(sample_size)
+    counter_service.save_counter(project_id, most_common, 'references_')
+
+
+def _enrich(responses, project_id):
+    """collects the Unpaywall and Altmetric data for a batch of responses concurrently"""
+    enrichment_service.enrich_responses(responses)
+    for response in responses:
+        doi = response.scopus_abstract_retrieval.doi
+        if doi is not None and doi != "":
+            response.scival_data = Scival([])
+    journal_service.record(project_id, journal_service.ENRICHED, [response.id for response in responses], sync=False)
+    return responses
+
+
+def _serialize(response, pool=None):
+    if pool is None:
+        return response.id, elasticsearch_service.to_json(response)
+    return response.id, elasticsearch_service.serialize_in_pool(pool, response)
+
+
+def _create_bulk_indexer(project_id, missed_eids):
+    """creates a bulk indexer for the project. Indexed EIDs are recorded in the progress journal, rejected ones are
+    added to the list of missed EIDs."""
+    def on_success(eids):
+        journal_service.record(project_id, journal_service.INDEXED, eids)
+
+    def on_failure(failures):
+        eids = [eid for eid, _ in failures]
+        for eid, reason in failures:
+            app.logger.error('project {}: could not save EID {} to elasticsearch: {}'.format(project_id, eid, reason))
+            dead_letter_service.record(project_id, eid, dead_letter_service.INDEX_ERROR, message=reason)
+        journal_service.record(project_id, journal_service.MISSED, eids)
+        missed_eids.extend(eids)
+        status_service.advance_progress(project_id, 0, failed=len(eids))
+
+    return elasticsearch_service.BulkIndexer(project_id, on_success=on_success, on_failure=on_failure,
+                                             max_documents=app.config.get("LIBINTEL_BULK_DOCUMENTS", 500),
+                                             max_bytes=app.config.get("LIBINTEL_BULK_BYTES", 10 * 1024 * 1024),
+                                             flush_interval=app.config.get("LIBINTEL_BULK_INTERVAL", 5))
+
+
+class _Batch:
+    """collects the records retrieved by _fetch in place of a pipeline"""
+
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+class _ScopusClients:
+    """creates one ScopusClient per worker thread and API key. The clients acquire the tokens of their API key from the
+    scheduler before each request, records read from the local cache do not count against the rate limit."""
+
+    def __init__(self, scheduler, timeout=60):
+        self._scheduler = scheduler
+        self._timeout = timeout
+        self._local = local()
+        self._clients = []
+        self._lock = Lock()
+
+    def get(self, key_index):
+        clients = self._local.__dict__.setdefault('clients', {})
+        if key_index not in clients:
+            clients[key_index] = ScopusClient(self._scheduler.key(key_index), timeout=self._timeout,
+                                              throttle=lambda: self._scheduler.acquire(key_index))
+            with self._lock:
+                self._clients.append((key_index, clients[key_index]))
+        return clients[key_index]
+
+    def requests(self, key_index):
+        """the number of requests sent with the API key"""
+        with self._lock:
+            return sum(client.requests for index, client in self._clients if index == key_index)
+
+    def close(self):
+        with self._lock:
+            for _, client in self._clients:
+                client.close()
+
+
+def _get_identifier(item):
+    if isinstance(item, AllResponses):
+        return item.id
+    return item[0]
@@ -0,0 +1,105 @@
+import json
+import os
+import socket
+from threading import Lock
+
+import requests
+from flask import current_app as app
+from pybliometrics.scopus.exception import Scopus400Error, Scopus401Error, Scopus403Error, Scopus404Error, \
+    Scopus429Error, Scopus500Error
+
+# reason codes of failed EIDs
+THROTTLED = '429'
+SERVER_ERROR = '5xx'
+TIMEOUT = 'timeout'
+CONNECTION = 'connection'
+NOT_FOUND = 'not-found'
+CLIENT_ERROR = '4xx'
+INDEX_ERROR = 'index'
+ERROR = 'error'
+
+# failures which may disappear when trying again later
+TRANSIENT = (THROTTLED, SERVER_ERROR, TIMEOUT, CONNECTION)
+
+_lock = Lock()
+
+
+def classify(exception):
+    """
+    maps an exception raised while collecting a record to a reason code
+    :param exception: the exception
+    :return: the reason code, one of the constants defined in this module
+    """
+    if isinstance(exception, Scopus429Error):
+        return THROTTLED
+    if isinstance(exception, Scopus404Error):
+        return NOT_FOUND
+    if isinstance(exception, Scopus500Error):
+        return SERVER_ERROR
+    if isinstance(exception, (Scopus400Error, Scopus401Error, Scopus403Error)):
+        return CLIENT_ERROR
+    if isinstance(exception, (requests.exceptions.Timeout, socket.timeout)):
+        return TIMEOUT
+    if isinstance(exception, requests.exceptions.ConnectionError):
+        return CONNECTION
+    if isinstance(exception, requests.exceptions.HTTPError) and exception.response is not None:
+        if exception.response.status_code == 404:
+            return NOT_FOUND
+        if exception.response.status_code >= 500:
+            return SERVER_ERROR
+        return CLIENT_ERROR
+    return ERROR
+
+
+def record(project_id, eid, reason, attempts=1, message=''):
+    """
+    adds an EID which could not be collected to the dead-letter store of the project
+    :param project_id: the ID of the current project
+    :param eid: the EID
+    :param reason: the reason code
+    :param attempts: the number of attempts made
+    :param message: an optional error message
+    """
+    line = json.dumps({'eid': eid, 'reason': reason, 'attempts': attempts, 'message': message}) + '\n'
+    path_to_file = _get_path_to_store(project_id)
+    with _lock:
+        with open(path_to_file, 'a') as store_file:
+            store_file.write(line)
+
+
+def load_dead_letters(project_id):
+    """
+    reads the dead-letter store of the project
+    :param project_id: the ID of the current project
+    :return: a dictionary holding the reason code, the number of attempts and the message for each EID
+    """
+    dead_letters = {}
+    try:
+        with open(_get_path_to_store(project_id)) as store_file:
+            for line in store_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                dead_letters[entry.pop('eid')] = entry
+    except FileNotFoundError:
+        pass
+    return dead_letters
+
+
+def reset_dead_letters(project_id):
+    """deletes the dead-letter store of the project"""
+    with _lock:
+        try:
+            os.remove(_get_path_to_store(project_id))
+        except FileNotFoundError:
+            pass
+
+
+def _get_path_to_store(project_id):
+    with app.app_context():
+        location = app.config.get("LIBINTEL_DATA_DIR")
+    out_dir = location + '/out/' + project_id + '/'
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    return out_dir + 'dead_letters.txt'
@@ -0,0 +1,289 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from threading import Lock
+
+from flask import current_app as app
+
+from model.Project import Project
+from service import data_collector_service, dead_letter_service, job_service, journal_service, scopus_service, \
+    status_service
+from utilities.InMemoryRedis import InMemoryRedis
+from utilities.RedisRateLimiter import RedisRateLimiter
+from utilities.RedisWorkQueue import RedisWorkQueue
+from utilities.RetryPolicy import RetryPolicy
+from utilities.ScopusClient import ScopusClient
+
+_PREFIX = 'libintel:collect'
+
+_clients = {}
+_clients_lock = Lock()
+
+
+def get_redis():
+    """
+    returns the Redis client for the URL in LIBINTEL_REDIS_URL. The URL 'memory://' uses an in-memory stand-in shared
+    by all threads of the process, e.g. for tests or for running the workers inside the application.
+    :return: the Redis client
+    """
+    with app.app_context():
+        url = app.config.get("LIBINTEL_REDIS_URL", 'redis://localhost:6379/0')
+    with _clients_lock:
+        if url not in _clients:
+            if url.startswith('memory://'):
+                _clients[url] = InMemoryRedis()
+            else:
+                import redis
+                _clients[url] = redis.StrictRedis.from_url(url, decode_responses=True)
+        return _clients[url]
+
+
+def get_work_queue(redis=None):
+    """returns the shared queue of EID batches"""
+    with app.app_context():
+        heartbeat_ttl = app.config.get("LIBINTEL_REDIS_HEARTBEAT_TTL", 300)
+    return RedisWorkQueue(redis or get_redis(), _PREFIX, heartbeat_ttl=heartbeat_ttl)
+
+
+def collect(eids, project, status, app, mode='', max_age=None):
+    """
+    collects the data for a list of EIDs with the distributed workers. The EIDs are put into the shared Redis queue in
+    batches, the workers on all machines pull the batches, collect the data with their own API keys and report the
+    indexed and missed EIDs back to Redis. This function coordinates the run: it records the reported EIDs in the
+    progress journal and the dead-letter store of the project, updates the status and returns when all EIDs are done.
+    Batches of workers which stop sending heartbeats are put back into the queue.
+    :param eids: the list of EIDs
+    :param project: the current project
+    :param status: the status object of the current collection
+    :param app: the app object to retrieve the context from
+    :param mode: the collection mode. when resuming, EIDs already retrieved are read from the local Scopus cache
+    :param max_age: the maximum age in days of locally cached Scopus records, overrides the freshness policy
+    """
+    with app.app_context():
+        project_id = project.project_id
+        batch_size = app.config.get("LIBINTEL_ENRICHMENT_BATCH_SIZE", 50)
+        poll_interval = app.config.get("LIBINTEL_REDIS_POLL_INTERVAL", 1)
+        worker_timeout = app.config.get("LIBINTEL_REDIS_WORKER_TIMEOUT", 300)
+        refresh = scopus_service.get_refresh(scopus_service.ABSTRACT, project_id, max_age)
+        cached_eids = set()
+        if mode == 'resume':
+            cached_eids = journal_service.load_progress(project_id)[journal_service.RETRIEVED]
+        redis = get_redis()
+        queue = get_work_queue(redis)
+
+        # items of a former, cancelled run of the project are skipped by the workers
+        run_id = uuid.uuid4().hex
+        redis.set(_key(project_id, 'run'), run_id)
+        for batch in data_collector_service.chunks(eids, batch_size):
+            queue.put({'run': run_id, 'batch': uuid.uuid4().hex, 'project_id': project_id, 'name': project.name,
+                       'eids': batch, 'cached': [eid for eid in batch if eid in cached_eids], 'refresh': refresh})
+        app.logger.info('project {}: put {} EIDs into the shared queue, {} workers available'
+                        .format(project_id, len(eids), len(queue.consumers())))
+        status_service.register_status(project_id, status)
+        job = job_service.get_current_job()
+        missed_eids = []
+        reported = {'done': 0, 'failed': 0}
+        cancelled = False
+        without_workers_since = None
+        while True:
+            _record_results(redis, run_id, project_id, missed_eids)
+            progress = redis.hgetall(_key(run_id, 'progress'))
+            done = int(progress.get('done', 0))
+            failed = int(progress.get('failed', 0))
+            status_service.advance_progress(project_id, done - reported['done'], failed=failed - reported['failed'])
+            reported = {'done': done, 'failed': failed}
+            if done >= len(eids):
+                break
+            if job is not None and job.cancel_requested:
+                cancelled = True
+                break
+            requeued = queue.requeue_orphans()
+            if requeued:
+                app.logger.warning('project {}: put {} batches of lost workers back into the queue'
+                                   .format(project_id, requeued))
+
+            # without any worker the collection would wait forever
+            if queue.consumers():
+                without_workers_since = None
+            elif without_workers_since is None:
+                without_workers_since = time.time()
+                app.logger.warning('project {}: no worker of the distributed collection is running'.format(project_id))
+            elif time.time() - without_workers_since >= worker_timeout:
+                break
+            time.sleep(poll_interval)
+        redis.delete(_key(project_id, 'run'))
+        _record_results(redis, run_id, project_id, missed_eids)
+        redis.delete(_key(run_id, 'progress'), _key(run_id, 'attempts'))
+        if without_workers_since is not None and not cancelled and done < len(eids):
+            app.logger.error('project {}: no worker of the distributed collection for {} seconds, collection stopped'
+                             .format(project_id, worker_timeout))
+            data_collector_service.cancel_data_collection(project, status, missed_eids, state="FAILED")
+            raise RuntimeError('no worker of the distributed collection running')
+        if cancelled:
+            app.logger.warning('project {}: data collection cancelled'.format(project_id))
+            data_collector_service.cancel_data_collection(project, status, missed_eids)
+        else:
+            data_collector_service.finish_data_collection(project, status, missed_eids)
+
+
+def run_worker(app, keys, stop=None, worker_id=None):
+    """
+    runs a worker pulling batches of EIDs from the shared queue until stopped. The worker runs
+    LIBINTEL_SCOPUS_WORKERS_PER_KEY threads for each API key, the rate limit of each key is shared with the workers on
+    other machines through Redis. A key reporting an exceeded quota is retired for all workers.
+    :param app: the app object to retrieve the context from
+    :param keys: a single API key or a tuple of API keys
+    :param stop: an optional threading.Event stopping the worker when set
+    :param worker_id: the ID of the worker, by default host name and process ID
+    """
+    if not isinstance(keys, (tuple, list)):
+        keys = (keys,)
+    stop = stop or threading.Event()
+    worker_id = worker_id or '{}:{}'.format(socket.gethostname(), os.getpid())
+    with app.app_context():
+        workers_per_key = app.config.get("LIBINTEL_SCOPUS_WORKERS_PER_KEY", 1)
+        heartbeat_interval = app.config.get("LIBINTEL_REDIS_HEARTBEAT_TTL", 300) / 3
+        queue = get_work_queue()
+    consumer_ids = []
+    threads = []
+    for key_index, key in enumerate(keys):
+        for number in range(max(1, workers_per_key)):
+            consumer_id = '{}:{}:{}'.format(worker_id, key_index, number)
+            queue.heartbeat(consumer_id)
+            consumer_ids.append(consumer_id)
+            thread = threading.Thread(target=_work, args=(app, key, consumer_id, stop), daemon=True)
+            thread.start()
+            threads.append(thread)
+    with app.app_context():
+        app.logger.info('worker {}: started {} threads'.format(worker_id, len(threads)))
+    while any(thread.is_alive() for thread in threads) and not stop.wait(heartbeat_interval):
+        for consumer_id in consumer_ids:
+            queue.heartbeat(consumer_id)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    for consumer_id in consumer_ids:
+        queue.leave(consumer_id)
+
+
+def _work(app, key, consumer_id, stop):
+    """takes batches from the queue and collects them with the given API key until stopped or the key is retired"""
+    with app.app_context():
+        redis = get_redis()
+        queue = get_work_queue(redis)
+        poll_interval = app.config.get("LIBINTEL_REDIS_POLL_INTERVAL", 1)
+        throttle_pause = app.config.get("LIBINTEL_SCOPUS_THROTTLE_PAUSE", 60)
+        retire_time = app.config.get("LIBINTEL_REDIS_RETIRE_TIME", 86400)
+        retry_policy = RetryPolicy(dead_letter_service.TRANSIENT,
+                                   max_attempts=app.config.get("LIBINTEL_RETRY_MAX_ATTEMPTS", 5),
+                                   base_delay=app.config.get("LIBINTEL_RETRY_BASE_DELAY", 2),
+                                   max_delay=app.config.get("LIBINTEL_RETRY_MAX_DELAY", 300))
+        limiter = RedisRateLimiter(redis, 'libintel:keys', key, app.config.get("LIBINTEL_SCOPUS_REQUESTS_PER_SECOND"))
+        client = ScopusClient(key, throttle=limiter.acquire, timeout=app.config.get("LIBINTEL_SCOPUS_TIMEOUT", 60))
+        while not stop.is_set():
+            if limiter.is_retired():
+                app.logger.warning('worker {}: API key {} is exhausted'.format(consumer_id, limiter.key_id))
+                break
+            taken = queue.take(consumer_id)
+            if taken is None:
+                stop.wait(poll_interval)
+                continue
+            raw, item = taken
+            if redis.get(_key(item['project_id'], 'run')) == item['run']:
+                try:
+                    _collect_batch(redis, queue, client, limiter, item, retry_policy, throttle_pause, retire_time)
+                except Exception as exception:
+                    app.logger.error('worker {}: could not collect batch of project {}, reason: {}'
+                                     .format(consumer_id, item['project_id'], type(exception)))
+                    _retry_batch(redis, queue, item, retry_policy, exception)
+            queue.ack(consumer_id, raw)
+        client.close()
+
+
+def _collect_batch(redis, queue, client, limiter, item, retry_policy, throttle_pause, retire_time):
+    run_id = item['run']
+    project = Project(project_id=item['project_id'], name=item['name'])
+    eids = item['eids']
+    cached = set(item.get('cached', []))
+    refresh = item['refresh']
+
+    # EIDs retrieved before a resume are read from the local cache
+    indexed, failures, exhausted = data_collector_service.collect_batch(
+        [eid for eid in eids if eid in cached], project, client, throttle_pause=throttle_pause, refresh=False)
+    if exhausted is None:
+        indexed_fresh, failures_fresh, exhausted = data_collector_service.collect_batch(
+            [eid for eid in eids if eid not in cached], project, client, throttle_pause=throttle_pause,
+            refresh=refresh)
+        indexed += indexed_fresh
+        failures += failures_fresh
+    else:
+        exhausted.remaining.extend(eid for eid in eids if eid not in cached)
+
+    # hand the EIDs not yet processed back to the queue before the batch is acknowledged
+    if exhausted is not None and exhausted.remaining:
+        queue.put(dict(item, eids=exhausted.remaining))
+        if exhausted.pause is None:
+            limiter.retire(retire_time)
+        else:
+            limiter.pause(exhausted.pause)
+
+    given_up = []
+    for eid, reason, message in failures:
+        attempt = redis.hincrby(_key(run_id, 'attempts'), eid, 1)
+        if retry_policy.should_retry(reason, attempt):
+            queue.put(dict(item, eids=[eid]), delay=retry_policy.delay(attempt))
+        else:
+            given_up.append(json.dumps({'eid': eid, 'reason': reason, 'attempts': attempt, 'message': message}))
+    if indexed:
+        redis.rpush(_key(run_id, 'indexed'), *indexed)
+    if given_up:
+        redis.rpush(_key(run_id, 'missed'), *given_up)
+    redis.hincrby(_key(run_id, 'progress'), 'failed', len(given_up))
+    redis.hincrby(_key(run_id, 'progress'), 'done', len(indexed) + len(given_up))
+
+
+def _retry_batch(redis, queue, item, retry_policy, exception):
+    """puts a failed batch back into the queue after the delay of the retry policy. When all attempts have failed,
+    the EIDs of the batch are reported as missed, so the collection can finish"""
+    run_id = item['run']
+    attempt = redis.hincrby(_key(run_id, 'attempts'), 'batch:' + item['batch'], 1)
+    if attempt < retry_policy.max_attempts:
+        queue.put(item, delay=retry_policy.delay(attempt))
+        return
+    reason = dead_letter_service.classify(exception)
+    given_up = [json.dumps({'eid': eid, 'reason': reason, 'attempts': attempt, 'message': str(exception)})
+                for eid in item['eids']]
+    if given_up:
+        redis.rpush(_key(run_id, 'missed'), *given_up)
+    redis.hincrby(_key(run_id, 'progress'), 'failed', len(given_up))
+    redis.hincrby(_key(run_id, 'progress'), 'done', len(given_up))
+
+
+def _record_results(redis, run_id, project_id, missed_eids):
+    """moves the EIDs reported by the workers to the progress journal and the dead-letter store of the project"""
+    indexed = _pop_all(redis, _key(run_id, 'indexed'))
+    journal_service.record(project_id, journal_service.INDEXED, indexed)
+    missed = []
+    for entry in _pop_all(redis, _key(run_id, 'missed')):
+        dead_letter = json.loads(entry)
+        dead_letter_service.record(project_id, dead_letter['eid'], dead_letter['reason'], dead_letter['attempts'],
+                                   dead_letter['message'])
+        missed.append(dead_letter['eid'])
+    journal_service.record(project_id, journal_service.MISSED, missed)
+    missed_eids.extend(missed)
+
+
+def _pop_all(redis, name):
+    length = redis.llen(name)
+    if length == 0:
+        return []
+    values = redis.lrange(name, 0, length - 1)
+    redis.ltrim(name, length, -1)
+    return values
+
+
+def _key(identifier, name):
+    return '{}:{}:{}'.format(_PREFIX, identifier, name)
@@ -1,18 +1,54 @@
 import json
+import threading
+import time
+from multiprocessing.reduction import ForkingPickler
 
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, helpers
+from pybliometrics.scopus import AbstractRetrieval
 
 from model import AllResponses
 from model.Survey import Survey
 from model.UpdateContainer import UpdateContainer
-from flask import current_app as app
+from flask import current_app as app, has_app_context
 
 es = Elasticsearch('localhost:9200')
 
 
+def to_json(all_responses: AllResponses):
+    """serializes an AllResponses object to the JSON document stored in the index. The function can also run in a
+    separate process, see serialize_in_pool."""
+    return json.dumps(all_responses, cls=PropertyEncoder)
+
+
+def serialize_in_pool(pool, all_responses: AllResponses):
+    """
+    serializes an AllResponses object in a process pool, so the CPU-heavy encoding does not hold the GIL of the
+    collector threads
+    :param pool: a concurrent.futures.ProcessPoolExecutor
+    :param all_responses: the AllResponses object
+    :return: the JSON document
+    """
+    return pool.submit(to_json, all_responses).result()
+
+
+def _restore(cls, state):
+    restored = cls.__new__(cls)
+    restored.__dict__.update(state)
+    return restored
+
+
+def _reduce_with_all_attributes(input_object):
+    return _restore, (type(input_object), input_object.__dict__.copy())
+
+
+# the __getstate__ methods of the model classes drop attributes from the JSON documents. Objects sent to the pool
+# processes keep all their attributes. Altmetric objects hold only indexed fields and are pickled with their state
+ForkingPickler.register(AllResponses.AllResponses, _reduce_with_all_attributes)
+
+
 def send_to_index(all_responses: AllResponses, project_id):
     try:
-        all_responses_json = json.dumps(all_responses, cls=PropertyEncoder)
+        all_responses_json = to_json(all_responses)
         res = es.index(project_id, 'all_data', all_responses_json, all_responses.id, request_timeout=600)
         app.logger.info('saved to index ' + project_id)
     except Exception as exception:
@@ -21,6 +57,137 @@ def send_to_index(all_responses: AllResponses, project_id):
     return res
 
 
+class BulkIndexer:
+    """Collects AllResponses objects and sends them to the elasticsearch index of the project with the bulk API. The
+    buffer is sent when it holds max_documents documents or max_bytes bytes of JSON, or at the latest flush_interval
+    seconds after the first document was added. The indexer can be shared by several collector threads. For each sent
+    batch the IDs of the indexed documents are passed to on_success and the pairs of ID and reason of the rejected
+    documents to on_failure. Besides full documents, partial updates of documents can be sent."""
+
+    @property
+    def indexed(self):
+        return self._indexed
+
+    @property
+    def failed(self):
+        return self._failed
+
+    def __init__(self, project_id, on_success=None, on_failure=None, max_documents=500, max_bytes=10 * 1024 * 1024,
+                 flush_interval=5):
+        self._project_id = project_id
+        self._on_success = on_success
+        self._on_failure = on_failure
+        self._max_documents = max_documents
+        self._max_bytes = max_bytes
+        self._flush_interval = flush_interval
+        self._app = app._get_current_object()
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._first_added = None
+        self._indexed = 0
+        self._failed = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._timer.start()
+
+    def add(self, all_responses: AllResponses):
+        """serializes the AllResponses object and adds it to the buffer"""
+        try:
+            source = to_json(all_responses)
+        except Exception as exception:
+            self._report([], [(all_responses.id, type(exception).__name__)])
+            return
+        self.add_source(all_responses.id, source)
+
+    def add_source(self, identifier, source):
+        """adds an already serialized document to the buffer"""
+        action = {'_index': self._project_id, '_type': 'all_data', '_id': identifier, '_source': source}
+        self._add(action, len(source))
+
+    def update(self, identifier, fields, upsert=True):
+        """
+        adds a partial update of a document to the buffer
+        :param identifier: the ID of the document
+        :param fields: a dictionary holding the fields to set
+        :param upsert: if True, a document holding only these fields is created if the ID is not yet in the index
+        """
+        source = json.dumps(fields)
+        action = {'_op_type': 'update', '_index': self._project_id, '_type': 'all_data', '_id': identifier,
+                  'doc': fields, 'doc_as_upsert': upsert}
+        self._add(action, len(source))
+
+    def flush(self):
+        """sends all buffered documents to elasticsearch"""
+        with self._lock:
+            actions = self._buffer
+            self._buffer = []
+            self._buffer_bytes = 0
+            self._first_added = None
+        if len(actions) == 0:
+            return
+        succeeded = []
+        failed = []
+        try:
+            for ok, item in helpers.streaming_bulk(es, actions, chunk_size=self._max_documents,
+                                                   max_chunk_bytes=self._max_bytes, raise_on_error=False,
+                                                   raise_on_exception=False, request_timeout=600):
+                result = item.get('index') or item.get('update') or item
+                if ok:
+                    succeeded.append(result['_id'])
+                else:
+                    failed.append((result.get('_id'), str(result.get('error', result.get('status')))))
+        except Exception as exception:
+            confirmed = set(succeeded) | {identifier for identifier, _ in failed}
+            failed.extend((action['_id'], type(exception).__name__) for action in actions
+                          if action['_id'] not in confirmed)
+        self._report(succeeded, failed)
+
+    def close(self):
+        """stops the periodic flushing and sends the remaining documents"""
+        self._closed.set()
+        self._timer.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _add(self, action, size):
+        with self._lock:
+            self._buffer.append(action)
+            self._buffer_bytes += size
+            if self._first_added is None:
+                self._first_added = time.monotonic()
+            is_full = len(self._buffer) >= self._max_documents or self._buffer_bytes >= self._max_bytes
+        if is_full:
+            self.flush()
+
+    def _report(self, succeeded, failed):
+        with self._lock:
+            self._indexed += len(succeeded)
+            self._failed += len(failed)
+        with self._app.app_context():
+            if failed:
+                app.logger.error('could not save {} documents to index {}'.format(len(failed), self._project_id))
+            else:
+                app.logger.info('saved {} documents to index {}'.format(len(succeeded), self._project_id))
+            if succeeded and self._on_success is not None:
+                self._on_success(succeeded)
+            if failed and self._on_failure is not None:
+                self._on_failure(failed)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self._flush_interval / 4):
+            with self._lock:
+                is_due = self._first_added is not None and \
+                         time.monotonic() - self._first_added >= self._flush_interval
+            if is_due:
+                self.flush()
+
+
 def save_survey(survey: Survey):
     index = 'survey_' + survey.project_id + '_' + survey.survey_id
     for result in survey.survey_results:
@@ -55,6 +222,88 @@ def save_survey_judgement(judgement, project_id):
         print('could not send scival update')
 
 
+def get_indexed_ids(project_id):
+    """returns the set of IDs of all documents in the index of the project, an empty set if there is no index"""
+    if not es.indices.exists(index=project_id):
+        return set()
+    return {hit['_id'] for hit in helpers.scan(es, index=project_id, query={'query': {'match_all': {}}},
+                                                 _source=False, size=1000, request_timeout=600)}
+
+
+def delete_documents(project_id, identifiers):
+    """
+    deletes documents from the index of the project with the bulk API
+    :param project_id: the ID of the current project
+    :param identifiers: the IDs of the documents to delete
+    :return: the number of deleted documents
+    """
+    actions = ({'_op_type': 'delete', '_index': project_id, '_type': 'all_data', '_id': identifier}
+               for identifier in identifiers)
+    deleted = 0
+    for ok, item in helpers.streaming_bulk(es, actions, chunk_size=500, raise_on_error=False,
+                                           raise_on_exception=False, request_timeout=600):
+        result = item.get('delete', item)
+        if ok:
+            deleted += 1
+        elif result.get('status') != 404:
+            app.logger.error('could not delete document {} from index {}: {}'.format(result.get('_id'), project_id,
+                                                                                     result.get('error')))
+    return deleted
+
+
+def tag_query_ids(project_id, eids_by_query, batch_size=1000):
+    """
+    adds the IDs of the queries which found a document to its query_id field, stored as keyword array. The current
+    values are read with multi-get requests in batches, only documents gaining a query ID are updated with the bulk
+    API. Values of the former format, a string of query IDs joined with '; ', are converted.
+    :param project_id: the ID of the current project
+    :param eids_by_query: a dictionary holding the list of EIDs found by each query
+    :param batch_size: the number of documents read and updated at once
+    :return: a dictionary holding the numbers of updated, unchanged, missing and failed documents
+    """
+    query_ids_by_eid = {}
+    for query_id, eids in eids_by_query.items():
+        for eid in eids:
+            query_ids_by_eid.setdefault(eid, set()).add(query_id)
+
+    # indices created after this change store the query IDs as keywords, older ones keep their text field which also
+    # holds arrays
+    es.indices.put_mapping(index=project_id, doc_type='all_data',
+                           body={'properties': {'query_id': {'type': 'keyword'}}}, ignore=[400, 404])
+    counts = {'updated': 0, 'unchanged': 0, 'missing': 0, 'failed': 0}
+    failures = []
+    eids = list(query_ids_by_eid)
+    with BulkIndexer(project_id, on_failure=failures.extend, max_documents=batch_size) as indexer:
+        for index in range(0, len(eids), batch_size):
+            batch = eids[index:index + batch_size]
+            response = es.mget(index=project_id, doc_type='all_data', body={'ids': batch}, _source=['query_id'],
+                               request_timeout=600)
+            for document in response['docs']:
+                if not document.get('found'):
+                    counts['missing'] += 1
+                    continue
+                stored = document.get('_source', {}).get('query_id')
+                query_ids = query_ids_by_eid[document['_id']]
+                if isinstance(stored, list) and query_ids.issubset(stored):
+                    counts['unchanged'] += 1
+                    continue
+                indexer.update(document['_id'], {'query_id': sorted(query_ids.union(_as_list(stored)))},
+                               upsert=False)
+    counts['updated'] = indexer.indexed
+    counts['failed'] = indexer.failed
+    for eid, reason in failures:
+        app.logger.error('could not set the query IDs of {} in index {}: {}'.format(eid, project_id, reason))
+    return counts
+
+
+def _as_list(query_id):
+    if not query_id:
+        return []
+    if isinstance(query_id, list):
+        return query_id
+    return [value for value in query_id.split('; ') if value]
+
+
 def delete_index(project_id):
     es.indices.delete(project_id, ignore=[400, 404])
 
@@ -77,42 +326,88 @@ class HiddenEncoder(json.JSONEncoder):
         return return_object
 
 
-class PropertyEncoder(json.JSONEncoder):
-    def default(self, input_object):
-        keys = dir(input_object)
+# the fields written to the index for the types without own __getstate__
+_UNPAYWALL_FIELDS = ('doi', 'doi_resolver', 'evidence', 'free_fulltext_url', 'is_boai_license', 'is_free_to_read',
+                     'is_subscription_journal', 'license', 'oa_color', 'reported_noncompliant_copies', 'title')
+_ABSTRACT_RETRIEVAL_FIELDS = ('abstract', 'affiliation', 'authkeywords', 'authorgroup', 'authors', 'citedby-count',
+                              'citedby-link', 'correspondence', 'coverDate', 'description', 'doi', 'eid', 'endingPage',
+                              'funding', 'isbn', 'issn', 'identifier', 'idxterms', 'issueIdentifier', 'issuetitle',
+                              'language', 'pageRange', 'publicationName', 'publisher', 'publisheraddress', 'refcount',
+                              'references', 'scopus_link', 'self_link', 'source_id', 'title',
+                              'sourcetitle_abbreviation', 'srctype', 'startingPage', 'subject_areas', 'url', 'volume',
+                              'website', 'auid', 'indexed_name', 'surname', 'given_name', 'affiliation')
+_SCOPUS_AUTHOR_FIELDS = ('indexed_name', 'given_name', 'surname', 'initials', 'author_url', 'auid', 'scopusid', 'seq')
+
+_extractors = {}
+
+
+def _extract_state(input_object):
+    return {key.lstrip('_'): value for key, value in input_object.__getstate__().items()}
+
+
+def _extract_document(input_object):
+    return input_object.__getstate__()
+
+
+def _extract_nothing(input_object):
+    return {}
+
+
+def _create_field_extractor(input_type, fields, skip_errors=False):
+    """creates a function reading the given fields of an object of the given type. The fields are looked up once and
+    kept in alphabetical order, as returned by dir()."""
+    names = tuple(name for name in dir(input_type) if name in fields)
+
+    def extract(input_object):
         return_object = {}
-        own_classes = ['AllResponses', 'Altmetric', 'Scival']
-        object_type = type(input_object).__name__
-        if object_type in own_classes:
-            for key, value in input_object.__getstate__().items():
-                return_object[key.lstrip('_')] = value
-                continue
+        for name in names:
+            return_object[name] = getattr(input_object, name)
+        return return_object
+
+    def extract_skipping_errors(input_object):
+        return_object = {}
+        for name in names:
+            try:
+                return_object[name] = getattr(input_object, name)
+            except TypeError:
+                print('could not save key: ' + name)
+            except AttributeError:
+                if has_app_context():
+                    app.logger.error('could not save key: ' + name)
+                else:
+                    print('could not save key: ' + name)
+        return return_object
+
+    return extract_skipping_errors if skip_errors else extract
+
+
+def _get_extractor(input_type):
+    """returns the cached function converting objects of the given type into dictionaries"""
+    extractor = _extractors.get(input_type)
+    if extractor is None:
+        object_type = input_type.__name__
+        if object_type in ('AllResponses', 'Scival'):
+            extractor = _extract_state
+        elif object_type == 'Altmetric':
+            # the state of an Altmetric object is the index document
+            extractor = _extract_document
         elif object_type == 'Unpaywall':
-            fields = ['doi', 'doi_resolver', 'evidence', 'free_fulltext_url', 'is_boai_license',
-                      'is_free_to_read', 'is_subscription_journal', 'license', 'oa_color',
-                      'reported_noncompliant_copies', 'title']
-            for key in keys:
-                if key in fields:
-                    return_object[key] = getattr(input_object, key)
+            extractor = _create_field_extractor(input_type, _UNPAYWALL_FIELDS)
         elif object_type == 'AbstractRetrieval':
-            fields = ['abstract', 'affiliation', 'authkeywords', 'authorgroup', 'authors', 'citedby-count',
-                      'citedby-link', 'correspondence', 'coverDate', 'description', 'doi', 'eid', 'endingPage',
-                      'funding', 'isbn', 'issn', 'identifier', 'idxterms', 'issueIdentifier',
-                      'issuetitle', 'language', 'pageRange', 'publicationName', 'publisher', 'publisheraddress',
-                      'refcount', 'references', 'scopus_link', 'self_link', 'source_id', 'title',
-                      'sourcetitle_abbreviation', 'srctype', 'startingPage', 'subject_areas', 'url',
-                      'volume', 'website', 'auid', 'indexed_name', 'surname', 'given_name', 'affiliation']
-            for key in keys:
-                if key in fields:
-                    try:
-                        return_object[key] = getattr(input_object, key)
-                    except TypeError:
-                        print('could not save key: ' + key)
-                    except AttributeError:
-                        app.logger.error('could not save key: ' + key)
+            extractor = _create_field_extractor(input_type, _ABSTRACT_RETRIEVAL_FIELDS, skip_errors=True)
+        elif object_type == 'ScopusRecord':
+            # records built from search results are stored with the fields of an AbstractRetrieval
+            extractor = _create_field_extractor(AbstractRetrieval, _ABSTRACT_RETRIEVAL_FIELDS, skip_errors=True)
         elif object_type == '_ScopusAuthor':
-            fields = ['indexed_name', 'given_name', 'surname', 'initials', 'author_url', 'auid', 'scopusid', 'seq']
-            for key in keys:
-                if key in fields:
-                    return_object[key] = getattr(input_object, key)
-        return return_object
+            extractor = _create_field_extractor(input_type, _SCOPUS_AUTHOR_FIELDS)
+        else:
+            extractor = _extract_nothing
+        _extractors[input_type] = extractor
+    return extractor
+
+
+class PropertyEncoder(json.JSONEncoder):
+    """Encodes the model objects with the extractor of their type, see _get_extractor"""
+
+    def default(self, input_object):
+        return _get_extractor(type(input_object))(input_object)
@@ -0,0 +1,190 @@
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import requests
+from flask import current_app as app
+
+from altmetric.Altmetric import Altmetric
+from service import http_service, unpaywall_service
+from unpaywall.Unpaywall import Unpaywall
+from utilities.ResponseCache import ResponseCache
+from utilities.SingleFlight import SingleFlight
+
+UNPAYWALL = 'unpaywall'
+ALTMETRIC = 'altmetric'
+
+_DOI_PREFIX = re.compile(r'^(https?://(dx\.)?doi\.org/|doi:)', re.IGNORECASE)
+
+_caches = {}
+_caches_lock = Lock()
+
+# requests in flight, shared by the enrichment workers of all projects
+_in_flight = SingleFlight()
+
+
+def enrich_responses(responses):
+    """
+    collects the Unpaywall and Altmetric data for a list of AllResponses objects at once and sets the
+    unpaywall_response and altmetric_response fields. Responses without a DOI are left untouched. Each normalized DOI is
+    requested once, the result is attached to all responses sharing it. DOIs already requested by another thread, e.g.
+    the enrichment of another batch or project, are not requested again but wait for the result of that request.
+    :param responses: the AllResponses objects holding a scopus abstract retrieval
+    :return: the list of enriched responses
+    """
+    with app.app_context():
+        unpaywall_url = app.config.get("UNPAYWALL_API_URL", "https://api.unpaywall.org/my/request")
+        altmetric_url = app.config.get("ALTMETRIC_URL", "https://api.altmetric.com/v1")
+        email = app.config.get("LIBINTEL_USER_EMAIL")
+        concurrency = {UNPAYWALL: app.config.get("LIBINTEL_UNPAYWALL_CONCURRENCY", 8),
+                       ALTMETRIC: app.config.get("LIBINTEL_ALTMETRIC_CONCURRENCY", 4)}
+        timeout = app.config.get("LIBINTEL_ENRICHMENT_TIMEOUT", 30)
+    dois = set(normalize_doi(_get_doi(response)) for response in responses)
+    dois.discard(None)
+
+    # read the responses present in the cache, only the missing ones are requested
+    cache = get_response_cache()
+    results = {}
+    providers = (UNPAYWALL, ALTMETRIC)
+    if unpaywall_service.is_offline():
+        # the Unpaywall data are read from the local snapshot, no request is sent
+        providers = (ALTMETRIC,)
+        for doi, response_json in unpaywall_service.lookup(dois).items():
+            results[(UNPAYWALL, doi)] = response_json
+    if cache is not None:
+        for provider in providers:
+            for doi, response_json in cache.get_many(provider, dois).items():
+                results[(provider, doi)] = response_json
+    owned, shared = _in_flight.claim([(provider, doi) for provider in (UNPAYWALL, ALTMETRIC) for doi in dois
+                                      if (provider, doi) not in results])
+    fetched = {}
+    try:
+        urls = {}
+        for provider, doi in owned:
+            if provider == UNPAYWALL:
+                urls[(provider, doi)] = '{}/{}?email={}'.format(unpaywall_url.rstrip('/'), doi, email)
+            else:
+                urls[(provider, doi)] = '{}/doi/{}'.format(altmetric_url.rstrip('/'), doi)
+        fetched = fetch_all(urls, concurrency, timeout)
+
+        # failed requests are not cached, negative results are
+        if cache is not None:
+            for provider in (UNPAYWALL, ALTMETRIC):
+                cache.put_many(provider, {doi: response_json for (response_provider, doi), response_json
+                                          in fetched.items() if response_provider == provider and
+                                          response_json is not None})
+    finally:
+        _in_flight.resolve(owned, fetched)
+    results.update(fetched)
+    for key, future in shared.items():
+        results[key] = future.result()
+    for response in responses:
+        doi = _get_doi(response)
+        normalized = normalize_doi(doi)
+        if normalized is None:
+            continue
+        response.unpaywall_response = Unpaywall(doi, response_json=_or_empty(results[(UNPAYWALL, normalized)]))
+        response.altmetric_response = Altmetric(doi, response_json=_or_empty(results[(ALTMETRIC, normalized)]))
+    app.logger.info('enriched {} records with {} distinct DOIs, {} requests sent, {} shared with other requests'
+                    .format(len(responses), len(dois), len(fetched), len(shared)))
+    return responses
+
+
+def normalize_doi(doi):
+    """
+    normalizes a DOI for the lookup, removing a resolver prefix and surrounding whitespace. DOIs are case-insensitive and
+    converted to lower case.
+    :param doi: the DOI as given in the record
+    :return: the normalized DOI, None if it is empty
+    """
+    if doi is None:
+        return None
+    doi = _DOI_PREFIX.sub('', doi.strip()).strip().lower()
+    return doi or None
+
+
+def get_response_cache():
+    """
+    returns the persistent cache for the Unpaywall and Altmetric responses as configured for the application
+    :return: the response cache, None if caching is disabled
+    """
+    with app.app_context():
+        if not app.config.get("LIBINTEL_RESPONSE_CACHE_ENABLED", True):
+            return None
+        path = app.config.get("LIBINTEL_RESPONSE_CACHE")
+        if path is None:
+            location = app.config.get("LIBINTEL_DATA_DIR")
+            if location is None:
+                return None
+            path = location + '/cache/responses.sqlite'
+        ttl_days = app.config.get("LIBINTEL_RESPONSE_CACHE_TTL_DAYS", {UNPAYWALL: 30, ALTMETRIC: 7})
+        negative_ttl_days = app.config.get("LIBINTEL_RESPONSE_CACHE_NEGATIVE_TTL_DAYS", {UNPAYWALL: 7, ALTMETRIC: 1})
+        max_entries = app.config.get("LIBINTEL_RESPONSE_CACHE_MAX_ENTRIES", 1000000)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path,
+                                          ttl={provider: days * 86400 for provider, days in ttl_days.items()},
+                                          negative_ttl={provider: days * 86400
+                                                        for provider, days in negative_ttl_days.items()},
+                                          max_entries=max_entries)
+        return _caches[path]
+
+
+def fetch_all(urls, concurrency, timeout=30):
+    """
+    retrieves a set of URLs concurrently over the shared HTTP connection pool, limiting the number of simultaneous
+    requests for each provider.
+    :param urls: a dictionary with keys of the form (provider, identifier) and the URL to query as value
+    :param concurrency: a dictionary holding the maximum number of simultaneous requests for each provider
+    :param timeout: the timeout of an individual request in seconds
+    :return: a dictionary with the same keys holding the JSON response, an empty dict if the API does not know the
+    identifier or None if the request failed
+    """
+    if not urls:
+        return {}
+    pool = http_service.get_pool()
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(_fetch_all(loop, pool, urls, concurrency, timeout))
+    finally:
+        loop.close()
+
+
+async def _fetch_all(loop, pool, urls, concurrency, timeout):
+    semaphores = {provider: asyncio.Semaphore(concurrency.get(provider, 1)) for provider, _ in urls}
+    max_workers = sum(concurrency.get(provider, 1) for provider in semaphores)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        keys = list(urls)
+        tasks = [_fetch(loop, executor, pool, semaphores[key[0]], urls[key], timeout) for key in keys]
+        results = await asyncio.gather(*tasks)
+    return dict(zip(keys, results))
+
+
+async def _fetch(loop, executor, pool, semaphore, url, timeout):
+    async with semaphore:
+        try:
+            r = await loop.run_in_executor(executor, lambda: pool.get(url, timeout=timeout))
+        except requests.RequestException as exception:
+            app.logger.warning('could not retrieve {}, reason: {}'.format(url, type(exception)))
+            return None
+    if r.status_code == 200:
+        try:
+            return r.json()
+        except ValueError:
+            return None
+    if r.status_code == 404:
+        return {}
+    return None
+
+
+def _get_doi(response):
+    if response.scopus_abstract_retrieval is None:
+        return None
+    return response.scopus_abstract_retrieval.doi
+
+
+def _or_empty(response_json):
+    if response_json is None:
+        return {}
+    return response_json
@@ -0,0 +1,48 @@
+from threading import Lock
+
+from flask import current_app as app
+
+from utilities.HttpPool import HttpPool
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_pool():
+    """
+    returns the HTTP connection pool shared by the clients of the external APIs (Unpaywall, Altmetric, CrossRef and
+    SurveyGizmo), created with the pool sizes and timeout configured for the application
+    :return: the shared HttpPool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            with app.app_context():
+                _pool = HttpPool(pool_size=app.config.get("LIBINTEL_HTTP_POOL_SIZE", 20),
+                                 host_pool_sizes=app.config.get("LIBINTEL_HTTP_HOST_POOL_SIZES", {}),
+                                 max_hosts=app.config.get("LIBINTEL_HTTP_MAX_HOSTS", 10),
+                                 timeout=app.config.get("LIBINTEL_HTTP_TIMEOUT", 30),
+                                 max_retries=app.config.get("LIBINTEL_HTTP_MAX_RETRIES", 0))
+        return _pool
+
+
+def get(url, **kwargs):
+    """sends a GET request over the shared connection pool, see requests.get"""
+    return get_pool().get(url, **kwargs)
+
+
+def statistics():
+    """returns the usage of the shared connection pools for each host, see HttpPool.statistics"""
+    with _pool_lock:
+        if _pool is None:
+            return {}
+    return _pool.statistics()
+
+
+def reset_pool():
+    """closes the shared connection pool, the next request creates a new one with the current configuration"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
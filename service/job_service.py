@@ -0,0 +1,131 @@
+import json
+import os
+from threading import Lock
+
+from flask import current_app as app
+
+from service import project_service
+from utilities.JobQueue import JobQueue, FAILED, QUEUED, RUNNING
+
+_queue = None
+_queue_lock = Lock()
+_history_lock = Lock()
+
+
+def get_job_queue():
+    """
+    returns the job queue of the application, created with the number of workers, the limit of running jobs per
+    project and the size of the history configured for the application
+    :return: the JobQueue
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            with app.app_context():
+                flask_app = app._get_current_object()
+                location = app.config.get("LIBINTEL_DATA_DIR")
+                _queue = JobQueue(workers=app.config.get("LIBINTEL_JOB_WORKERS", 4),
+                                  project_limit=app.config.get("LIBINTEL_JOB_PROJECT_LIMIT", 1),
+                                  history_size=app.config.get("LIBINTEL_JOB_HISTORY_SIZE", 1000),
+                                  context=app._get_current_object().app_context,
+                                  on_finished=lambda job: _on_finished(flask_app, location, job))
+        return _queue
+
+
+def submit(project_id, name, function, *args, **kwargs):
+    """
+    runs a function in the job queue of the application
+    :param project_id: the ID of the project the job belongs to
+    :param name: a short name of the job, e.g. 'collect_data'
+    :param function: the function to run, called with the remaining arguments in an app context
+    :return: the job
+    """
+    job = get_job_queue().submit(project_id, name, function, *args, **kwargs)
+    app.logger.info('project {}: submitted job {} ({})'.format(project_id, job.job_id, name))
+    return job
+
+
+def get_job(job_id):
+    return get_job_queue().get(job_id)
+
+
+def cancel_job(job_id):
+    """cancels a queued or running job, returns the job or None if it is unknown"""
+    return get_job_queue().cancel(job_id)
+
+
+def list_jobs(project_id=None):
+    return get_job_queue().jobs(project_id)
+
+
+def has_active_jobs(project_id):
+    """returns True if a job of the project is queued or running"""
+    return any(job.state in (QUEUED, RUNNING) for job in get_job_queue().jobs(project_id))
+
+
+def statistics():
+    return get_job_queue().statistics()
+
+
+def get_current_job():
+    """returns the job run by the current thread, None if the function does not run as a job"""
+    return JobQueue.current_job()
+
+
+def is_cancelled():
+    """returns True if the function runs as a job and the job has been cancelled, so the function should return"""
+    job = JobQueue.current_job()
+    return job is not None and job.cancel_requested
+
+
+def load_history(project_id):
+    """
+    reads the finished jobs of a project, including those of former runs of the application
+    :param project_id: the ID of the project
+    :return: the list of finished jobs as dictionaries, the newest first
+    """
+    with app.app_context():
+        location = app.config.get("LIBINTEL_DATA_DIR")
+    jobs = []
+    try:
+        with open(_get_path_to_history(location, project_id)) as history_file:
+            for line in history_file:
+                try:
+                    jobs.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return list(reversed(jobs))
+
+
+def _on_finished(flask_app, location, job):
+    _record_history(location, job)
+    if job.state == FAILED:
+        with flask_app.app_context():
+            _reset_project(job.project_id)
+
+
+def _reset_project(project_id):
+    """clears the flags of the running collections of a project whose job failed"""
+    try:
+        project = project_service.load_project(project_id)
+    except FileNotFoundError:
+        return
+    project.isEidsCollecting = False
+    project.isDataCollecting = False
+    project.isReferencesCollecting = False
+    project_service.save_project(project)
+
+
+def _record_history(location, job):
+    path_to_file = _get_path_to_history(location, job.project_id)
+    with _history_lock:
+        if not os.path.exists(os.path.dirname(path_to_file)):
+            os.makedirs(os.path.dirname(path_to_file))
+        with open(path_to_file, 'a') as history_file:
+            history_file.write(json.dumps(job.__getstate__()) + '\n')
+
+
+def _get_path_to_history(location, project_id):
+    return location + '/out/' + project_id + '/jobs.txt'
@@ -0,0 +1,83 @@
+import os
+from threading import Lock
+
+from flask import current_app as app
+
+RETRIEVED = 'RETRIEVED'
+ENRICHED = 'ENRICHED'
+INDEXED = 'INDEXED'
+MISSED = 'MISSED'
+
+_lock = Lock()
+
+
+def record(project_id, stage, eids, sync=True):
+    """
+    appends the EIDs which passed the given stage of the data collection to the progress journal of the project. The
+    journal is append-only, so a crash can at most lose the last, incomplete line.
+    :param project_id: the ID of the current project
+    :param stage: the stage passed, one of RETRIEVED, ENRICHED, INDEXED or MISSED
+    :param eids: the list of EIDs
+    :param sync: if True, the journal is forced to disk before returning
+    """
+    if len(eids) == 0:
+        return
+    lines = ''.join('{} {}\n'.format(stage, eid) for eid in eids)
+    path_to_file = _get_path_to_journal(project_id)
+    with _lock:
+        with open(path_to_file, 'a') as journal_file:
+            journal_file.write(lines)
+            journal_file.flush()
+            if sync:
+                os.fsync(journal_file.fileno())
+
+
+def load_progress(project_id):
+    """
+    reads the progress journal of the project
+    :param project_id: the ID of the current project
+    :return: a dictionary holding the set of EIDs for each stage
+    """
+    progress = {RETRIEVED: set(), ENRICHED: set(), INDEXED: set(), MISSED: set()}
+    try:
+        with open(_get_path_to_journal(project_id)) as journal_file:
+            for line in journal_file:
+                # skip lines torn by a crash while writing
+                if not line.endswith('\n'):
+                    continue
+                parts = line.split()
+                if len(parts) != 2:
+                    continue
+                progress.setdefault(parts[0], set()).add(parts[1])
+    except FileNotFoundError:
+        pass
+    return progress
+
+
+def get_pending_eids(project_id, eids):
+    """
+    filters the list of EIDs for those not yet indexed according to the progress journal
+    :param project_id: the ID of the current project
+    :param eids: the list of EIDs to collect
+    :return: the list of EIDs still to be collected, in the original order
+    """
+    indexed = load_progress(project_id)[INDEXED]
+    return [eid for eid in eids if eid not in indexed]
+
+
+def reset_journal(project_id):
+    """deletes the progress journal of the project, e.g. when a collection starts from scratch"""
+    with _lock:
+        try:
+            os.remove(_get_path_to_journal(project_id))
+        except FileNotFoundError:
+            pass
+
+
+def _get_path_to_journal(project_id):
+    with app.app_context():
+        location = app.config.get("LIBINTEL_DATA_DIR")
+    out_dir = location + '/out/' + project_id + '/'
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    return out_dir + 'progress_journal.txt'
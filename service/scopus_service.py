@@ -1,13 +1,105 @@
+from flask import abort, current_app as app
 from pybliometrics import scopus
 
+from utilities import utils
 
-def execute_query(scopus_queries):
+# the types of Scopus calls, each with its own maximum age of cached responses
+SEARCH = 'search'
+SAMPLE = 'sample'
+ABSTRACT = 'abstract'
+CROSSREF = 'crossref'
+
+# the default maximum age of cached responses in days
+_MAX_AGE = {SEARCH: 1, SAMPLE: 1, ABSTRACT: 1, CROSSREF: 30}
+
+
+def get_refresh(call_type, project_id=None, max_age=None):
+    """
+    returns the refresh parameter of a pybliometrics call according to the freshness policy. The maximum age in days of
+    the locally cached responses is given with the request, or set for the project in LIBINTEL_SCOPUS_PROJECT_MAX_AGE,
+    or for all projects in LIBINTEL_SCOPUS_MAX_AGE, in this order. A maximum age of 0 always refreshes the response,
+    None uses the cached response regardless of its age.
+    :param call_type: the type of the call, one of SEARCH, SAMPLE, ABSTRACT or CROSSREF
+    :param project_id: the ID of the current project
+    :param max_age: the maximum age in days given with the request, overrides the configuration
+    :return: True, False or the maximum age in days
+    """
+    if max_age is None:
+        with app.app_context():
+            max_ages = dict(_MAX_AGE)
+            max_ages.update(app.config.get("LIBINTEL_SCOPUS_MAX_AGE", {}))
+            max_ages.update(app.config.get("LIBINTEL_SCOPUS_PROJECT_MAX_AGE", {}).get(project_id, {}))
+        max_age = max_ages.get(call_type, 0)
+    if max_age is None:
+        return False
+    max_age = int(max_age)
+    if max_age <= 0:
+        return True
+    return max_age
+
+
+def get_max_age(args):
+    """
+    reads the maximum age in days of cached responses given with a request as parameter max_age. Aborts the request
+    with 400 if the value is not a whole number of days.
+    :param args: the arguments of the request
+    :return: the maximum age in days, None if the request does not give one
+    """
+    max_age = args.get('max_age')
+    if max_age is None:
+        return None
+    try:
+        return int(max_age)
+    except ValueError:
+        abort(400, 'invalid max_age {!r}, expected a number of days'.format(max_age))
+
+
+def execute_query(scopus_queries, refresh=True):
     eids = []
     for search_string in scopus_queries.search_strings:
-        search = scopus.ScopusSearch(search_string, refresh=True)
+        search = scopus.ScopusSearch(search_string, refresh=refresh)
         print(search)
         eids = eids + search.get_eids()
 
     # convert to set in order to remove duplicates
     eids = set(eids)
-    return eids
\ No newline at end of file
+    return eids
+
+
+def split_for_search(eids, max_query_length=2000, max_records=25):
+    """
+    splits a list of EIDs into lists to be retrieved with one EID(... OR ...) search each
+    :param eids: the list of EIDs
+    :param max_query_length: the maximum number of characters of a search string
+    :param max_records: the maximum number of EIDs per search, the number of results per request of the COMPLETE view
+    :return: a generator of lists of EIDs
+    """
+    batch = []
+    length = len('EID()')
+    for eid in eids:
+        added = len(eid) + len(' OR ') if batch else len(eid)
+        if batch and (len(batch) >= max_records or length + added > max_query_length):
+            yield batch
+            batch = []
+            length = len('EID()')
+            added = len(eid)
+        batch.append(eid)
+        length += added
+    if batch:
+        yield batch
+
+
+def search_documents(eids, refresh=True, client=None):
+    """
+    retrieves the Scopus Search results for a list of EIDs with one search
+    :param eids: the list of EIDs
+    :param refresh: the refresh parameter, see get_refresh
+    :param client: an optional ScopusClient sending the search with its own API key
+    :return: a dictionary holding the search result (a Document of the view COMPLETE) for each EID found
+    """
+    query = utils.generate_scopus_search_from_eid_list(eids)
+    if client is None:
+        search = scopus.ScopusSearch(query, refresh=refresh, view='COMPLETE')
+    else:
+        search = client.search(query, view='COMPLETE', refresh=refresh)
+    return {document.eid: document for document in search.results or []}
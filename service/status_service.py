@@ -1,12 +1,25 @@
 import json
+import os
+import time
+from threading import Condition, Lock
 
 from flask import current_app as app
 
 from model.Status import Status
 
+# the statuses of the running jobs, kept in memory and written to disc in intervals
+_registry = {}
+_lock = Lock()
+# notified on every change of a registered status
+_changed = Condition(_lock)
+
 
 def load_status(project_id):
-    """loads the status from disc"""
+    """loads the status of a running job from memory, otherwise from disc"""
+    with _lock:
+        entry = _registry.get(project_id)
+        if entry is not None:
+            return Status(**entry['status'].__getstate__())
     with app.app_context():
         location = app.config.get("LIBINTEL_DATA_DIR")
     path_to_file = location + '/out/' + project_id + '/status.json'
@@ -17,10 +30,126 @@ def load_status(project_id):
 
 
 def save_status(project_id, status):
-    """saves the status object as json file on disc"""
+    """saves the status object as json file on disc. If the job is registered, the registered status is replaced."""
+    path_to_file = _get_path_to_status(project_id)
+    with _lock:
+        entry = _registry.get(project_id)
+        if entry is not None:
+            entry['status'] = status
+            entry['pending'] = 0
+            entry['saved_at'] = time.monotonic()
+            entry['version'] += 1
+            _changed.notify_all()
+        _write_status(path_to_file, status)
+
+
+def register_status(project_id, status):
+    """
+    keeps the status of a running job in memory, so several threads can update its progress with advance_progress.
+    The status is written to disc after a number of updates or seconds, as set by LIBINTEL_STATUS_SAVE_UPDATES and
+    LIBINTEL_STATUS_SAVE_INTERVAL.
+    :param project_id: the ID of the current project
+    :param status: the status object of the job
+    """
+    with app.app_context():
+        save_updates = app.config.get("LIBINTEL_STATUS_SAVE_UPDATES", 100)
+        save_interval = app.config.get("LIBINTEL_STATUS_SAVE_INTERVAL", 2)
+    path_to_file = _get_path_to_status(project_id)
+    with _lock:
+        _registry[project_id] = {'status': status, 'path': path_to_file, 'pending': 0, 'saved_at': time.monotonic(),
+                                 'save_updates': save_updates, 'save_interval': save_interval,
+                                 'started_at': time.monotonic(), 'start_progress': status.progress, 'failed': 0,
+                                 'version': 0}
+        _write_status(path_to_file, status)
+        _changed.notify_all()
+
+
+def advance_progress(project_id, steps=1, failed=0):
+    """
+    increases the progress of a registered job, the progress does not exceed the total
+    :param project_id: the ID of the current project
+    :param steps: the number of processed items
+    :param failed: the number of items which could not be processed
+    :return: the updated status, None if no job is registered for the project
+    """
+    with _lock:
+        entry = _registry.get(project_id)
+        if entry is None:
+            return None
+        status = entry['status']
+        status.progress = min(status.total, status.progress + steps)
+        entry['failed'] += failed
+        entry['version'] += 1
+        _changed.notify_all()
+        entry['pending'] += 1
+        if entry['pending'] >= entry['save_updates'] or \
+                time.monotonic() - entry['saved_at'] >= entry['save_interval']:
+            _write_status(entry['path'], status)
+            entry['pending'] = 0
+            entry['saved_at'] = time.monotonic()
+        return status
+
+
+def unregister_status(project_id):
+    """writes the status of a registered job to disc and removes it from memory"""
+    with _lock:
+        entry = _registry.pop(project_id, None)
+        if entry is not None:
+            _write_status(entry['path'], entry['status'])
+            _changed.notify_all()
+
+
+def wait_for_registration(project_id, timeout=15):
+    """
+    waits until the status of a job of the project is registered, e.g. while the job is queued
+    :param project_id: the ID of the current project
+    :param timeout: the maximum time in seconds to wait
+    :return: True if a status is registered for the project
+    """
+    with _changed:
+        return _changed.wait_for(lambda: project_id in _registry, timeout=timeout)
+
+
+def wait_for_progress(project_id, version=None, timeout=15):
+    """
+    waits until the registered status of the job changes
+    :param project_id: the ID of the current project
+    :param version: the version of the last progress received, None to return the current progress immediately
+    :param timeout: the maximum time in seconds to wait. After the timeout the unchanged progress is returned
+    :return: a tuple of the progress (see _get_progress) and its version. The progress is None if no job is
+    registered for the project
+    """
+    with _changed:
+        _changed.wait_for(lambda: project_id not in _registry or _registry[project_id]['version'] != version,
+                          timeout=None if version is None else timeout)
+        entry = _registry.get(project_id)
+        if entry is None:
+            return None, None
+        return _get_progress(entry), entry['version']
+
+
+def _get_progress(entry):
+    """returns the status of a registered job together with the number of failed items, the throughput in items per
+    second and the estimated remaining time in seconds"""
+    status = entry['status']
+    progress = status.__getstate__()
+    elapsed = time.monotonic() - entry['started_at']
+    throughput = (status.progress - entry['start_progress']) / elapsed if elapsed > 0 else 0.0
+    progress['failed'] = entry['failed']
+    progress['throughput'] = round(throughput, 2)
+    progress['eta'] = round((status.total - status.progress) / throughput) if throughput > 0 else None
+    return progress
+
+
+def _get_path_to_status(project_id):
     with app.app_context():
         location = app.config.get("LIBINTEL_DATA_DIR")
-    path_to_file = location + '/out/' + project_id + '/status.json'
-    with open(path_to_file, 'w') as json_file:
+    return location + '/out/' + project_id + '/status.json'
+
+
+def _write_status(path_to_file, status):
+    # write to a temporary file first, so readers never see an incomplete file
+    with open(path_to_file + '.tmp', 'w') as json_file:
         json_file.write(json.dumps(status, default=lambda o: o.__getstate__()))
         json_file.close()
+    os.replace(path_to_file + '.tmp', path_to_file)
@@ -0,0 +1,61 @@
+from threading import Lock
+
+from flask import current_app as app
+
+from utilities.UnpaywallSnapshot import UnpaywallSnapshot
+
+_snapshots = {}
+_snapshots_lock = Lock()
+
+
+def is_offline():
+    """returns True if the Unpaywall data are read from the local snapshot index instead of the Unpaywall API"""
+    with app.app_context():
+        return bool(app.config.get("LIBINTEL_UNPAYWALL_OFFLINE", False))
+
+
+def get_snapshot():
+    """
+    returns the local index of the Unpaywall snapshot as configured for the application
+    :return: the snapshot index, None if no location is configured
+    """
+    with app.app_context():
+        path = app.config.get("LIBINTEL_UNPAYWALL_SNAPSHOT")
+        if path is None:
+            location = app.config.get("LIBINTEL_DATA_DIR")
+            if location is None:
+                return None
+            path = location + '/cache/unpaywall_snapshot.sqlite'
+    with _snapshots_lock:
+        if path not in _snapshots:
+            _snapshots[path] = UnpaywallSnapshot(path)
+        return _snapshots[path]
+
+
+def import_snapshot(source, batch_size=10000):
+    """
+    imports an Unpaywall snapshot file (gzipped JSON lines) into the local index
+    :param source: the path to the snapshot file
+    :param batch_size: the number of records written in one transaction
+    :return: the number of records imported
+    """
+    snapshot = get_snapshot()
+    if snapshot is None:
+        raise ValueError('no location for the Unpaywall snapshot index configured')
+
+    def on_progress(imported):
+        app.logger.info('imported {} records from Unpaywall snapshot {}'.format(imported, source))
+
+    with app.app_context():
+        return snapshot.import_snapshot(source, batch_size=batch_size, on_progress=on_progress)
+
+
+def lookup(dois):
+    """
+    looks up DOIs in the local snapshot index
+    :param dois: the list of DOIs
+    :return: a dictionary holding the Unpaywall response for each lower-case DOI, an empty dict for unknown DOIs
+    """
+    snapshot = get_snapshot()
+    found = snapshot.get_many(dois) if snapshot is not None else {}
+    return {doi.lower(): found.get(doi.lower(), {}) for doi in dois}
@@ -0,0 +1,51 @@
+import json
+import pickle
+
+from altmetric.Altmetric import Altmetric, FIELDS
+from benchmarks.altmetric_benchmark import LegacyAltmetric, build_response, bytes_per_record
+from service.elasticsearch_service import PropertyEncoder
+
+
+def test_fields_are_read_from_the_response():
+    altmetric = Altmetric('10.1000/1', response_json=json.loads(build_response(1)))
+    assert altmetric.doi == '10.1000/1'
+    assert altmetric.score == 12.5
+    assert altmetric.readers_count == 42
+    assert altmetric.cited_by_videos_count is None
+    assert not hasattr(altmetric, '__dict__')
+
+
+def test_unknown_doi_has_an_empty_document():
+    altmetric = Altmetric('10.1000/unknown', response_json={})
+    assert altmetric.title is None
+    assert altmetric.score is None
+    assert json.loads(json.dumps(altmetric, cls=PropertyEncoder)) == {}
+
+
+def test_fields_are_read_on_first_access():
+    response = json.loads(build_response(4))
+    altmetric = Altmetric(None, response_json=response)
+    assert altmetric._values is None
+    assert altmetric._response is response
+    assert list(altmetric.__getstate__()) == list(FIELDS)
+    assert altmetric._response is None
+    assert altmetric.score == 12.5
+
+
+def test_document_matches_the_former_class():
+    response = json.loads(build_response(2))
+    legacy = {key.lstrip('_'): value for key, value in LegacyAltmetric(None, response).__getstate__().items()}
+    document = json.loads(json.dumps(Altmetric(None, response_json=response), cls=PropertyEncoder))
+    assert document == legacy
+    assert 'isbns' not in document
+
+
+def test_pickled_record_keeps_its_fields():
+    altmetric = pickle.loads(pickle.dumps(Altmetric(None, response_json=json.loads(build_response(3)))))
+    assert altmetric.score == 12.5
+    assert altmetric.pmid == '30000003'
+
+
+def test_records_use_less_memory():
+    payloads = [build_response(index) for index in range(200)]
+    assert bytes_per_record(Altmetric, payloads) < bytes_per_record(LegacyAltmetric, payloads)
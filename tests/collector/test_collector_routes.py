@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import pytest
+
+from model.Project import Project
+from service import job_service, project_service
+
+
+@pytest.fixture
+def client(flask_app, tmp_path, monkeypatch):
+    from app.collector import collector_blueprint
+    (tmp_path / 'out' / 'project').mkdir(parents=True)
+    (tmp_path / 'out' / 'project' / 'missed_eids_list.txt').write_text('2-s2.0-1\n2-s2.0-2\n')
+    flask_app.register_blueprint(collector_blueprint, url_prefix='/collect')
+    with flask_app.app_context():
+        project_service.save_project(Project(project_id='project', name='Project'))
+    submitted = []
+
+    def submit(project_id, job_type, function, *args):
+        submitted.append(args)
+        return SimpleNamespace(job_id='job')
+
+    monkeypatch.setattr(job_service, 'submit', submit)
+    flask_app.submitted = submitted
+    return flask_app
+
+
+def test_collection_with_max_age(client):
+    response = client.test_client().post('/collect/collect_data/project?mode=missed&max_age=3')
+    assert response.status_code == 202
+    assert response.get_json() == {'job_id': 'job'}
+    eids, _, status, _, _, mode, max_age = client.submitted[0]
+    assert eids == ['2-s2.0-1', '2-s2.0-2']
+    assert status.total == 2
+    assert (mode, max_age) == ('missed', 3)
+
+
+@pytest.mark.parametrize('max_age', ['abc', ''])
+def test_collection_with_invalid_max_age(client, max_age):
+    response = client.test_client().post('/collect/collect_data/project?mode=missed&max_age=' + max_age)
+    assert response.status_code == 400
+    assert client.submitted == []
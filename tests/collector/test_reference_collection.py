@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+from pybliometrics.scopus.exception import Scopus429Error
+
+from model.Project import Project
+from model.Status import Status
+from service import counter_service, data_collector_service, eids_service, status_service
+
+
+class StubAbstract:
+
+    def __init__(self, references):
+        self.references = references
+
+
+class StubClient:
+    """returns the references 'r0' to 'r<n>' for the EID 'e<n>', fails for EIDs ending with 9"""
+    lock = threading.Lock()
+    keys = set()
+
+    def __init__(self, key, throttle=None, timeout=60):
+        self.key = key
+        self.requests = 0
+
+    def abstract_retrieval(self, eid, view=None):
+        with self.lock:
+            self.keys.add(self.key)
+        if eid.endswith('9'):
+            raise ValueError('broken record')
+        if self.key == 'exhausted':
+            raise Scopus429Error('QUOTA_EXCEEDED - Quota Exceeded')
+        return StubAbstract(['r{}'.format(number) for number in range(int(eid[1:]) % 10 + 1)])
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def config():
+    return {'LIBINTEL_REFERENCES_BATCH_SIZE': 5}
+
+
+@pytest.fixture(autouse=True)
+def stub_client(tmp_path, monkeypatch):
+    (tmp_path / 'out' / 'project').mkdir(parents=True)
+    monkeypatch.setattr(data_collector_service, 'ScopusClient', StubClient)
+    StubClient.keys = set()
+
+
+def test_references_are_counted_with_all_keys(app_context):
+    eids = ['e{}'.format(number) for number in range(100)]
+    status = Status('REFERENCES_COLLECTING', total=len(eids))
+    project = Project(project_id='project', name='Project')
+    data_collector_service.collect_references(eids, project, status, ('exhausted', 'key'), app_context, 3)
+    # each of the 90 readable EIDs cites r0, those not ending with 0 also r1, those not ending with 0 or 1 also r2
+    assert counter_service.load_counter('project', 'references_') == [['r0', 90], ['r1', 80], ['r2', 70]]
+    assert set(eids_service.load_eid_list('project', 'missed_')) == {eid for eid in eids if eid.endswith('9')}
+    assert status.progress == 100
+    assert status.status == 'DATA_COLLECTED'
+    assert project.isReferencesCollected
+    assert StubClient.keys == {'exhausted', 'key'}
+
+
+def test_failed_collection_is_unregistered(app_context, monkeypatch):
+    def save_references(*args):
+        raise OSError('disc full')
+
+    monkeypatch.setattr(data_collector_service, '_save_references', save_references)
+    status = Status('REFERENCES_COLLECTING', total=10)
+    project = Project(project_id='project', name='Project', isReferencesCollecting=True)
+    with pytest.raises(OSError):
+        data_collector_service.collect_references(['e{}'.format(number) for number in range(10)], project, status,
+                                                  'key', app_context, 3)
+    assert status_service.wait_for_progress('project') == (None, None)
+    assert status_service.load_status('project').status == 'FAILED'
+    assert not project.isReferencesCollecting
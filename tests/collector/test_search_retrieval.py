@@ -0,0 +1,105 @@
+import json
+from collections import namedtuple
+
+import pytest
+
+from model.ScopusRecord import ScopusRecord
+from model.Project import Project
+from model.Status import Status
+from service import data_collector_service, elasticsearch_service, scopus_service, status_service
+from utilities import utils
+from utilities.Pipeline import StageStatistics
+
+Document = namedtuple('Document', 'eid doi pii pubmed_id title afid affilname affiliation_city affiliation_country '
+                                  'author_names author_ids author_afids coverDate publicationName issn source_id '
+                                  'aggregationType volume issueIdentifier pageRange description authkeywords '
+                                  'citedby_count')
+
+
+def build_document(eid):
+    return Document(eid=eid, doi='10.1000/' + eid, pii=None, pubmed_id='30000001', title='Title', afid='60001;60002',
+                    affilname='First University;Second University', affiliation_city='Berlin',
+                    affiliation_country='Germany;France', author_names='Doe, Jane;Roe, Richard',
+                    author_ids='1001;1002', author_afids='60001-60002;', coverDate='2019-01-01',
+                    publicationName='Journal', issn='12345678', source_id='123', aggregationType='Journal', volume='1',
+                    issueIdentifier='2', pageRange='1-10', description='An abstract',
+                    authkeywords='first | second', citedby_count='12')
+
+
+class StubPipeline:
+
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+def test_split_for_search():
+    eids = ['2-s2.0-{}'.format(85000000000 + number) for number in range(60)]
+    batches = list(scopus_service.split_for_search(eids, max_query_length=2000))
+    assert [len(batch) for batch in batches] == [25, 25, 10]
+    batches = list(scopus_service.split_for_search(eids, max_query_length=200))
+    assert sum(batches, []) == eids
+    assert all(len(utils.generate_scopus_search_from_eid_list(batch)) <= 200 for batch in batches)
+
+
+def test_record_is_stored_with_the_fields_of_an_abstract_retrieval(app_context):
+    record = ScopusRecord(build_document('2-s2.0-85000000001'))
+    document = json.loads(json.dumps(record, cls=elasticsearch_service.PropertyEncoder))
+    assert document['eid'] == '2-s2.0-85000000001'
+    assert document['identifier'] == 85000000001
+    assert document['authkeywords'] == ['first', 'second']
+    assert document['authors'] == [['1001', None, 'Doe', 'Jane', ['60001', '60002']],
+                                   ['1002', None, 'Roe', 'Richard', None]]
+    # the cities cannot be assigned, the search skipped the missing one
+    assert document['affiliation'] == [['60001', 'First University', None, 'Germany'],
+                                       ['60002', 'Second University', None, 'France']]
+    assert document['srctype'] == 'j'
+    assert document['refcount'] is None
+    assert record.citedby_count == 12
+    assert record.aggregationType == 'Journal'
+    assert 'references' in document
+
+
+def test_eids_not_found_are_retrieved_one_by_one(app_context, monkeypatch):
+    searches = []
+    retrieved = []
+
+    def search_documents(eids, refresh=True, client=None):
+        searches.append((eids, client.key))
+        return {eid: build_document(eid) for eid in eids if not eid.endswith('7')}
+
+    class StubAbstract:
+        doi = None
+
+    class StubClient:
+        key = 'key'
+
+        def abstract_retrieval(self, identifier, **kwargs):
+            retrieved.append(identifier)
+            return StubAbstract()
+
+    monkeypatch.setattr(scopus_service, 'search_documents', search_documents)
+    pipeline = StubPipeline()
+    eids = ['2-s2.0-{}'.format(85000000000 + number) for number in range(50)]
+    data_collector_service._fetch_by_search(eids, Project(project_id='project', name='Project'), StubClient(),
+                                            pipeline, None, StageStatistics('fetch'))
+    assert [key for _, key in searches] == ['key', 'key']
+    assert retrieved == [eid for eid in eids if eid.endswith('7')]
+    assert sorted(response.id for response in pipeline.items) == eids
+
+
+def test_failed_collection_is_unregistered(app_context, tmp_path, monkeypatch):
+    def create_bulk_indexer(*args):
+        raise ConnectionError('elasticsearch not reachable')
+
+    (tmp_path / 'out' / 'project').mkdir(parents=True)
+    monkeypatch.setattr(data_collector_service, '_create_bulk_indexer', create_bulk_indexer)
+    status = Status('DATA_COLLECTING', total=1)
+    project = Project(project_id='project', name='Project', isDataCollecting=True)
+    with pytest.raises(ConnectionError):
+        data_collector_service.collect(['2-s2.0-85000000001'], project, status, 'key', app_context)
+    assert status_service.wait_for_progress('project') == (None, None)
+    assert status_service.load_status('project').status == 'FAILED'
+    assert not project.isDataCollecting
@@ -0,0 +1,29 @@
+import pytest
+from flask import Flask
+
+
+@pytest.fixture
+def config(request):
+    """
+    the settings of the test application in addition to LIBINTEL_DATA_DIR. A test module overrides this fixture to
+    configure all of its tests, a single test sets them with @pytest.mark.parametrize('config', [...], indirect=True)
+    """
+    return dict(getattr(request, 'param', {}))
+
+
+@pytest.fixture
+def flask_app(tmp_path, config):
+    """a Flask application keeping its data in the temporary folder of the test"""
+    flask_app = Flask(__name__)
+    flask_app.config['LIBINTEL_DATA_DIR'] = str(tmp_path)
+    flask_app.config.update(config)
+    return flask_app
+
+
+@pytest.fixture
+def app_context(flask_app):
+    """pushes the app context of the test application"""
+    ctx = flask_app.app_context()
+    ctx.push()
+    yield flask_app
+    ctx.pop()
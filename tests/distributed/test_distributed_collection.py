@@ -0,0 +1,134 @@
+import threading
+import time
+import uuid
+
+import pytest
+from pybliometrics.scopus.exception import Scopus429Error
+
+from model.Project import Project
+from model.Status import Status
+from service import distributed_service, eids_service, elasticsearch_service, enrichment_service, journal_service, \
+    dead_letter_service
+
+
+class StubAbstract:
+
+    def __init__(self, eid):
+        self.eid = eid
+        self.doi = None
+        self.title = 'Title'
+
+
+class StubClient:
+    """returns a record for each EID, fails for EIDs ending with 7. The key 'exhausted' has exceeded its quota."""
+    lock = threading.Lock()
+    retrieved = []
+
+    def __init__(self, key, throttle=None, timeout=60):
+        self.key = key
+        self.throttle = throttle
+
+    def abstract_retrieval(self, eid, **kwargs):
+        self.throttle()
+        if self.key == 'exhausted':
+            raise Scopus429Error('QUOTA_EXCEEDED - Quota Exceeded')
+        if eid.endswith('7'):
+            raise ValueError('broken record')
+        time.sleep(0.005)
+        with self.lock:
+            self.retrieved.append((eid, self.key))
+        return StubAbstract(eid)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def config():
+    return {'LIBINTEL_REDIS_URL': 'memory://' + uuid.uuid4().hex,
+            'LIBINTEL_REDIS_POLL_INTERVAL': 0.01,
+            'LIBINTEL_ENRICHMENT_BATCH_SIZE': 10,
+            'LIBINTEL_RETRY_MAX_ATTEMPTS': 1,
+            'LIBINTEL_RESPONSE_CACHE_ENABLED': False}
+
+
+@pytest.fixture
+def indexed(tmp_path, monkeypatch):
+    """replaces the Scopus client, the enrichment and the bulk helper, returns the list of indexed EIDs"""
+    indexed = []
+
+    def streaming_bulk(client, actions, **kwargs):
+        for action in actions:
+            indexed.append(action['_id'])
+            yield True, {'index': {'_id': action['_id']}}
+
+    (tmp_path / 'out' / 'project').mkdir(parents=True)
+    monkeypatch.setattr(distributed_service, 'ScopusClient', StubClient)
+    monkeypatch.setattr(enrichment_service, 'enrich_responses', lambda responses: responses)
+    monkeypatch.setattr(elasticsearch_service.helpers, 'streaming_bulk', streaming_bulk)
+    StubClient.retrieved = []
+    return indexed
+
+
+def test_collection_is_spread_over_several_workers(flask_app, app_context, indexed):
+    stop = threading.Event()
+    # two workers as on two machines, one of them with an exhausted key
+    workers = [threading.Thread(target=distributed_service.run_worker, args=(flask_app, keys, stop, name))
+               for name, keys in [('node1', ('exhausted', 'key1')), ('node2', 'key2')]]
+    for worker in workers:
+        worker.start()
+    eids = ['e{}'.format(number) for number in range(100)]
+    status = Status('DATA_COLLECTING', total=len(eids))
+    project = Project(project_id='project', name='Project')
+    try:
+        distributed_service.collect(eids, project, status, flask_app)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+    readable = [eid for eid in eids if not eid.endswith('7')]
+    assert sorted(set(indexed)) == sorted(readable)
+    assert {key for _, key in StubClient.retrieved} == {'key1', 'key2'}
+    assert journal_service.load_progress('project')[journal_service.INDEXED] == set(readable)
+    missed = {eid for eid in eids if eid.endswith('7')}
+    assert set(eids_service.load_eid_list('project', 'missed_')) == missed
+    assert set(dead_letter_service.load_dead_letters('project')) == missed
+    assert status.progress == 100
+    assert status.status == 'DATA_COLLECTED'
+    assert distributed_service.get_work_queue().depth() == 0
+
+
+def test_collection_fails_without_workers(flask_app, app_context, indexed):
+    flask_app.config['LIBINTEL_REDIS_WORKER_TIMEOUT'] = 0.2
+    eids = ['e{}'.format(number) for number in range(20)]
+    status = Status('DATA_COLLECTING', total=len(eids))
+    project = Project(project_id='project', name='Project')
+    with pytest.raises(RuntimeError):
+        distributed_service.collect(eids, project, status, flask_app)
+    assert status.status == 'FAILED'
+    assert indexed == []
+
+
+def test_failing_batches_are_given_up(flask_app, app_context, indexed, monkeypatch):
+    flask_app.config['LIBINTEL_RETRY_MAX_ATTEMPTS'] = 2
+    flask_app.config['LIBINTEL_RETRY_BASE_DELAY'] = 0.01
+    attempts = []
+
+    def collect_batch(eids, project, client, **kwargs):
+        attempts.append(list(eids))
+        raise ConnectionError('index not reachable')
+
+    monkeypatch.setattr(distributed_service.data_collector_service, 'collect_batch', collect_batch)
+    stop = threading.Event()
+    worker = threading.Thread(target=distributed_service.run_worker, args=(flask_app, 'key1', stop, 'node1'))
+    worker.start()
+    eids = ['e{}'.format(number) for number in range(20)]
+    status = Status('DATA_COLLECTING', total=len(eids))
+    try:
+        distributed_service.collect(eids, Project(project_id='project', name='Project'), status, flask_app)
+    finally:
+        stop.set()
+        worker.join()
+    assert len(attempts) == 4
+    assert set(eids_service.load_eid_list('project', 'missed_')) == set(eids)
+    assert status.status == 'DATA_COLLECTED'
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from service import elasticsearch_service
+
+
+@pytest.fixture
+def bulk_requests(app_context, monkeypatch):
+    """replaces the bulk helper, documents with an ID starting with 'bad' are rejected"""
+    requests = []
+
+    def streaming_bulk(client, actions, **kwargs):
+        requests.append([action['_id'] for action in actions])
+        for action in actions:
+            operation = action.get('_op_type', 'index')
+            if action['_id'].startswith('bad'):
+                yield False, {operation: {'_id': action['_id'], 'status': 400, 'error': 'mapper_parsing_exception'}}
+            else:
+                yield True, {operation: {'_id': action['_id'], 'status': 201}}
+
+    monkeypatch.setattr(elasticsearch_service.helpers, 'streaming_bulk', streaming_bulk)
+    return requests
+
+
+def test_flush_by_document_count(bulk_requests):
+    succeeded = []
+    failed = []
+    indexer = elasticsearch_service.BulkIndexer('project', on_success=succeeded.extend, on_failure=failed.extend,
+                                                max_documents=3, flush_interval=60)
+    for identifier in ['1', '2', 'bad3', '4']:
+        indexer.add_source(identifier, '{}')
+    assert bulk_requests == [['1', '2', 'bad3']]
+    indexer.close()
+    assert bulk_requests == [['1', '2', 'bad3'], ['4']]
+    assert succeeded == ['1', '2', '4']
+    assert failed == [('bad3', 'mapper_parsing_exception')]
+    assert indexer.indexed == 3
+    assert indexer.failed == 1
+
+
+def test_flush_by_size_and_time(bulk_requests):
+    indexer = elasticsearch_service.BulkIndexer('project', max_documents=100, max_bytes=10, flush_interval=0.2)
+    indexer.add_source('1', '{"title": "a long title"}')
+    assert bulk_requests == [['1']]
+    indexer.add_source('2', '{}')
+    time.sleep(0.5)
+    assert bulk_requests == [['1'], ['2']]
+    indexer.close()
+
+
+def test_partial_updates(bulk_requests, monkeypatch):
+    actions = []
+    original = elasticsearch_service.helpers.streaming_bulk
+
+    def streaming_bulk(client, bulk_actions, **kwargs):
+        actions.extend(bulk_actions)
+        return original(client, bulk_actions, **kwargs)
+
+    monkeypatch.setattr(elasticsearch_service.helpers, 'streaming_bulk', streaming_bulk)
+    failed = []
+    with elasticsearch_service.BulkIndexer('project', on_failure=failed.extend, flush_interval=60) as indexer:
+        indexer.update('1', {'scival_data': {'views': '3'}})
+        indexer.update('bad2', {'scival_data': {}}, upsert=False)
+    assert actions[0] == {'_op_type': 'update', '_index': 'project', '_type': 'all_data', '_id': '1',
+                          'doc': {'scival_data': {'views': '3'}}, 'doc_as_upsert': True}
+    assert actions[1]['doc_as_upsert'] is False
+    assert indexer.indexed == 1
+    assert failed == [('bad2', 'mapper_parsing_exception')]
@@ -0,0 +1,35 @@
+import pytest
+
+from service import data_collector_service, elasticsearch_service
+
+
+@pytest.fixture
+def index(app_context, monkeypatch):
+    """replaces the elasticsearch calls by an index held in a set"""
+    documents = {'e1', 'e2', 'e3', 'e4'}
+
+    def scan(client, index=None, **kwargs):
+        for identifier in sorted(documents):
+            yield {'_id': identifier}
+
+    def streaming_bulk(client, actions, **kwargs):
+        for action in actions:
+            assert action['_op_type'] == 'delete'
+            documents.discard(action['_id'])
+            yield True, {'delete': {'_id': action['_id'], 'status': 200}}
+
+    monkeypatch.setattr(elasticsearch_service.es.indices, 'exists', lambda index: True)
+    monkeypatch.setattr(elasticsearch_service.helpers, 'scan', scan)
+    monkeypatch.setattr(elasticsearch_service.helpers, 'streaming_bulk', streaming_bulk)
+    return documents
+
+
+def test_only_new_eids_are_collected(index):
+    new_eids = data_collector_service.prepare_incremental_collection('project', ['e5', 'e1', 'e3', 'e6', 'e4'])
+    assert new_eids == ['e5', 'e6']
+    assert index == {'e1', 'e3', 'e4'}
+
+
+def test_missing_index_collects_all_eids(index, monkeypatch):
+    monkeypatch.setattr(elasticsearch_service.es.indices, 'exists', lambda index: False)
+    assert data_collector_service.prepare_incremental_collection('project', ['e1', 'e2']) == ['e1', 'e2']
@@ -0,0 +1,18 @@
+import json
+
+from benchmarks.encoder_benchmark import LegacyPropertyEncoder, build_record
+from service import elasticsearch_service
+from service.elasticsearch_service import PropertyEncoder
+
+
+def test_output_matches_the_dir_based_encoder(app_context):
+    for index in range(3):
+        record = build_record(index, number_of_authors=index + 1)
+        assert json.dumps(record, cls=PropertyEncoder) == json.dumps(record, cls=LegacyPropertyEncoder)
+
+
+def test_extractors_are_created_once_per_type(app_context):
+    json.dumps(build_record(1), cls=PropertyEncoder)
+    extractor = elasticsearch_service._get_extractor(type(build_record(2).scopus_abstract_retrieval))
+    json.dumps(build_record(3), cls=PropertyEncoder)
+    assert elasticsearch_service._get_extractor(type(build_record(4).scopus_abstract_retrieval)) is extractor
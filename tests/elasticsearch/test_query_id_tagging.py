@@ -0,0 +1,52 @@
+import pytest
+
+from service import elasticsearch_service
+
+
+class StubElasticsearch:
+    """holds the query_id fields of the indexed documents and answers multi-get requests"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.mget_requests = []
+        self.indices = self
+
+    def put_mapping(self, **kwargs):
+        self.mapping = kwargs['body']
+
+    def mget(self, index, doc_type, body, _source, request_timeout):
+        self.mget_requests.append(body['ids'])
+        docs = []
+        for eid in body['ids']:
+            if eid in self.documents:
+                docs.append({'_id': eid, 'found': True, '_source': {'query_id': self.documents[eid]}})
+            else:
+                docs.append({'_id': eid, 'found': False})
+        return {'docs': docs}
+
+
+@pytest.fixture
+def stub_es(app_context, monkeypatch):
+    stub = StubElasticsearch({'1': '', '2': 'q1', '3': 'q1; q2', '4': ['q1', 'q2'], '5': ['q1']})
+    actions = []
+
+    def streaming_bulk(client, bulk_actions, **kwargs):
+        for action in bulk_actions:
+            actions.append(action)
+            yield True, {'update': {'_id': action['_id'], 'status': 200}}
+
+    monkeypatch.setattr(elasticsearch_service, 'es', stub)
+    monkeypatch.setattr(elasticsearch_service.helpers, 'streaming_bulk', streaming_bulk)
+    return stub, actions
+
+
+def test_query_ids_are_set_in_bulk(stub_es):
+    stub, actions = stub_es
+    counts = elasticsearch_service.tag_query_ids('project', {'q1': ['1', '2', '3', '4', '5', 'unknown'],
+                                                             'q2': ['1', '3', '4', '5']}, batch_size=4)
+    assert counts == {'updated': 4, 'unchanged': 1, 'missing': 1, 'failed': 0}
+    assert [len(ids) for ids in stub.mget_requests] == [4, 2]
+    assert stub.mapping == {'properties': {'query_id': {'type': 'keyword'}}}
+    updates = {action['_id']: action['doc']['query_id'] for action in actions}
+    assert updates == {'1': ['q1', 'q2'], '2': ['q1'], '3': ['q1', 'q2'], '5': ['q1', 'q2']}
+    assert all(action['doc_as_upsert'] is False for action in actions)
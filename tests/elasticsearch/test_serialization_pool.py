@@ -0,0 +1,35 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from pybliometrics.scopus import AbstractRetrieval
+
+from altmetric.Altmetric import Altmetric
+from model.AllResponses import AllResponses
+from scival.Scival import Scival
+from service import elasticsearch_service
+from unpaywall.Unpaywall import Unpaywall
+
+
+def build_response():
+    abstract = AbstractRetrieval.__new__(AbstractRetrieval)
+    abstract._json = {'coredata': {'eid': '2-s2.0-1', 'dc:title': 'A title', 'prism:doi': '10.1000/known'}}
+    abstract._head = {}
+    abstract._confevent = {}
+    abstract._ref = {}
+    abstract._view = 'FULL'
+    response = AllResponses('2-s2.0-1', 'test project', 'test')
+    response.scopus_abstract_retrieval = abstract
+    response.unpaywall_response = Unpaywall('10.1000/known', response_json={'results': [{'oa_color': 'gold'}]})
+    response.altmetric_response = Altmetric('10.1000/known', response_json={'doi': '10.1000/known', 'score': 1.5})
+    response.scival_data = Scival([])
+    return response
+
+
+def test_pool_produces_the_same_document(app_context):
+    response = build_response()
+    expected = elasticsearch_service.to_json(response)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        assert elasticsearch_service.serialize_in_pool(pool, response) == expected
+    # the original objects are not changed by sending them to the pool
+    assert response.id == '2-s2.0-1'
+    assert elasticsearch_service.to_json(response) == expected
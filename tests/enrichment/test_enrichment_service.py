@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+
+from model.AllResponses import AllResponses
+from service import enrichment_service
+
+
+class StubAbstract:
+
+    def __init__(self, doi):
+        self.doi = doi
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler):
+        super().__init__(address, handler)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.requests = []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.requests.append(self.path)
+        time.sleep(0.05)
+        if self.path.startswith('/unpaywall/10.1000/known'):
+            self._send(200, {'results': [{'doi': '10.1000/known', 'oa_color': 'gold'}]})
+        elif self.path.startswith('/altmetric/doi/10.1000/known'):
+            self._send(200, {'doi': '10.1000/known', 'score': 12.5})
+        else:
+            self._send(404, {})
+        with server.lock:
+            server.active -= 1
+
+    def _send(self, status, body):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def stub_server():
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def config(stub_server):
+    stub_server.requests.clear()
+    stub_server.max_active = 0
+    base_url = 'http://127.0.0.1:{}'.format(stub_server.server_address[1])
+    return {'LIBINTEL_USER_EMAIL': 'test@example.com',
+            'UNPAYWALL_API_URL': base_url + '/unpaywall',
+            'ALTMETRIC_URL': base_url + '/altmetric',
+            'LIBINTEL_UNPAYWALL_CONCURRENCY': 3,
+            'LIBINTEL_ALTMETRIC_CONCURRENCY': 1}
+
+
+def build_response(eid, doi):
+    response = AllResponses(eid, 'test project', 'test')
+    response.scopus_abstract_retrieval = StubAbstract(doi)
+    return response
+
+
+def test_enrich_responses(app_context):
+    known = build_response('2-s2.0-1', '10.1000/known')
+    unknown = build_response('2-s2.0-2', '10.1000/unknown')
+    without_doi = build_response('2-s2.0-3', None)
+    enrichment_service.enrich_responses([known, unknown, without_doi])
+    assert known.unpaywall_response.oa_color == 'gold'
+    assert known.altmetric_response.score == 12.5
+    assert unknown.unpaywall_response.oa_color is None
+    assert unknown.altmetric_response.score is None
+    assert without_doi.unpaywall_response is None
+    assert without_doi.altmetric_response is None
+
+
+def test_concurrency_is_bounded_per_provider(app_context, stub_server):
+    urls = {}
+    for index in range(12):
+        urls[('unpaywall', str(index))] = app_context.config['UNPAYWALL_API_URL'] + '/10.1000/' + str(index)
+    results = enrichment_service.fetch_all(urls, {'unpaywall': 3})
+    assert len(results) == 12
+    assert all(result == {} for result in results.values())
+    assert 1 < stub_server.max_active <= 3
+
+
+def test_cached_dois_are_not_requested_again(app_context, stub_server, tmp_path):
+    app_context.config['LIBINTEL_RESPONSE_CACHE'] = str(tmp_path / 'responses.sqlite')
+    enrichment_service.enrich_responses([build_response('2-s2.0-1', '10.1000/known'),
+                                         build_response('2-s2.0-2', '10.1000/unknown')])
+    assert len(stub_server.requests) == 4
+    stub_server.requests.clear()
+    known = build_response('2-s2.0-1', '10.1000/known')
+    unknown = build_response('2-s2.0-2', '10.1000/unknown')
+    enrichment_service.enrich_responses([known, unknown])
+    assert stub_server.requests == []
+    assert known.unpaywall_response.oa_color == 'gold'
+    assert known.altmetric_response.score == 12.5
+    assert unknown.altmetric_response.score is None
+
+
+def test_records_sharing_a_doi_are_requested_once(app_context, stub_server):
+    first = build_response('2-s2.0-1', '10.1000/KNOWN')
+    second = build_response('2-s2.0-2', 'https://doi.org/10.1000/known')
+    third = build_response('2-s2.0-3', ' 10.1000/known')
+    enrichment_service.enrich_responses([first, second, third])
+    assert len(stub_server.requests) == 2
+    for response in (first, second, third):
+        assert response.unpaywall_response.oa_color == 'gold'
+        assert response.altmetric_response.score == 12.5
+
+
+def test_concurrent_requests_for_a_doi_are_shared(app_context, stub_server):
+    batches = [[build_response('2-s2.0-{}'.format(index), '10.1000/known')] for index in range(4)]
+
+    def enrich(batch):
+        with app_context.app_context():
+            enrichment_service.enrich_responses(batch)
+
+    threads = [threading.Thread(target=enrich, args=(batch,)) for batch in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(stub_server.requests) == 2
+    assert all(batch[0].altmetric_response.score == 12.5 for batch in batches)
+
+
+def test_normalize_doi():
+    assert enrichment_service.normalize_doi('doi:10.1000/ABC ') == '10.1000/abc'
+    assert enrichment_service.normalize_doi('http://dx.doi.org/10.1000/abc') == '10.1000/abc'
+    assert enrichment_service.normalize_doi(' ') is None
+    assert enrichment_service.normalize_doi(None) is None
@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+
+from model.Project import Project
+from service import job_service, project_service
+
+
+@pytest.fixture
+def config():
+    return {'LIBINTEL_JOB_WORKERS': 1}
+
+
+@pytest.fixture(autouse=True)
+def job_queue(tmp_path, app_context, monkeypatch):
+    (tmp_path / 'out').mkdir()
+    monkeypatch.setattr(job_service, '_queue', None)
+    yield
+    job_service.get_job_queue().shutdown()
+
+
+def test_failed_job_resets_the_project():
+    project_service.save_project(Project(project_id='project', name='Project', isDataCollecting=True))
+    finished = threading.Event()
+
+    def fail():
+        finished.set()
+        raise ValueError('broken')
+
+    job = job_service.submit('project', 'collect_data', fail)
+    finished.wait(5)
+    job_service.get_job_queue().shutdown()
+    assert job_service.load_history('project')[0]['job_id'] == job.job_id
+    assert job_service.load_history('project')[0]['state'] == 'FAILED'
+    assert not project_service.load_project('project').isDataCollecting
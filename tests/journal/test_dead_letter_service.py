@@ -0,0 +1,27 @@
+import requests
+from pybliometrics.scopus.exception import Scopus404Error, Scopus500Error
+
+from service import dead_letter_service
+
+
+def test_classify():
+    response = requests.models.Response()
+    response.status_code = 503
+    assert dead_letter_service.classify(Scopus404Error('not found')) == dead_letter_service.NOT_FOUND
+    assert dead_letter_service.classify(Scopus500Error('error')) == dead_letter_service.SERVER_ERROR
+    assert dead_letter_service.classify(requests.exceptions.HTTPError(response=response)) == \
+        dead_letter_service.SERVER_ERROR
+    assert dead_letter_service.classify(requests.exceptions.ReadTimeout()) == dead_letter_service.TIMEOUT
+    assert dead_letter_service.classify(ValueError()) == dead_letter_service.ERROR
+    assert dead_letter_service.TIMEOUT in dead_letter_service.TRANSIENT
+    assert dead_letter_service.NOT_FOUND not in dead_letter_service.TRANSIENT
+
+
+def test_record_and_load(app_context):
+    dead_letter_service.record('project', 'e1', dead_letter_service.TIMEOUT, 5, 'read timed out')
+    dead_letter_service.record('project', 'e2', dead_letter_service.NOT_FOUND)
+    dead_letters = dead_letter_service.load_dead_letters('project')
+    assert dead_letters['e1'] == {'reason': 'timeout', 'attempts': 5, 'message': 'read timed out'}
+    assert dead_letters['e2']['reason'] == 'not-found'
+    dead_letter_service.reset_dead_letters('project')
+    assert dead_letter_service.load_dead_letters('project') == {}
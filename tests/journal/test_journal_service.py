@@ -0,0 +1,23 @@
+from service import journal_service
+
+
+def test_pending_eids_skip_indexed_records(app_context):
+    eids = ['2-s2.0-1', '2-s2.0-2', '2-s2.0-3', '2-s2.0-4']
+    journal_service.record('project', journal_service.RETRIEVED, eids[:3], sync=False)
+    journal_service.record('project', journal_service.INDEXED, eids[:2])
+    progress = journal_service.load_progress('project')
+    assert progress[journal_service.RETRIEVED] == set(eids[:3])
+    assert journal_service.get_pending_eids('project', eids) == ['2-s2.0-3', '2-s2.0-4']
+
+
+def test_torn_last_line_is_ignored(app_context, tmp_path):
+    journal_service.record('project', journal_service.INDEXED, ['2-s2.0-1'])
+    with open(str(tmp_path / 'out' / 'project' / 'progress_journal.txt'), 'a') as journal_file:
+        journal_file.write('INDEXED 2-s2.0-2')
+    assert journal_service.load_progress('project')[journal_service.INDEXED] == {'2-s2.0-1'}
+
+
+def test_reset_journal(app_context):
+    journal_service.record('project', journal_service.INDEXED, ['2-s2.0-1'])
+    journal_service.reset_journal('project')
+    assert journal_service.get_pending_eids('project', ['2-s2.0-1']) == ['2-s2.0-1']
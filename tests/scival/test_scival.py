@@ -0,0 +1,70 @@
+import csv
+import io
+import time
+
+from scival.Scival import COLUMNS, FIELDS, Scival, parse_row, read_export
+
+
+def build_export(rows=3, footer=True):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([column for column, _, _ in COLUMNS])
+    for index in range(rows):
+        values = {column: 'value' for column, _, _ in COLUMNS}
+        values.update({'EID': '2-s2.0-{}'.format(index), 'Title': 'Title {}'.format(index),
+                       'Scopus Author Ids': '1, 2, 3', 'Institutions': 'University A, University B',
+                       'Scopus Affiliation names': 'A; B', 'Country/Region': 'Germany',
+                       'All Science Journal Classification (ASJC) code': '1700; 2200', 'Views': '-',
+                       'PubMed ID': '-', 'Topic number': 'T.{}'.format(index)})
+        if index == 1:
+            values['Scopus Author Ids'] = '-'
+        writer.writerow([values[column] for column, _, _ in COLUMNS])
+    if footer:
+        writer.writerow([])
+        writer.writerow(['Data source: Scopus'])
+    return output.getvalue()
+
+
+def test_export_is_read_into_documents():
+    documents = [document for chunk in read_export(io.StringIO(build_export()), chunk_size=2) for document in chunk]
+    assert [document['eid'] for document in documents] == ['2-s2.0-0', '2-s2.0-1', '2-s2.0-2']
+    first = documents[0]
+    assert list(first) == list(FIELDS)
+    assert first['title'] == 'Title 0'
+    assert first['scopus_author_ids'] == ['1', '2', '3']
+    assert first['institutions'] == ['University A', 'University B']
+    assert first['scopus_affil_names'] == ['A', 'B']
+    assert first['country'] == ['Germany']
+    assert first['all_science_classification_code'] == ['1700', '2200']
+    assert first['views'] is None
+    assert first['pubmed_id'] is None
+    assert first['topic_number'] == 'T.0'
+    assert documents[1]['scopus_author_ids'] is None
+
+
+def test_chunks_match_the_row_parser():
+    export = build_export()
+    rows = [row for row in csv.DictReader(io.StringIO(export)) if row.get('EID')]
+    documents = [document for chunk in read_export(io.StringIO(export)) for document in chunk]
+    assert documents == [parse_row(row) for row in rows]
+
+
+def test_missing_columns_are_empty():
+    documents = next(read_export(io.StringIO('EID,Title\n2-s2.0-1,-\n')))
+    assert documents[0]['eid'] == '2-s2.0-1'
+    assert documents[0]['title'] is None
+    assert documents[0]['institutions'] is None
+
+
+def test_empty_scival_data():
+    scival = Scival([])
+    assert scival.eid is None
+    assert scival.__getstate__() == dict.fromkeys(FIELDS)
+
+
+def test_large_export_is_read_quickly():
+    export = build_export(rows=30000, footer=False)
+    start = time.time()
+    count = sum(len(chunk) for chunk in read_export(io.StringIO(export)))
+    assert count == 30000
+    assert time.time() - start < 10
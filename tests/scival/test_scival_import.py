@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from app.scival import scival_routes
+from service import elasticsearch_service
+from tests.scival.test_scival import build_export
+
+
+@pytest.fixture
+def bulk_actions(app_context, monkeypatch, tmp_path):
+    """replaces the bulk helper, updates of EIDs ending with 7 are rejected"""
+    requests = []
+
+    def streaming_bulk(client, actions, **kwargs):
+        requests.append(actions)
+        for action in actions:
+            if action['_id'].endswith('7'):
+                yield False, {'update': {'_id': action['_id'], 'status': 400, 'error': 'mapper_parsing_exception'}}
+            else:
+                yield True, {'update': {'_id': action['_id'], 'status': 200}}
+
+    monkeypatch.setattr(elasticsearch_service.helpers, 'streaming_bulk', streaming_bulk)
+    folder = tmp_path / 'out' / 'project'
+    os.makedirs(str(folder))
+    with open(str(folder / 'scival_data.csv'), 'w', encoding='utf-8') as export:
+        export.write(build_export(rows=1200))
+    return requests
+
+
+def test_rows_are_sent_as_bulk_partial_updates(bulk_actions):
+    message = scival_routes._import_scival_data('project')
+    assert message == 'imported 1080 Scival data, 120 failed'
+    assert [len(actions) for actions in bulk_actions] == [500, 500, 200]
+    action = bulk_actions[0][0]
+    assert action['_op_type'] == 'update'
+    assert action['_id'] == '2-s2.0-0'
+    assert action['doc_as_upsert'] is True
+    assert action['doc']['scival_data']['scopus_author_ids'] == ['1', '2', '3']
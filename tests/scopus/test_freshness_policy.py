@@ -0,0 +1,38 @@
+import pytest
+from flask import request
+from werkzeug.exceptions import BadRequest
+
+from service import scopus_service
+
+
+@pytest.fixture
+def config():
+    return {'LIBINTEL_SCOPUS_MAX_AGE': {scopus_service.ABSTRACT: 7, scopus_service.CROSSREF: None},
+            'LIBINTEL_SCOPUS_PROJECT_MAX_AGE': {'live': {scopus_service.ABSTRACT: 0}}}
+
+
+def test_defaults_and_configuration(app_context):
+    assert scopus_service.get_refresh(scopus_service.SEARCH) == 1
+    assert scopus_service.get_refresh(scopus_service.ABSTRACT, 'project') == 7
+    assert scopus_service.get_refresh(scopus_service.CROSSREF, 'project') is False
+
+
+def test_project_settings_and_request_override(app_context):
+    assert scopus_service.get_refresh(scopus_service.ABSTRACT, 'live') is True
+    assert scopus_service.get_refresh(scopus_service.ABSTRACT, 'live', max_age='3') == 3
+    assert scopus_service.get_refresh(scopus_service.SAMPLE, 'project', max_age='0') is True
+
+
+def test_max_age_of_request(app_context):
+    with app_context.test_request_context('/?max_age=3'):
+        assert scopus_service.get_max_age(request.args) == 3
+    with app_context.test_request_context('/'):
+        assert scopus_service.get_max_age(request.args) is None
+
+
+@pytest.mark.parametrize('max_age', ['abc', '', '1.5'])
+def test_invalid_max_age_is_rejected(app_context, max_age):
+    with app_context.test_request_context('/?max_age=' + max_age):
+        with pytest.raises(BadRequest) as error:
+            scopus_service.get_max_age(request.args)
+    assert error.value.code == 400
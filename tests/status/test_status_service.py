@@ -0,0 +1,115 @@
+import json
+import threading
+
+import pytest
+
+from model.Status import Status
+from service import status_service
+
+
+@pytest.fixture
+def config():
+    return {'LIBINTEL_STATUS_SAVE_UPDATES': 50, 'LIBINTEL_STATUS_SAVE_INTERVAL': 60}
+
+
+@pytest.fixture(autouse=True)
+def project_folder(tmp_path):
+    (tmp_path / 'out' / 'project').mkdir(parents=True)
+    yield
+    status_service.unregister_status('project')
+
+
+def read_status_file(data_dir):
+    with open(str(data_dir / 'out' / 'project' / 'status.json')) as json_file:
+        return json.load(json_file)
+
+
+def test_progress_from_several_threads(app_context, tmp_path):
+    status = Status('DATA_COLLECTING', total=1000)
+    status_service.register_status('project', status)
+
+    def work():
+        for _ in range(100):
+            status_service.advance_progress('project')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert status_service.load_status('project').progress == 800
+    # the status is written every 50 updates
+    assert read_status_file(tmp_path)['progress'] == 800
+
+
+def test_status_is_written_in_batches(app_context, tmp_path):
+    status_service.register_status('project', Status('DATA_COLLECTING', total=10))
+    for _ in range(20):
+        status_service.advance_progress('project')
+    assert read_status_file(tmp_path) == {'status': 'DATA_COLLECTING', 'progress': 0, 'total': 10, 'message': ''}
+    assert status_service.load_status('project').progress == 10
+    status_service.unregister_status('project')
+    assert read_status_file(tmp_path)['progress'] == 10
+    assert status_service.advance_progress('project') is None
+
+
+def test_progress_is_pushed_to_waiting_readers(app_context):
+    status_service.register_status('project', Status('DATA_COLLECTING', total=10))
+    progress, version = status_service.wait_for_progress('project')
+    assert progress['progress'] == 0
+    timer = threading.Timer(0.05, lambda: status_service.advance_progress('project', 4, failed=1))
+    timer.start()
+    progress, version = status_service.wait_for_progress('project', version, timeout=5)
+    assert progress['progress'] == 4
+    assert progress['failed'] == 1
+    assert progress['throughput'] > 0
+    assert progress['eta'] is not None
+    status_service.unregister_status('project')
+    assert status_service.wait_for_progress('project', version) == (None, None)
+
+
+def test_progress_stream(flask_app, app_context):
+    from app.status import status_blueprint
+    flask_app.register_blueprint(status_blueprint, url_prefix='/status')
+    status = Status('DATA_COLLECTING', total=2)
+    status_service.register_status('project', status)
+
+    def finish():
+        status_service.advance_progress('project', 2)
+        status.status = 'DATA_COLLECTED'
+        status_service.unregister_status('project')
+
+    threading.Timer(0.1, finish).start()
+    response = flask_app.test_client().get('/status/collection_progress/project/stream')
+    assert response.mimetype == 'text/event-stream'
+    events = response.get_data(as_text=True).strip().split('\n\n')
+    assert json.loads(events[0][len('data: '):])['progress'] == 0
+    assert events[-1].startswith('event: finished')
+    assert json.loads(events[-1].split('data: ')[1])['status'] == 'DATA_COLLECTED'
+
+
+def test_progress_stream_of_queued_job(flask_app, app_context, monkeypatch):
+    from app.status import status_blueprint
+    from service import job_service
+    from utilities.JobQueue import JobQueue
+    flask_app.register_blueprint(status_blueprint, url_prefix='/status')
+    monkeypatch.setattr(job_service, '_queue', JobQueue(workers=1, context=flask_app.app_context))
+    started = threading.Event()
+
+    def collect():
+        started.wait(5)
+        status = Status('DATA_COLLECTING', total=2)
+        status_service.register_status('project', status)
+        status_service.advance_progress('project', 2)
+        status.status = 'DATA_COLLECTED'
+        status_service.unregister_status('project')
+
+    status_service.save_status('project', Status('DATA_COLLECTING', total=2))
+    job_service.submit('project', 'collect_data', collect)
+    threading.Timer(0.1, started.set).start()
+    response = flask_app.test_client().get('/status/collection_progress/project/stream')
+    events = response.get_data(as_text=True).strip().split('\n\n')
+    assert events[0].startswith(':')
+    assert events[-1].startswith('event: finished')
+    assert json.loads(events[-1].split('data: ')[1])['status'] == 'DATA_COLLECTED'
+    job_service.get_job_queue().shutdown()
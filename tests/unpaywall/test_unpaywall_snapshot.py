@@ -0,0 +1,72 @@
+import gzip
+import json
+
+import pytest
+
+from model.AllResponses import AllResponses
+from service import enrichment_service
+from unpaywall.Unpaywall import Unpaywall
+from utilities.UnpaywallSnapshot import UnpaywallSnapshot
+
+RECORDS = [{'doi': '10.1000/Gold', 'title': 'A gold paper', 'is_oa': True, 'oa_status': 'gold', 'journal_is_oa': True,
+            'best_oa_location': {'url': 'https://example.com/gold.pdf', 'license': 'cc-by',
+                                 'evidence': 'open (via page says license)'}},
+           {'doi': '10.1000/closed', 'title': 'A closed paper', 'is_oa': False, 'oa_status': 'closed',
+            'journal_is_oa': False, 'best_oa_location': None}]
+
+
+class StubAbstract:
+
+    def __init__(self, doi):
+        self.doi = doi
+
+
+def write_snapshot(path):
+    with gzip.open(str(path), 'wt', encoding='utf-8') as snapshot:
+        for record in RECORDS:
+            snapshot.write(json.dumps(record) + '\n')
+        snapshot.write('\n')
+
+
+def test_import_and_lookup(tmp_path):
+    source = tmp_path / 'snapshot.jsonl.gz'
+    write_snapshot(source)
+    snapshot = UnpaywallSnapshot(str(tmp_path / 'snapshot.sqlite'))
+    progress = []
+    assert snapshot.import_snapshot(str(source), batch_size=1, on_progress=progress.append) == 2
+    assert progress == [1, 2]
+    gold = snapshot.get('10.1000/GOLD')['results'][0]
+    assert gold['oa_color'] == 'gold'
+    assert gold['free_fulltext_url'] == 'https://example.com/gold.pdf'
+    assert gold['is_free_to_read'] is True
+    assert snapshot.get('10.1000/unknown') == {}
+    assert set(snapshot.get_many(['10.1000/gold', '10.1000/closed', '10.1000/unknown'])) == {'10.1000/gold',
+                                                                                           '10.1000/closed'}
+    statistics = snapshot.statistics()
+    assert statistics['records'] == 2
+    assert statistics['last_import']['source'] == 'snapshot.jsonl.gz'
+    snapshot.close()
+
+
+@pytest.fixture
+def config(tmp_path):
+    # no Unpaywall server configured, a request would fail
+    return {'LIBINTEL_UNPAYWALL_OFFLINE': True,
+            'LIBINTEL_UNPAYWALL_SNAPSHOT': str(tmp_path / 'snapshot.sqlite'),
+            'UNPAYWALL_API_URL': 'http://127.0.0.1:9/unpaywall',
+            'ALTMETRIC_URL': 'http://127.0.0.1:9/altmetric'}
+
+
+def test_offline_mode_reads_the_snapshot(app_context, tmp_path):
+    source = tmp_path / 'snapshot.jsonl.gz'
+    write_snapshot(source)
+    from service import unpaywall_service
+    assert unpaywall_service.import_snapshot(str(source)) == 2
+    unpaywall = Unpaywall('10.1000/gold')
+    assert unpaywall.oa_color == 'gold'
+    assert unpaywall.license == 'cc-by'
+    assert Unpaywall('10.1000/unknown').oa_color is None
+    response = AllResponses('2-s2.0-1', 'test project', 'test')
+    response.scopus_abstract_retrieval = StubAbstract('https://doi.org/10.1000/GOLD')
+    enrichment_service.enrich_responses([response])
+    assert response.unpaywall_response.oa_color == 'gold'
@@ -0,0 +1,76 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utilities.HttpPool import HttpPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        content = json.dumps({'path': self.path}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(base_url):
+    pool = HttpPool(pool_size=2)
+    for index in range(10):
+        assert pool.get('{}/{}'.format(base_url, index)).json() == {'path': '/{}'.format(index)}
+    statistics = pool.statistics()[base_url[len('http://'):]]
+    assert statistics['requests'] == 10
+    assert statistics['connections'] == 1
+    assert statistics['reused'] == 9
+    assert statistics['idle'] == 1
+    assert statistics['pool_size'] == 2
+    pool.close()
+
+
+def test_pool_size_is_set_per_host(base_url):
+    host = base_url[len('http://'):]
+    pool = HttpPool(pool_size=2, host_pool_sizes={host: 4})
+    barrier = threading.Barrier(4)
+
+    def get():
+        barrier.wait()
+        pool.get(base_url)
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    statistics = pool.statistics()[host]
+    assert statistics['pool_size'] == 4
+    assert statistics['requests'] == 4
+    assert statistics['idle'] == statistics['connections'] <= 4
+    pool.close()
+
+
+def test_failed_requests_are_counted():
+    pool = HttpPool(timeout=1)
+    with pytest.raises(requests.ConnectionError):
+        pool.get('http://127.0.0.1:9/unreachable')
+    assert pool.statistics()['127.0.0.1:9']['errors'] == 1
+    pool.close()
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from utilities import JobQueue as job_queue_module
+from utilities.JobQueue import JobQueue
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_jobs_run_in_the_pool_and_keep_their_result():
+    jobs = JobQueue(workers=2)
+    submitted = [jobs.submit('project_{}'.format(number), 'square', lambda x: x * x, number) for number in range(6)]
+    wait_for(lambda: all(job.state == job_queue_module.FINISHED for job in submitted))
+    assert [job.result for job in submitted] == [number * number for number in range(6)]
+    assert jobs.statistics()['finished'] == 6
+    assert jobs.get(submitted[0].job_id) is submitted[0]
+    jobs.shutdown()
+
+
+def test_jobs_of_one_project_do_not_run_at_the_same_time():
+    jobs = JobQueue(workers=4, project_limit=1)
+    lock = threading.Lock()
+    running = {'project': 0, 'other': 0}
+    maximum = {'project': 0, 'other': 0}
+
+    def work(project_id):
+        with lock:
+            running[project_id] += 1
+            maximum[project_id] = max(maximum[project_id], running[project_id])
+        time.sleep(0.05)
+        with lock:
+            running[project_id] -= 1
+
+    submitted = [jobs.submit(project_id, 'work', work, project_id) for project_id in ['project'] * 3 + ['other'] * 3]
+    wait_for(lambda: all(job.state == job_queue_module.FINISHED for job in submitted))
+    assert maximum == {'project': 1, 'other': 1}
+    jobs.shutdown()
+
+
+def test_queued_and_running_jobs_can_be_cancelled():
+    jobs = JobQueue(workers=1)
+    started = threading.Event()
+    stopped = threading.Event()
+
+    def work():
+        job = JobQueue.current_job()
+        job.on_cancel(stopped.set)
+        started.set()
+        stopped.wait(5)
+
+    running = jobs.submit('project', 'work', work)
+    queued = jobs.submit('other', 'work', work)
+    started.wait(5)
+    statistics = jobs.statistics()
+    assert statistics['running'] == 1
+    assert statistics['queued'] == 1
+    assert jobs.cancel(queued.job_id).state == job_queue_module.CANCELLED
+    jobs.cancel(running.job_id)
+    wait_for(lambda: running.state == job_queue_module.CANCELLED)
+    assert jobs.statistics()['cancelled'] == 2
+    assert jobs.cancel('unknown') is None
+    jobs.shutdown()
+
+
+def test_failed_jobs_are_kept_in_the_history():
+    finished = []
+    jobs = JobQueue(workers=1, history_size=2, on_finished=finished.append)
+
+    def fail():
+        raise ValueError('broken')
+
+    submitted = [jobs.submit('project', 'fail', fail) for _ in range(3)]
+    wait_for(lambda: len(finished) == 3)
+    assert submitted[2].state == job_queue_module.FAILED
+    assert submitted[2].error == 'ValueError: broken'
+    assert [job.job_id for job in jobs.jobs('project')] == [job.job_id for job in reversed(submitted[1:])]
+    assert jobs.statistics()['failed'] == 3
+    jobs.shutdown()
+
+
+def test_failed_jobs_are_logged(caplog):
+    finished = []
+    jobs = JobQueue(workers=1, on_finished=finished.append)
+
+    def fail():
+        raise ValueError('broken')
+
+    job = jobs.submit('project', 'fail', fail)
+    wait_for(lambda: finished)
+    record = next(record for record in caplog.records if record.name == job_queue_module.__name__)
+    assert job.job_id in record.getMessage()
+    assert record.exc_info[0] is ValueError
+    jobs.shutdown()
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from utilities.KeyScheduler import KeyScheduler, KeyExhaustedError
+from utilities.TokenBucket import TokenBucket
+
+
+def test_all_items_are_processed_by_all_keys():
+    processed = []
+    lock = threading.Lock()
+
+    def work(item, key_index):
+        time.sleep(0.01)
+        with lock:
+            processed.append((item, key_index))
+
+    scheduler = KeyScheduler(('key_a', 'key_b'), workers_per_key=2)
+    remaining = scheduler.run(list(range(40)), work)
+    assert remaining == []
+    assert sorted(item for item, _ in processed) == list(range(40))
+    assert set(key_index for _, key_index in processed) == {0, 1}
+
+
+def test_exhausted_key_hands_back_remaining_items():
+    processed = []
+    lock = threading.Lock()
+
+    def work(batch, key_index):
+        if key_index == 0:
+            # the first key processes one item of the batch and runs out of quota
+            with lock:
+                processed.append(batch[0])
+            raise KeyExhaustedError(remaining=batch[1:])
+        time.sleep(0.01)
+        with lock:
+            processed.extend(batch)
+
+    scheduler = KeyScheduler(('exhausted', 'healthy'))
+    batches = [[index * 3, index * 3 + 1, index * 3 + 2] for index in range(10)]
+    remaining = scheduler.run(batches, work)
+    assert remaining == []
+    assert sorted(processed) == list(range(30))
+    assert scheduler.retired_keys == [0]
+
+
+def test_items_are_returned_if_all_keys_are_exhausted():
+    def work(item, key_index):
+        raise KeyExhaustedError()
+
+    scheduler = KeyScheduler('only_key')
+    remaining = scheduler.run(['a', 'b', 'c'], work)
+    assert sorted(remaining) == ['a', 'b', 'c']
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.18
+
+
+def test_submitted_items_are_processed_before_the_run_ends():
+    processed = []
+    lock = threading.Lock()
+    scheduler = KeyScheduler(('key_a',), workers_per_key=2, poll_interval=0.01)
+
+    def work(item, key_index):
+        with lock:
+            processed.append(item)
+        if item < 3:
+            # retry the first items once
+            scheduler.submit(item + 100, delay=0.05)
+
+    started = time.monotonic()
+    remaining = scheduler.run(list(range(5)), work)
+    assert remaining == []
+    assert sorted(processed) == [0, 1, 2, 3, 4, 100, 101, 102]
+    assert time.monotonic() - started >= 0.05
+
+
+def test_cancelled_run_returns_the_items_left():
+    processed = []
+    scheduler = KeyScheduler('only_key', poll_interval=0.01)
+
+    def work(item, key_index):
+        processed.append(item)
+        if item == 2:
+            scheduler.cancel()
+
+    remaining = scheduler.run(list(range(10)), work)
+    assert processed == [0, 1, 2]
+    assert remaining == list(range(3, 10))
+
+
+def test_failed_items_are_handed_over():
+    def work(item, key_index):
+        if item % 4 == 0:
+            raise ValueError('broken item')
+
+    errors = []
+    scheduler = KeyScheduler('only_key', poll_interval=0.01)
+    remaining = scheduler.run(list(range(10)), work, on_error=lambda item, exception: errors.append(item))
+    assert remaining == []
+    assert sorted(errors) == [0, 4, 8]
+    assert sorted(KeyScheduler('only_key', poll_interval=0.01).run(list(range(10)), work)) == [0, 4, 8]
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from utilities.Pipeline import Pipeline
+
+
+def test_items_pass_all_stages():
+    results = []
+    lock = threading.Lock()
+
+    def collect(item):
+        with lock:
+            results.append(item)
+
+    pipeline = Pipeline()
+    pipeline.add_stage('double', lambda items: [item * 2 for item in items], workers=2, batch_size=5)
+    pipeline.add_stage('drop_odd_tens', lambda item: None if (item // 10) % 2 else item, workers=3)
+    pipeline.add_stage('collect', collect)
+    pipeline.start()
+    for item in range(50):
+        pipeline.put(item)
+    pipeline.close()
+    assert sorted(results) == [item * 2 for item in range(50) if ((item * 2) // 10) % 2 == 0]
+    statistics = pipeline.statistics()
+    assert [stage['name'] for stage in statistics] == ['double', 'drop_odd_tens', 'collect']
+    assert statistics[0]['processed'] == 50
+    assert statistics[2]['processed'] == len(results)
+
+
+def test_slow_stage_applies_back_pressure():
+    in_flight = []
+    put_count = [0]
+    lock = threading.Lock()
+
+    def slow(item):
+        time.sleep(0.02)
+        with lock:
+            in_flight.append(put_count[0] - item)
+
+    pipeline = Pipeline()
+    pipeline.add_stage('fast', lambda item: item, queue_size=2)
+    pipeline.add_stage('slow', slow, queue_size=2)
+    pipeline.start()
+    for item in range(30):
+        pipeline.put(item)
+        with lock:
+            put_count[0] += 1
+    pipeline.close()
+    # the number of items ahead of the slow stage is bounded by the queue sizes and the workers
+    assert max(in_flight) <= 7
+
+
+def test_errors_are_reported():
+    failed = []
+    pipeline = Pipeline()
+    pipeline.add_stage('fail', lambda item: 1 / item, on_error=lambda batch, exception: failed.extend(batch))
+    pipeline.start()
+    for item in [1, 0, 2]:
+        pipeline.put(item)
+    pipeline.close()
+    assert failed == [0]
+    assert pipeline.statistics()[0]['failed'] == 1
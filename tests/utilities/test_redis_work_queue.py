@@ -0,0 +1,61 @@
+import time
+
+from utilities.InMemoryRedis import InMemoryRedis
+from utilities.RedisRateLimiter import RedisRateLimiter
+from utilities.RedisWorkQueue import RedisWorkQueue
+
+
+def test_items_are_taken_in_order_and_acknowledged():
+    redis = InMemoryRedis()
+    queue = RedisWorkQueue(redis, 'test')
+    for number in range(3):
+        queue.put({'number': number})
+    taken = [queue.take('worker') for _ in range(3)]
+    assert [item['number'] for _, item in taken] == [0, 1, 2]
+    assert queue.take('worker') is None
+    for raw, _ in taken:
+        queue.ack('worker', raw)
+    assert redis.llen('test:processing:worker') == 0
+
+
+def test_items_of_lost_workers_are_put_back():
+    redis = InMemoryRedis()
+    queue = RedisWorkQueue(redis, 'test', heartbeat_ttl=0.05)
+    queue.put({'number': 1})
+    queue.heartbeat('lost')
+    queue.heartbeat('alive')
+    queue.take('lost')
+    assert queue.requeue_orphans() == 0
+    time.sleep(0.1)
+    queue.heartbeat('alive')
+    assert queue.consumers() == ['alive']
+    assert queue.requeue_orphans() == 1
+    assert queue.take('alive')[1] == {'number': 1}
+
+
+def test_delayed_items_are_released_when_due():
+    queue = RedisWorkQueue(InMemoryRedis(), 'test')
+    queue.put({'number': 1}, delay=0.05)
+    assert queue.depth() == 1
+    assert queue.take('worker') is None
+    time.sleep(0.06)
+    assert queue.take('worker')[1] == {'number': 1}
+
+
+def test_rate_limit_is_shared_by_all_limiters_of_a_key():
+    redis = InMemoryRedis()
+    limiters = [RedisRateLimiter(redis, 'test', 'key', rate=5) for _ in range(2)]
+    # wait for the beginning of a window, so all acquisitions fall into two windows
+    time.sleep(1 - time.time() % 1)
+    started = time.time()
+    for number in range(6):
+        limiters[number % 2].acquire()
+    assert int(time.time()) > int(started)
+    assert RedisRateLimiter(redis, 'test', 'other key', rate=5).key_id != limiters[0].key_id
+
+
+def test_retired_key_is_retired_for_all_limiters():
+    redis = InMemoryRedis()
+    RedisRateLimiter(redis, 'test', 'key').retire(60)
+    assert RedisRateLimiter(redis, 'test', 'key').is_retired()
+    assert not RedisRateLimiter(redis, 'test', 'other key').is_retired()
@@ -0,0 +1,59 @@
+import time
+
+from utilities.ResponseCache import ResponseCache
+
+
+def test_cached_responses_are_returned(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache' / 'responses.sqlite'))
+    cache.put_many('unpaywall', {'10.1/a': {'is_oa': True}, '10.1/b': {}})
+    found = cache.get_many('unpaywall', ['10.1/a', '10.1/b', '10.1/c'])
+    assert found == {'10.1/a': {'is_oa': True}, '10.1/b': {}}
+    assert cache.get_many('altmetric', ['10.1/a']) == {}
+    statistics = cache.statistics()
+    assert statistics['hits'] == 1
+    assert statistics['negative_hits'] == 1
+    assert statistics['misses'] == 2
+    assert statistics['size'] == 2
+
+
+def test_expired_responses_are_removed(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'), ttl={'altmetric': 60}, negative_ttl={'altmetric': 0.05})
+    cache.put_many('altmetric', {'10.1/a': {'score': 1}, '10.1/b': {}})
+    time.sleep(0.1)
+    assert cache.get_many('altmetric', ['10.1/a', '10.1/b']) == {'10.1/a': {'score': 1}}
+    assert cache.statistics()['expired'] == 1
+    assert cache.statistics()['size'] == 1
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'), max_entries=2)
+    cache.put_many('unpaywall', {'10.1/a': {'doi': 'a'}})
+    time.sleep(0.01)
+    cache.put_many('unpaywall', {'10.1/b': {'doi': 'b'}})
+    time.sleep(0.01)
+    cache.get_many('unpaywall', ['10.1/a'])
+    time.sleep(0.01)
+    cache.put_many('unpaywall', {'10.1/c': {'doi': 'c'}})
+    assert set(cache.get_many('unpaywall', ['10.1/a', '10.1/b', '10.1/c'])) == {'10.1/a', '10.1/c'}
+    assert cache.statistics()['evicted'] == 1
+
+
+def test_cache_persists_between_instances(tmp_path):
+    path = str(tmp_path / 'responses.sqlite')
+    cache = ResponseCache(path)
+    cache.put_many('unpaywall', {'10.1/a': {'doi': 'a'}})
+    cache.close()
+    assert ResponseCache(path).get_many('unpaywall', ['10.1/a']) == {'10.1/a': {'doi': 'a'}}
+
+
+def test_size_is_kept_without_counting(tmp_path):
+    path = str(tmp_path / 'responses.sqlite')
+    cache = ResponseCache(path, max_entries=3)
+    cache.put_many('unpaywall', {'a': {'x': 1}, 'b': {}})
+    cache.put_many('unpaywall', {'b': {'x': 2}, 'c': {}})
+    assert cache.statistics()['size'] == 3
+    cache.put_many('altmetric', {'a': {}, 'd': {}})
+    assert cache.statistics()['size'] == 3
+    assert cache.statistics()['evicted'] == 2
+    cache.close()
+    assert ResponseCache(path, max_entries=3).statistics()['size'] == 3
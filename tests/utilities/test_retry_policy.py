@@ -0,0 +1,16 @@
+from utilities.RetryPolicy import RetryPolicy
+
+
+def test_only_transient_failures_are_retried():
+    policy = RetryPolicy(['timeout'], max_attempts=3)
+    assert policy.should_retry('timeout', 1)
+    assert policy.should_retry('timeout', 2)
+    assert not policy.should_retry('timeout', 3)
+    assert not policy.should_retry('not-found', 1)
+
+
+def test_delay_grows_exponentially_up_to_the_limit():
+    policy = RetryPolicy(['timeout'], base_delay=1.0, max_delay=10.0)
+    for attempt, limit in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 8.0), (5, 10.0), (10, 10.0)]:
+        delay = policy.delay(attempt)
+        assert limit / 2 <= delay <= limit
@@ -0,0 +1,93 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from pybliometrics.scopus.exception import Scopus429Error
+from pybliometrics.scopus.utils import config
+
+from utilities import ScopusClient as scopus_client_module
+from utilities.ScopusClient import ScopusClient
+
+
+class StubScopusHandler(BaseHTTPRequestHandler):
+    """answers abstract retrievals with the EID and remembers the API key of each request, rejects the key
+    'exhausted'"""
+    requests = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        key = self.headers['X-ELS-APIKey']
+        eid = self.path.split('?')[0].split('/')[-1]
+        with self.lock:
+            self.requests.append((eid, key))
+        if key == 'exhausted':
+            body = {'service-error': {'status': {'statusText': 'QUOTA_EXCEEDED - Quota Exceeded'}}}
+            self.send_response(429)
+        else:
+            body = {'abstracts-retrieval-response': {'coredata': {'eid': eid, 'dc:title': key}}}
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def scopus_server(tmp_path, monkeypatch):
+    had_directories = config.has_section('Directories')
+    if not had_directories:
+        config.add_section('Directories')
+    monkeypatch.setitem(config['Directories'], 'AbstractRetrieval', str(tmp_path))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubScopusHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(scopus_client_module, 'RETRIEVAL_URL',
+                        {'AbstractRetrieval': 'http://127.0.0.1:{}/abstract/'.format(server.server_address[1])})
+    StubScopusHandler.requests = []
+    yield StubScopusHandler.requests
+    server.shutdown()
+    server.server_close()
+    if not had_directories:
+        config.remove_section('Directories')
+
+
+def test_each_client_sends_its_own_key(scopus_server):
+    keys = ['key{}'.format(number) for number in range(4)]
+    titles = {}
+
+    def retrieve(key):
+        client = ScopusClient(key)
+        for number in range(10):
+            eid = '2-s2.0-{}{}'.format(keys.index(key), number)
+            titles[eid] = client.abstract_retrieval(eid, refresh=True).title
+        client.close()
+
+    threads = [threading.Thread(target=retrieve, args=(key,)) for key in keys]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(scopus_server) == 40
+    assert all(key == 'key{}'.format(eid[7]) for eid, key in scopus_server)
+    assert all(title == 'key{}'.format(eid[7]) for eid, title in titles.items())
+
+
+def test_cached_records_are_not_requested_again(scopus_server):
+    throttled = []
+    client = ScopusClient('key', throttle=lambda: throttled.append(1))
+    assert client.abstract_retrieval('2-s2.0-1').eid == '2-s2.0-1'
+    assert client.abstract_retrieval('2-s2.0-1', refresh=False).eid == '2-s2.0-1'
+    assert client.abstract_retrieval('2-s2.0-1', refresh=30).eid == '2-s2.0-1'
+    assert client.requests == 1
+    assert len(throttled) == 1
+    client.abstract_retrieval('2-s2.0-1', refresh=True)
+    assert client.requests == 2
+
+
+def test_errors_are_raised_as_pybliometrics_exceptions(scopus_server):
+    client = ScopusClient('exhausted')
+    with pytest.raises(Scopus429Error, match='QUOTA_EXCEEDED'):
+        client.abstract_retrieval('2-s2.0-1')
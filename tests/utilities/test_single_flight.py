@@ -0,0 +1,25 @@
+from utilities.SingleFlight import SingleFlight
+
+
+def test_keys_in_flight_are_shared():
+    single_flight = SingleFlight()
+    owned, shared = single_flight.claim(['a', 'b'])
+    assert sorted(owned) == ['a', 'b']
+    assert shared == {}
+    owned_again, shared_again = single_flight.claim(['b', 'c'])
+    assert owned_again == ['c']
+    assert list(shared_again) == ['b']
+    assert single_flight.in_flight() == 3
+    single_flight.resolve(owned, {'b': {'score': 1}})
+    assert shared_again['b'].result(timeout=1) == {'score': 1}
+    single_flight.resolve(owned_again, {})
+    assert single_flight.in_flight() == 0
+
+
+def test_resolved_keys_are_claimed_again():
+    single_flight = SingleFlight()
+    owned, _ = single_flight.claim(['a'])
+    single_flight.resolve(owned, {'a': 1})
+    owned, shared = single_flight.claim(['a'])
+    assert owned == ['a']
+    assert shared == {}
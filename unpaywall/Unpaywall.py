@@ -1,6 +1,7 @@
-import requests
 from flask import current_app as app
 
+from service import http_service, unpaywall_service
+
 
 class Unpaywall:
     """A class representing the results of querying the Unpaywall-API for a given DOI."""
@@ -137,16 +138,25 @@ class Unpaywall:
         except AttributeError:
             return None
 
-    def __init__(self, doi):
-        with app.app_context():
-            email = app.config.get("LIBINTEL_USER_EMAIL")
-        self._unpaywall_url = "https://api.unpaywall.org/my/request"
-        self._email = email
-        url = self._unpaywall_url + '/' + doi + "?email=" + self._email
-        r = requests.get(url)
-        print("queryied URL: " + url + " with status code " + str(r.status_code))
-        if r.status_code == 200:
-            self._json = r.json()['results'][0]
-        else:
-            print('no unpaywall data found')
-
+    def __init__(self, doi, response_json=None):
+        """
+        queries the Unpaywall API for the given DOI. If the response has already been retrieved (e.g. by the
+        enrichment service), it can be provided as response_json and no request is sent. An empty dict marks a DOI
+        for which Unpaywall holds no data. In offline mode the data are read from the local snapshot index.
+        """
+        if response_json is None and unpaywall_service.is_offline():
+            response_json = unpaywall_service.lookup([doi])[doi.lower()]
+        if response_json is None:
+            with app.app_context():
+                email = app.config.get("LIBINTEL_USER_EMAIL")
+                self._unpaywall_url = app.config.get("UNPAYWALL_API_URL", "https://api.unpaywall.org/my/request")
+            self._email = email
+            url = self._unpaywall_url + '/' + doi + "?email=" + self._email
+            r = http_service.get(url)
+            print("queryied URL: " + url + " with status code " + str(r.status_code))
+            if r.status_code == 200:
+                response_json = r.json()
+            else:
+                print('no unpaywall data found')
+        if response_json:
+            self._json = response_json['results'][0]
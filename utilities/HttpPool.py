@@ -0,0 +1,83 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpPool:
+    """A requests session shared by all threads, keeping the connections to each host alive in a pool, so consecutive
+    requests to the same host do not open a new TCP and TLS connection each. The number of connections kept per host
+    can be set for individual hosts. Requests without a timeout get the default timeout of the pool."""
+
+    def __init__(self, pool_size=20, host_pool_sizes=None, max_hosts=10, timeout=30, max_retries=0):
+        """
+        :param pool_size: the number of connections kept alive per host
+        :param host_pool_sizes: a dictionary holding the number of connections kept alive for individual hosts
+        :param max_hosts: the number of hosts for which connection pools are kept
+        :param timeout: the default timeout of a request in seconds
+        :param max_retries: the number of retries of failed connections, see requests.adapters.HTTPAdapter
+        """
+        self._timeout = timeout
+        self._session = requests.Session()
+        self._adapters = [HTTPAdapter(pool_connections=max_hosts, pool_maxsize=pool_size, max_retries=max_retries)]
+        self._session.mount('http://', self._adapters[0])
+        self._session.mount('https://', self._adapters[0])
+        for host, size in (host_pool_sizes or {}).items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=max_retries)
+            self._session.mount('http://{}/'.format(host), adapter)
+            self._session.mount('https://{}/'.format(host), adapter)
+            self._adapters.append(adapter)
+        self._requests = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        """sends a GET request, see requests.get"""
+        return self.request('GET', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """sends a request over the pooled connections and counts it for the host, see requests.request"""
+        kwargs.setdefault('timeout', self._timeout)
+        host = urlsplit(url).netloc
+        try:
+            return self._session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._errors[host] = self._errors.get(host, 0) + 1
+            raise
+        finally:
+            with self._lock:
+                self._requests[host] = self._requests.get(host, 0) + 1
+
+    def statistics(self):
+        """
+        returns the usage of the connection pools
+        :return: a dictionary holding for each host the number of requests sent, failed requests, connections opened
+        and requests reusing an open connection, as well as the number of idle connections and the size of the pool
+        """
+        with self._lock:
+            statistics = {host: {'requests': number, 'errors': self._errors.get(host, 0), 'connections': 0,
+                                 'reused': 0, 'idle': 0, 'pool_size': 0}
+                          for host, number in self._requests.items()}
+        for adapter in self._adapters:
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                host = pool.host if pool.port in (None, 80, 443) else '{}:{}'.format(pool.host, pool.port)
+                host_statistics = statistics.setdefault(host, {'requests': 0, 'errors': 0, 'connections': 0,
+                                                               'reused': 0, 'idle': 0, 'pool_size': 0})
+                host_statistics['connections'] += pool.num_connections
+                if pool.pool is not None:
+                    # the queue of a pool is filled with None for the connections not yet opened
+                    host_statistics['idle'] += sum(1 for connection in list(pool.pool.queue) if connection is not None)
+                    host_statistics['pool_size'] += pool.pool.maxsize
+        for host_statistics in statistics.values():
+            host_statistics['reused'] = max(0, host_statistics['requests'] - host_statistics['errors']
+                                            - host_statistics['connections'])
+        return statistics
+
+    def close(self):
+        self._session.close()
@@ -0,0 +1,178 @@
+import threading
+import time
+
+
+class InMemoryRedis:
+    """A thread-safe in-memory stand-in for the Redis client, implementing the commands used by the distributed
+    collection. Values are returned as strings, like a client created with decode_responses=True. It allows to run the
+    distributed workers in threads of one process, e.g. in tests."""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+
+    # keys
+
+    def delete(self, *names):
+        with self._lock:
+            deleted = 0
+            for name in names:
+                if self._get(name) is not None:
+                    deleted += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return deleted
+
+    def exists(self, name):
+        with self._lock:
+            return int(self._get(name) is not None)
+
+    def expire(self, name, seconds):
+        with self._lock:
+            if self._get(name) is None:
+                return False
+            self._expires[name] = time.time() + seconds
+            return True
+
+    def ttl(self, name):
+        with self._lock:
+            if self._get(name) is None:
+                return -2
+            if name not in self._expires:
+                return -1
+            return max(0, int(round(self._expires[name] - time.time())))
+
+    # strings
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._get(name) is not None:
+                return None
+            self._data[name] = str(value)
+            self._expires.pop(name, None)
+            if ex is not None:
+                self._expires[name] = time.time() + ex
+            return True
+
+    def get(self, name):
+        with self._lock:
+            return self._get(name)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            value = int(self._get(name) or 0) + amount
+            self._data[name] = str(value)
+            return value
+
+    # hashes
+
+    def hincrby(self, name, key, amount=1):
+        with self._lock:
+            hash_value = self._get_container(name, dict)
+            value = int(hash_value.get(key, 0)) + amount
+            hash_value[key] = str(value)
+            return value
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._get(name) or {})
+
+    # lists
+
+    def lpush(self, name, *values):
+        with self._lock:
+            items = self._get_container(name, list)
+            for value in values:
+                items.insert(0, str(value))
+            return len(items)
+
+    def rpush(self, name, *values):
+        with self._lock:
+            items = self._get_container(name, list)
+            items.extend(str(value) for value in values)
+            return len(items)
+
+    def rpoplpush(self, source, destination):
+        with self._lock:
+            items = self._get(source)
+            if not items:
+                return None
+            value = items.pop()
+            self._get_container(destination, list).insert(0, value)
+            self._remove_if_empty(source)
+            return value
+
+    def lrem(self, name, count, value):
+        with self._lock:
+            items = self._get(name) or []
+            removed = 0
+            index = 0
+            while index < len(items) and (count == 0 or removed < abs(count)):
+                if items[index] == value:
+                    del items[index]
+                    removed += 1
+                else:
+                    index += 1
+            self._remove_if_empty(name)
+            return removed
+
+    def lrange(self, name, start, end):
+        with self._lock:
+            items = self._get(name) or []
+            end = len(items) if end == -1 else end + 1
+            return list(items[start:end])
+
+    def ltrim(self, name, start, end):
+        with self._lock:
+            items = self._get(name)
+            if items is None:
+                return True
+            end = len(items) if end == -1 else end + 1
+            items[:] = items[start:end]
+            self._remove_if_empty(name)
+            return True
+
+    def llen(self, name):
+        with self._lock:
+            return len(self._get(name) or [])
+
+    # sets
+
+    def sadd(self, name, *values):
+        with self._lock:
+            members = self._get_container(name, set)
+            added = len(set(str(value) for value in values) - members)
+            members.update(str(value) for value in values)
+            return added
+
+    def srem(self, name, *values):
+        with self._lock:
+            members = self._get(name) or set()
+            removed = len(members & set(str(value) for value in values))
+            members.difference_update(str(value) for value in values)
+            self._remove_if_empty(name)
+            return removed
+
+    def smembers(self, name):
+        with self._lock:
+            return set(self._get(name) or set())
+
+    def _get(self, name):
+        expires = self._expires.get(name)
+        if expires is not None and expires <= time.time():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return self._data.get(name)
+
+    def _get_container(self, name, container_type):
+        value = self._get(name)
+        if value is None:
+            value = container_type()
+            self._data[name] = value
+        return value
+
+    def _remove_if_empty(self, name):
+        if name in self._data and not self._data[name]:
+            del self._data[name]
+            self._expires.pop(name, None)
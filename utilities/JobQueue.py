@@ -0,0 +1,277 @@
+import collections
+import itertools
+import logging
+import threading
+import time
+import uuid
+
+QUEUED = 'QUEUED'
+RUNNING = 'RUNNING'
+FINISHED = 'FINISHED'
+FAILED = 'FAILED'
+CANCELLED = 'CANCELLED'
+
+_logger = logging.getLogger(__name__)
+
+_current = threading.local()
+_sequence = itertools.count()
+
+
+class Job:
+    """A unit of work of a project, run by a worker of the job queue"""
+
+    @property
+    def job_id(self):
+        return self._job_id
+
+    @property
+    def project_id(self):
+        return self._project_id
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def result(self):
+        return self._result
+
+    @property
+    def error(self):
+        return self._error
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_requested.is_set()
+
+    def __init__(self, project_id, name, function, args=(), kwargs=None):
+        self._job_id = uuid.uuid4().hex
+        self._project_id = project_id
+        self._name = name
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs or {}
+        self._state = QUEUED
+        self._result = None
+        self._error = None
+        self._submitted_at = time.time()
+        self._sequence = next(_sequence)
+        self._started_at = None
+        self._finished_at = None
+        self._cancel_requested = threading.Event()
+        self._cancel_callbacks = []
+        self._lock = threading.Lock()
+
+    def on_cancel(self, callback):
+        """registers a function called when the job is cancelled while running, e.g. to stop a scheduler. If the
+        cancellation has already been requested, the function is called right away."""
+        with self._lock:
+            if not self._cancel_requested.is_set():
+                self._cancel_callbacks.append(callback)
+                return
+        callback()
+
+    def __getstate__(self):
+        return {'job_id': self._job_id,
+                'project_id': self._project_id,
+                'name': self._name,
+                'state': self._state,
+                'result': self._result if isinstance(self._result, (str, int, float, bool)) else None,
+                'error': self._error,
+                'submitted_at': self._submitted_at,
+                'started_at': self._started_at,
+                'finished_at': self._finished_at,
+                'cancel_requested': self.cancel_requested}
+
+    def _request_cancel(self):
+        with self._lock:
+            self._cancel_requested.set()
+            callbacks = self._cancel_callbacks
+            self._cancel_callbacks = []
+        for callback in callbacks:
+            callback()
+
+    def _run(self):
+        _current.job = self
+        try:
+            self._result = self._function(*self._args, **self._kwargs)
+            # a job function asked to stop returns early, its job is then marked as cancelled
+            self._state = CANCELLED if self.cancel_requested else FINISHED
+        except Exception as exception:
+            _logger.exception('job %s (%s) of project %s failed', self._job_id, self._name, self._project_id)
+            self._error = '{}: {}'.format(type(exception).__name__, exception)
+            self._state = FAILED
+        finally:
+            _current.job = None
+            self._finished_at = time.time()
+
+
+class JobQueue:
+    """A bounded pool of worker threads running the submitted jobs in order of submission. At most project_limit jobs
+    of the same project run at the same time, further jobs of the project wait while jobs of other projects may pass
+    them. Finished jobs are kept in a history of limited size."""
+
+    def __init__(self, workers=4, project_limit=1, history_size=1000, context=None, on_finished=None):
+        """
+        :param workers: the number of worker threads
+        :param project_limit: the maximum number of running jobs per project
+        :param history_size: the number of finished jobs kept
+        :param context: an optional function returning a context manager the jobs run in, e.g. app.app_context
+        :param on_finished: an optional function called with each finished, failed or cancelled job
+        """
+        self._workers = max(1, workers)
+        self._project_limit = max(1, project_limit)
+        self._history_size = history_size
+        self._context = context
+        self._on_finished = on_finished
+        self._queued = collections.deque()
+        self._running = {}
+        self._history = collections.OrderedDict()
+        self._counts = {FINISHED: 0, FAILED: 0, CANCELLED: 0}
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    @staticmethod
+    def current_job():
+        """returns the job run by the current thread, None outside of a job"""
+        return getattr(_current, 'job', None)
+
+    def submit(self, project_id, name, function, *args, **kwargs):
+        """
+        adds a job to the queue
+        :param project_id: the ID of the project the job belongs to
+        :param name: a short name of the job, e.g. 'collect_data'
+        :param function: the function to run, called with the remaining arguments
+        :return: the job
+        """
+        job = Job(project_id, name, function, args, kwargs)
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError('the job queue has been shut down')
+            self._queued.append(job)
+            if len(self._threads) < self._workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._condition.notify_all()
+        return job
+
+    def get(self, job_id):
+        """returns the queued, running or finished job with the given ID, None if it is unknown"""
+        with self._condition:
+            for job in self._queued:
+                if job.job_id == job_id:
+                    return job
+            return self._running.get(job_id) or self._history.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        cancels a job. A queued job is removed from the queue, a running job is asked to stop
+        :param job_id: the ID of the job
+        :return: the job, None if it is unknown
+        """
+        with self._condition:
+            job = self.get(job_id)
+            if job is None:
+                return None
+            state = job.state
+            if state == QUEUED:
+                self._queued.remove(job)
+                job._state = CANCELLED
+                job._finished_at = time.time()
+                self._finish(job)
+        if state == QUEUED:
+            self._notify_finished(job)
+        elif state == RUNNING:
+            job._request_cancel()
+        return job
+
+    def jobs(self, project_id=None):
+        """returns the queued, running and finished jobs, optionally of one project only, the newest first"""
+        with self._condition:
+            jobs = list(self._queued) + list(self._running.values()) + list(self._history.values())
+        if project_id is not None:
+            jobs = [job for job in jobs if job.project_id == project_id]
+        return sorted(jobs, key=lambda job: job._sequence, reverse=True)
+
+    def statistics(self):
+        """returns the queue depth, the number of running jobs and the numbers of finished, failed and cancelled jobs"""
+        with self._condition:
+            queued_per_project = collections.Counter(job.project_id for job in self._queued)
+            running_per_project = collections.Counter(job.project_id for job in self._running.values())
+            statistics = {'workers': self._workers,
+                          'project_limit': self._project_limit,
+                          'queued': len(self._queued),
+                          'running': len(self._running),
+                          'queued_per_project': dict(queued_per_project),
+                          'running_per_project': dict(running_per_project)}
+            statistics.update({state.lower(): number for state, number in self._counts.items()})
+            waiting = [time.time() - job._submitted_at for job in self._queued]
+        statistics['oldest_queued_seconds'] = round(max(waiting), 2) if waiting else 0.0
+        return statistics
+
+    def shutdown(self, cancel_running=False):
+        """stops the workers after their current jobs, queued jobs are cancelled"""
+        with self._condition:
+            self._stopped = True
+            queued = list(self._queued)
+            running = list(self._running.values())
+        for job in queued:
+            self.cancel(job.job_id)
+        if cancel_running:
+            for job in running:
+                job._request_cancel()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._take()
+                while job is None:
+                    if self._stopped:
+                        return
+                    self._condition.wait()
+                    job = self._take()
+                self._running[job.job_id] = job
+                job._state = RUNNING
+                job._started_at = time.time()
+            if self._context is None:
+                job._run()
+            else:
+                with self._context():
+                    job._run()
+            with self._condition:
+                del self._running[job.job_id]
+                self._finish(job)
+                self._condition.notify_all()
+            self._notify_finished(job)
+
+    def _take(self):
+        """removes and returns the first queued job whose project has not reached the limit of running jobs"""
+        running_per_project = collections.Counter(job.project_id for job in self._running.values())
+        for job in self._queued:
+            if running_per_project[job.project_id] < self._project_limit:
+                self._queued.remove(job)
+                return job
+        return None
+
+    def _finish(self, job):
+        self._counts[job.state] += 1
+        self._history[job.job_id] = job
+        while len(self._history) > self._history_size:
+            self._history.popitem(last=False)
+
+    def _notify_finished(self, job):
+        if self._on_finished is not None:
+            try:
+                self._on_finished(job)
+            except Exception as exception:
+                _logger.error('could not record job %s, reason: %r', job.job_id, exception)
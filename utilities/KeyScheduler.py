@@ -0,0 +1,189 @@
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+
+from utilities.TokenBucket import TokenBucket
+
+_logger = logging.getLogger(__name__)
+
+
+class KeyExhaustedError(Exception):
+    """Raised by a work function if its API key cannot be used any longer. The items not yet processed are handed
+    back to the shared queue. If a pause (in seconds) is given, the key is only throttled and takes work again after the
+    pause, otherwise it is retired for the rest of the run."""
+
+    def __init__(self, remaining=None, pause=None, message=''):
+        super().__init__(message)
+        self.remaining = remaining
+        self.pause = pause
+
+
+class KeyScheduler:
+    """Distributes work items over a set of API keys. All workers pull from one shared queue, so the total throughput
+    follows the combined capacity of all keys. Each key has its own token bucket and a configurable number of workers.
+    A key which is exhausted or throttled stops taking work and hands its remaining items back to the queue."""
+
+    @property
+    def keys(self):
+        return self._keys
+
+    @property
+    def processed(self):
+        """the number of items processed with each key, by index of the key"""
+        return dict(self._processed)
+
+    @property
+    def retired_keys(self):
+        """the indices of the keys which have been retired during the run"""
+        return sorted(self._retired)
+
+    def __init__(self, keys, workers_per_key=1, rate=None, poll_interval=0.1):
+        """
+        :param keys: a single API key or a tuple of API keys
+        :param workers_per_key: the number of workers using the same key
+        :param rate: the maximum number of requests per second and key, None for no limit
+        :param poll_interval: the time in seconds an idle worker waits for new work
+        """
+        if not isinstance(keys, (tuple, list)):
+            keys = (keys,)
+        self._keys = tuple(keys)
+        self._workers_per_key = max(1, workers_per_key)
+        self._buckets = [TokenBucket(rate) for _ in self._keys]
+        self._poll_interval = poll_interval
+        self._queue = queue.Queue()
+        self._delayed = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._unfinished = 0
+        self._retired = set()
+        self._paused_until = {}
+        self._processed = {}
+        self._cancelled = False
+
+    def acquire(self, key_index):
+        """blocks until the token bucket of the given key allows another request"""
+        self._buckets[key_index].acquire()
+
+    def run(self, items, work, on_error=None):
+        """
+        processes all items with the given work function and blocks until all items are done or all keys are retired.
+        :param items: the list of work items
+        :param work: a function called with an item and the index of the key to be used for it. It can raise a
+        KeyExhaustedError to hand the item (or its unprocessed part) back to the queue.
+        :param on_error: an optional function called with an item and the exception if the work function fails for
+        another reason. Without it, such items are returned with the remaining ones
+        :return: the list of items which could not be processed because all keys have been retired, the run has been
+        cancelled or, without on_error, the work function failed
+        """
+        with self._lock:
+            for item in items:
+                self._queue.put(item)
+                self._unfinished += 1
+        failed = []
+        if on_error is None:
+            def on_error(failed_item, exception):
+                failed.append(failed_item)
+        threads = []
+        for key_index in range(len(self._keys)):
+            self._processed.setdefault(key_index, 0)
+            for _ in range(self._workers_per_key):
+                thread = threading.Thread(target=self._work_loop, args=(key_index, work, on_error), daemon=True)
+                thread.start()
+                threads.append(thread)
+        for thread in threads:
+            thread.join()
+        remaining = []
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            remaining.extend(item for _, _, item in sorted(self._delayed))
+            self._delayed = []
+            self._unfinished -= len(remaining)
+        return remaining + failed
+
+    def submit(self, item, delay=0):
+        """
+        adds a work item to a running scheduler, e.g. to retry a failed item. The run does not end before the item is
+        processed.
+        :param item: the work item
+        :param delay: the time in seconds before the item is handed to a worker
+        """
+        with self._lock:
+            self._unfinished += 1
+            if delay > 0:
+                heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._sequence), item))
+                return
+        self._queue.put(item)
+
+    def cancel(self):
+        """stops the run after the items currently processed, the items left in the queue are returned by run"""
+        with self._lock:
+            self._cancelled = True
+
+    def queue_depth(self):
+        """returns the number of work items waiting in the shared queue, including the delayed ones"""
+        return self._queue.qsize() + len(self._delayed)
+
+    def key(self, key_index):
+        """returns the API key for the given index"""
+        return self._keys[key_index]
+
+    def _work_loop(self, key_index, work, on_error):
+        while True:
+            with self._lock:
+                if self._cancelled or key_index in self._retired or self._unfinished == 0:
+                    return
+                paused_until = self._paused_until.get(key_index, 0)
+            if paused_until > time.monotonic():
+                time.sleep(min(self._poll_interval, paused_until - time.monotonic()))
+                continue
+            self._release_delayed()
+            try:
+                item = self._queue.get(timeout=self._poll_interval)
+            except queue.Empty:
+                continue
+            try:
+                work(item, key_index)
+            except KeyExhaustedError as error:
+                self._hand_back(item, error)
+                with self._lock:
+                    if error.pause is None:
+                        self._retired.add(key_index)
+                    else:
+                        self._paused_until[key_index] = time.monotonic() + error.pause
+                continue
+            except Exception as exception:
+                _logger.error('could not process work item with key %s, reason: %r', key_index, exception)
+                try:
+                    on_error(item, exception)
+                except Exception as error:
+                    _logger.error('could not hand over failed work item, reason: %r', error)
+                self._finish()
+                continue
+            with self._lock:
+                self._processed[key_index] += 1
+            self._finish()
+
+    def _release_delayed(self):
+        with self._lock:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                self._queue.put(heapq.heappop(self._delayed)[2])
+
+    def _hand_back(self, item, error):
+        if error.remaining is None:
+            self._queue.put(item)
+        elif len(error.remaining) > 0:
+            self._queue.put(error.remaining)
+        else:
+            self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._unfinished -= 1
@@ -0,0 +1,195 @@
+import logging
+import queue
+import threading
+import time
+
+_END = object()
+
+_logger = logging.getLogger(__name__)
+
+
+class StageStatistics:
+    """Thread-safe counters of a processing stage"""
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def workers(self):
+        return self._workers
+
+    @property
+    def processed(self):
+        return self._processed
+
+    @property
+    def failed(self):
+        return self._failed
+
+    @property
+    def throughput(self):
+        """the number of processed items per second since the stage has been started"""
+        elapsed = time.monotonic() - self._started
+        if elapsed <= 0:
+            return 0.0
+        return self._processed / elapsed
+
+    def __init__(self, name, workers=1, queue_depth=None):
+        self._name = name
+        self._workers = workers
+        self._queue_depth = queue_depth
+        self._processed = 0
+        self._failed = 0
+        self._busy = 0.0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, processed=0, failed=0, busy=0.0):
+        with self._lock:
+            self._processed += processed
+            self._failed += failed
+            self._busy += busy
+
+    def __getstate__(self):
+        return {'name': self._name,
+                'workers': self._workers,
+                'queue_depth': self._queue_depth() if self._queue_depth is not None else 0,
+                'processed': self._processed,
+                'failed': self._failed,
+                'throughput': round(self.throughput, 2),
+                'busy_seconds': round(self._busy, 2)}
+
+
+class Stage:
+    """A processing stage with its own worker threads reading from a bounded input queue. The function is called with
+    a single item, or with a list of up to batch_size items if batch_size is larger than one, and returns the output
+    (a list of outputs for batches). Outputs of None are dropped, all others are put into the queue of the next stage.
+    As the queues are bounded, a slow stage blocks the stages in front of it."""
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def statistics(self):
+        return self._statistics
+
+    def __init__(self, name, function, workers=1, queue_size=100, batch_size=1, batch_timeout=1.0, on_error=None):
+        self._name = name
+        self._function = function
+        self._workers = max(1, workers)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._batch_size = max(1, batch_size)
+        self._batch_timeout = batch_timeout
+        self._on_error = on_error
+        self._statistics = StageStatistics(name, self._workers, self._queue.qsize)
+        self._threads = []
+        self._next = None
+
+    def put(self, item):
+        """adds an item to the input queue, blocks while the queue is full"""
+        self._queue.put(item)
+
+    def start(self, next_stage=None, context=None):
+        self._next = next_stage
+        for _ in range(self._workers):
+            thread = threading.Thread(target=self._run, args=(context,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        """lets the workers process the remaining items and waits for them to finish"""
+        for _ in self._threads:
+            self._queue.put(_END)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self, context):
+        if context is None:
+            self._work()
+        else:
+            with context():
+                self._work()
+
+    def _work(self):
+        while True:
+            batch, finished = self._take()
+            if batch:
+                self._process(batch)
+            if finished:
+                return
+
+    def _take(self):
+        item = self._queue.get()
+        if item is _END:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self._batch_timeout
+        while len(batch) < self._batch_size:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _process(self, batch):
+        started = time.monotonic()
+        try:
+            if self._batch_size > 1:
+                outputs = self._function(batch)
+            else:
+                outputs = [self._function(batch[0])]
+        except Exception as exception:
+            self._statistics.add(failed=len(batch), busy=time.monotonic() - started)
+            if self._on_error is not None:
+                self._on_error(batch, exception)
+            else:
+                _logger.error('stage %s: could not process %s items, reason: %r', self._name, len(batch), exception)
+            return
+        self._statistics.add(processed=len(batch), busy=time.monotonic() - started)
+        if self._next is not None:
+            for output in outputs or []:
+                if output is not None:
+                    self._next.put(output)
+
+
+class Pipeline:
+    """A chain of stages connected by bounded queues. Items put into the pipeline pass all stages in order."""
+
+    @property
+    def stages(self):
+        return self._stages
+
+    def __init__(self, context=None):
+        """
+        :param context: an optional function returning a context manager the workers run in, e.g. app.app_context
+        """
+        self._stages = []
+        self._context = context
+
+    def add_stage(self, name, function, workers=1, queue_size=100, batch_size=1, batch_timeout=1.0, on_error=None):
+        stage = Stage(name, function, workers=workers, queue_size=queue_size, batch_size=batch_size,
+                      batch_timeout=batch_timeout, on_error=on_error)
+        self._stages.append(stage)
+        return stage
+
+    def start(self):
+        for index, stage in enumerate(self._stages):
+            next_stage = self._stages[index + 1] if index + 1 < len(self._stages) else None
+            stage.start(next_stage, self._context)
+
+    def put(self, item):
+        """adds an item to the first stage, blocks while the pipeline is saturated"""
+        self._stages[0].put(item)
+
+    def close(self):
+        """waits until all items have passed the pipeline and stops the workers"""
+        for stage in self._stages:
+            stage.close()
+
+    def statistics(self):
+        return [stage.statistics.__getstate__() for stage in self._stages]
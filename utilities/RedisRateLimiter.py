@@ -0,0 +1,59 @@
+import hashlib
+import math
+import time
+
+
+class RedisRateLimiter:
+    """Limits the rate of requests made with an API key by all processes sharing a Redis server. The requests are
+    counted in fixed time windows in Redis; a process exceeding the limit of the current window waits for the next one.
+    An API key can be paused or retired for all processes, e.g. when Scopus reports an exceeded quota. The key itself is
+    not stored in Redis, only a hash of it."""
+
+    @property
+    def key_id(self):
+        return self._key_id
+
+    def __init__(self, redis, name, key, rate=None):
+        """
+        :param redis: the Redis client, created with decode_responses=True
+        :param name: the prefix of the Redis keys of the limiter
+        :param key: the API key
+        :param rate: the maximum number of requests per second, None for no limit
+        """
+        self._redis = redis
+        self._key_id = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        self._prefix = '{}:{}'.format(name, self._key_id)
+        self._rate = rate
+        if rate:
+            self._window = max(1.0, 1.0 / rate)
+            self._capacity = max(1, int(rate * self._window))
+
+    def acquire(self):
+        """blocks until the key may be used for another request"""
+        while True:
+            pause = self._redis.ttl(self._prefix + ':paused')
+            if pause is not None and pause > 0:
+                time.sleep(min(pause, 1))
+                continue
+            if not self._rate:
+                return
+            now = time.time()
+            window = int(now / self._window)
+            counter = '{}:window:{}'.format(self._prefix, window)
+            count = self._redis.incr(counter)
+            if count == 1:
+                self._redis.expire(counter, int(math.ceil(self._window)) + 1)
+            if count <= self._capacity:
+                return
+            time.sleep(max(0.0, (window + 1) * self._window - now))
+
+    def pause(self, seconds):
+        """pauses the key for all processes"""
+        self._redis.set(self._prefix + ':paused', 1, ex=max(1, int(seconds)))
+
+    def retire(self, seconds):
+        """retires the key for all processes for the given number of seconds, e.g. until its quota is reset"""
+        self._redis.set(self._prefix + ':retired', 1, ex=max(1, int(seconds)))
+
+    def is_retired(self):
+        return bool(self._redis.exists(self._prefix + ':retired'))
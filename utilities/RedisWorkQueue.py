@@ -0,0 +1,102 @@
+import json
+import time
+
+
+class RedisWorkQueue:
+    """A work queue in Redis shared by the workers of several processes or machines. Items are JSON-serializable
+    dictionaries. A worker taking an item moves it to its own processing list, where it stays until the worker
+    acknowledges it. Workers send heartbeats; the items of a worker whose heartbeat has expired are put back into the
+    queue, so no item is lost if a worker dies. Items can be put with a delay, e.g. for retries with backoff."""
+
+    def __init__(self, redis, name, heartbeat_ttl=300):
+        """
+        :param redis: the Redis client, created with decode_responses=True
+        :param name: the prefix of the Redis keys of the queue
+        :param heartbeat_ttl: the time in seconds after which a worker without heartbeat is considered dead
+        """
+        self._redis = redis
+        self._name = name
+        self._heartbeat_ttl = heartbeat_ttl
+        self._pending = name + ':pending'
+        self._delayed = name + ':delayed'
+        self._consumers = name + ':consumers'
+
+    def put(self, item, delay=0):
+        """
+        adds an item to the queue
+        :param item: the item, a JSON-serializable dictionary
+        :param delay: the time in seconds before the item can be taken
+        """
+        raw = json.dumps(item)
+        if delay > 0:
+            self._redis.rpush(self._delayed, json.dumps({'due': time.time() + delay, 'item': raw}))
+        else:
+            self._redis.lpush(self._pending, raw)
+
+    def take(self, consumer_id):
+        """
+        moves the oldest item of the queue to the processing list of the consumer
+        :param consumer_id: the ID of the consumer
+        :return: a pair of the raw item, needed to acknowledge it, and the item, or None if the queue is empty
+        """
+        self._release_delayed()
+        raw = self._redis.rpoplpush(self._pending, self._processing(consumer_id))
+        if raw is None:
+            return None
+        return raw, json.loads(raw)
+
+    def ack(self, consumer_id, raw):
+        """removes a processed item from the processing list of the consumer"""
+        self._redis.lrem(self._processing(consumer_id), 1, raw)
+
+    def heartbeat(self, consumer_id):
+        """marks the consumer as alive for the time to live of heartbeats"""
+        self._redis.sadd(self._consumers, consumer_id)
+        self._redis.set(self._heartbeat(consumer_id), time.time(), ex=self._heartbeat_ttl)
+
+    def leave(self, consumer_id):
+        """removes a consumer, the items it has not acknowledged are put back into the queue"""
+        self._requeue(consumer_id)
+        self._redis.delete(self._heartbeat(consumer_id))
+        self._redis.srem(self._consumers, consumer_id)
+
+    def consumers(self):
+        """returns the IDs of the consumers with a valid heartbeat"""
+        return sorted(consumer_id for consumer_id in self._redis.smembers(self._consumers)
+                      if self._redis.exists(self._heartbeat(consumer_id)))
+
+    def requeue_orphans(self):
+        """
+        puts the items of consumers without a valid heartbeat back into the queue
+        :return: the number of items put back
+        """
+        requeued = 0
+        for consumer_id in self._redis.smembers(self._consumers):
+            if not self._redis.exists(self._heartbeat(consumer_id)):
+                requeued += self._requeue(consumer_id)
+                self._redis.srem(self._consumers, consumer_id)
+        return requeued
+
+    def depth(self):
+        """returns the number of items waiting in the queue, including the delayed ones"""
+        return self._redis.llen(self._pending) + self._redis.llen(self._delayed)
+
+    def _requeue(self, consumer_id):
+        requeued = 0
+        while self._redis.rpoplpush(self._processing(consumer_id), self._pending) is not None:
+            requeued += 1
+        return requeued
+
+    def _release_delayed(self):
+        now = time.time()
+        for entry in self._redis.lrange(self._delayed, 0, -1):
+            delayed = json.loads(entry)
+            # only the worker which removes the entry moves it, so it is not released twice
+            if delayed['due'] <= now and self._redis.lrem(self._delayed, 1, entry) == 1:
+                self._redis.rpush(self._pending, delayed['item'])
+
+    def _processing(self, consumer_id):
+        return '{}:processing:{}'.format(self._name, consumer_id)
+
+    def _heartbeat(self, consumer_id):
+        return '{}:heartbeat:{}'.format(self._name, consumer_id)
@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    """A persistent cache for API responses, keyed by provider and identifier (e.g. the DOI) and stored in a SQLite
+    file. Empty responses mark identifiers unknown to the provider (negative results). Each provider has its own time
+    to live for positive and negative results. If the cache holds more than max_entries responses, the least recently
+    used ones are evicted."""
+
+    def __init__(self, path, ttl=None, negative_ttl=None, max_entries=1000000):
+        """
+        :param path: the path to the SQLite file
+        :param ttl: a dictionary holding the time to live in seconds for each provider. Providers without a time to live
+        are cached forever
+        :param negative_ttl: a dictionary holding the time to live in seconds of negative results for each provider. If
+        not given for a provider, the time to live of positive results applies
+        :param max_entries: the maximum number of cached responses
+        """
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._ttl = ttl or {}
+        self._negative_ttl = negative_ttl or {}
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._statistics = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS responses (provider TEXT NOT NULL, identifier TEXT '
+                                     'NOT NULL, payload TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT '
+                                     'NULL, PRIMARY KEY (provider, identifier))')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+            # the number of entries is counted once and then kept up to date, so puts do not scan the table
+            self._size = self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get_many(self, provider, identifiers):
+        """
+        looks up the cached responses of a provider
+        :param provider: the name of the provider
+        :param identifiers: the list of identifiers
+        :return: a dictionary holding the cached, not expired responses. Negative results are returned as empty dict.
+        """
+        identifiers = list(set(identifiers))
+        found = {}
+        expired = []
+        now = time.time()
+        with self._lock:
+            for index in range(0, len(identifiers), 500):
+                chunk = identifiers[index:index + 500]
+                rows = self._connection.execute(
+                    'SELECT identifier, payload, stored_at FROM responses WHERE provider = ? AND identifier IN ({})'
+                    .format(','.join('?' * len(chunk))), [provider] + chunk).fetchall()
+                for identifier, payload, stored_at in rows:
+                    response = json.loads(payload)
+                    if self._is_expired(provider, response, now - stored_at):
+                        expired.append(identifier)
+                    else:
+                        found[identifier] = response
+            with self._connection:
+                self._connection.executemany('UPDATE responses SET accessed_at = ? WHERE provider = ? AND '
+                                             'identifier = ?', [(now, provider, identifier) for identifier in found])
+                deleted = self._connection.executemany('DELETE FROM responses WHERE provider = ? AND identifier = ?',
+                                                       [(provider, identifier) for identifier in expired]).rowcount
+                self._size -= max(0, deleted)
+            negative_hits = sum(1 for response in found.values() if not response)
+            self._statistics['hits'] += len(found) - negative_hits
+            self._statistics['negative_hits'] += negative_hits
+            self._statistics['misses'] += len(identifiers) - len(found)
+            self._statistics['expired'] += len(expired)
+        return found
+
+    def put_many(self, provider, responses):
+        """
+        stores responses of a provider in the cache and evicts the least recently used responses if the cache is full
+        :param provider: the name of the provider
+        :param responses: a dictionary holding the response for each identifier, an empty dict for negative results
+        """
+        if not responses:
+            return
+        now = time.time()
+        identifiers = list(responses)
+        with self._lock, self._connection:
+            present = 0
+            for index in range(0, len(identifiers), 500):
+                chunk = identifiers[index:index + 500]
+                present += self._connection.execute(
+                    'SELECT COUNT(*) FROM responses WHERE provider = ? AND identifier IN ({})'
+                    .format(','.join('?' * len(chunk))), [provider] + chunk).fetchone()[0]
+            self._connection.executemany('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                                         [(provider, identifier, json.dumps(response), now, now)
+                                          for identifier, response in responses.items()])
+            self._size += len(identifiers) - present
+            if self._size > self._max_entries:
+                evicted = self._connection.execute('DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses '
+                                                   'ORDER BY accessed_at LIMIT ?)',
+                                                   (self._size - self._max_entries,)).rowcount
+                self._size -= evicted
+                self._statistics['evicted'] += evicted
+
+    def statistics(self):
+        """returns the numbers of hits, negative hits, misses, expired and evicted entries as well as the hit ratio"""
+        with self._lock:
+            statistics = dict(self._statistics)
+            statistics['size'] = self._size
+        lookups = statistics['hits'] + statistics['negative_hits'] + statistics['misses']
+        statistics['hit_ratio'] = (statistics['hits'] + statistics['negative_hits']) / lookups if lookups else 0.0
+        return statistics
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _is_expired(self, provider, response, age):
+        if response:
+            ttl = self._ttl.get(provider)
+        else:
+            ttl = self._negative_ttl.get(provider, self._ttl.get(provider))
+        return ttl is not None and age > ttl
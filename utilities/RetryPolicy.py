@@ -0,0 +1,33 @@
+import random
+
+
+class RetryPolicy:
+    """Decides whether a failed work item is retried and computes the delay before the next attempt. The delay grows
+    exponentially with the number of attempts up to max_delay and is jittered, so failed items do not hit the API again
+    all at the same time."""
+
+    @property
+    def max_attempts(self):
+        return self._max_attempts
+
+    def __init__(self, transient_reasons, max_attempts=5, base_delay=2.0, max_delay=300.0):
+        """
+        :param transient_reasons: the reason codes of failures worth retrying
+        :param max_attempts: the maximum number of attempts per item, including the first one
+        :param base_delay: the delay in seconds after the first failed attempt
+        :param max_delay: the upper limit of the delay in seconds
+        """
+        self._transient_reasons = set(transient_reasons)
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+
+    def should_retry(self, reason, attempt):
+        """returns True if an item failing for the given reason in the given attempt (starting at 1) is retried"""
+        return reason in self._transient_reasons and attempt < self._max_attempts
+
+    def delay(self, attempt):
+        """returns the delay in seconds before the attempt following the given one, between half and the full
+        exponential delay"""
+        delay = min(self._max_delay, self._base_delay * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+from hashlib import md5
+
+import requests
+from pybliometrics import scopus
+from pybliometrics.scopus import exception
+from pybliometrics.scopus.utils import RETRIEVAL_URL, SEARCH_URL, config, get_folder, user_agent
+
+_ERRORS = {400: exception.Scopus400Error, 401: exception.Scopus401Error, 403: exception.Scopus403Error,
+           404: exception.Scopus404Error, 429: exception.Scopus429Error, 500: exception.Scopus500Error}
+
+
+class ScopusClient:
+    """A client for the Scopus APIs with its own API key, HTTP session and throttle. pybliometrics reads the API key
+    from its global configuration, so threads using different keys would send requests under the wrong key. The client
+    downloads the responses itself, writes them to the pybliometrics cache and lets pybliometrics parse the cached
+    files, so any number of clients can be used in parallel threads. A client and its session should be used by one
+    thread only."""
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def requests(self):
+        """the number of requests sent to Scopus"""
+        return self._requests
+
+    def __init__(self, key, throttle=None, timeout=60, session=None):
+        """
+        :param key: the API key
+        :param throttle: an optional function called before each request, e.g. to acquire a token of the API key
+        :param timeout: the timeout of a request in seconds
+        :param session: an optional requests session, by default the client opens its own
+        """
+        self._key = key
+        self._throttle = throttle
+        self._timeout = timeout
+        self._requests = 0
+        self._session = session or requests.Session()
+        self._session.headers.update({'X-ELS-APIKey': key, 'Accept': 'application/json', 'User-Agent': user_agent})
+        if config.has_option('Authentication', 'InstToken'):
+            self._session.headers['X-ELS-Insttoken'] = config.get('Authentication', 'InstToken')
+        if config.has_section('Proxy'):
+            self._session.proxies.update(dict(config.items('Proxy')))
+
+    def abstract_retrieval(self, identifier, id_type='eid', view='FULL', refresh=False):
+        """
+        retrieves a Scopus record, see pybliometrics.scopus.AbstractRetrieval
+        :param identifier: the identifier of the record
+        :param id_type: the type of the identifier
+        :param view: the view of the record
+        :param refresh: whether to refresh the cached record, or the maximum age of the cached record in days
+        :return: the AbstractRetrieval
+        """
+        path = os.path.join(get_folder('AbstractRetrieval', view), identifier.replace('/', '_'))
+        if _needs_refresh(path, refresh):
+            url = RETRIEVAL_URL['AbstractRetrieval'] + id_type + '/' + identifier
+            _write(path, self._get(url, {'view': view}).content)
+        return scopus.AbstractRetrieval(identifier, id_type=id_type, view=view, refresh=False)
+
+    def search(self, query, view='COMPLETE', refresh=False, count=25):
+        """
+        runs a Scopus search and retrieves all results page by page, see pybliometrics.scopus.ScopusSearch
+        :param query: the search string
+        :param view: the view of the results
+        :param refresh: whether to refresh the cached results, or their maximum age in days
+        :param count: the number of results per request, at most 25 for the view COMPLETE
+        :return: the ScopusSearch
+        """
+        path = os.path.join(get_folder('ScopusSearch', view), md5(query.encode('utf8')).hexdigest())
+        if _needs_refresh(path, refresh):
+            entries = []
+            params = {'query': query, 'view': view, 'count': count, 'cursor': '*'}
+            while True:
+                results = self._get(SEARCH_URL['ScopusSearch'], params).json()['search-results']
+                total = int(results.get('opensearch:totalResults', 0))
+                page = results.get('entry', []) if total > 0 else []
+                entries.extend(page)
+                next_cursor = results.get('cursor', {}).get('@next')
+                if not page or len(entries) >= total or next_cursor is None:
+                    break
+                params['cursor'] = next_cursor
+            _write(path, ''.join('{}\n'.format(json.dumps(entry)) for entry in entries).encode('utf-8'))
+        return scopus.ScopusSearch(query, view=view, refresh=False)
+
+    def close(self):
+        self._session.close()
+
+    def _get(self, url, params):
+        """sends a request with the API key of the client and raises the pybliometrics exceptions on errors"""
+        if self._throttle is not None:
+            self._throttle()
+        self._requests += 1
+        response = self._session.get(url, params=params, timeout=self._timeout)
+        if response.status_code in _ERRORS:
+            try:
+                reason = response.json()['service-error']['status']['statusText']
+            except (ValueError, KeyError, TypeError):
+                try:
+                    reason = response.json()['message']
+                except (ValueError, KeyError, TypeError):
+                    reason = ''
+            raise _ERRORS[response.status_code](reason)
+        response.raise_for_status()
+        return response
+
+
+def _needs_refresh(path, refresh):
+    """decides like pybliometrics whether a cached file is refreshed: always for True, never for False and if it is
+    older than the given number of days otherwise"""
+    try:
+        modified = os.path.getmtime(path)
+    except FileNotFoundError:
+        return True
+    if isinstance(refresh, bool):
+        return refresh
+    return int(refresh) < int((time.time() - modified) / 86400) + 1
+
+
+def _write(path, content):
+    # write to a temporary file first, so other threads never read a partially written response
+    temporary_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+    with open(temporary_path, 'wb') as cache_file:
+        cache_file.write(content)
+    os.replace(temporary_path, path)
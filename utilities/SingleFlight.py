@@ -0,0 +1,49 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesces concurrent requests for the same key. The first caller claiming a key owns its request, later callers
+    claiming the key while the request is in flight get a future resolved with the result of the owner, so each key is
+    requested only once at a time, across all threads of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def claim(self, keys):
+        """
+        claims a list of keys. The caller has to request the keys it owns and pass the results to resolve().
+        :param keys: the keys to request
+        :return: a pair of the list of keys owned by the caller and a dictionary holding the futures of the keys
+        requested by other callers
+        """
+        owned = []
+        shared = {}
+        with self._lock:
+            for key in set(keys):
+                future = self._in_flight.get(key)
+                if future is None:
+                    self._in_flight[key] = Future()
+                    owned.append(key)
+                else:
+                    shared[key] = future
+        return owned, shared
+
+    def resolve(self, keys, results):
+        """
+        hands the results of the owned keys to the waiting callers and releases the keys. Keys missing in the results
+        are resolved with None, so this should be called in a finally block.
+        :param keys: the keys owned by the caller
+        :param results: a dictionary holding the results
+        """
+        with self._lock:
+            futures = [(self._in_flight.pop(key, None), results.get(key)) for key in keys]
+        for future, result in futures:
+            if future is not None:
+                future.set_result(result)
+
+    def in_flight(self):
+        """returns the number of keys currently requested"""
+        with self._lock:
+            return len(self._in_flight)
@@ -0,0 +1,53 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """A thread-safe token bucket limiting the rate of requests. Tokens are refilled continuously with the given rate
+    (tokens per second) up to the capacity of the bucket. A rate of None disables the limit."""
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def __init__(self, rate=None, capacity=None):
+        self._rate = rate
+        if capacity is None:
+            capacity = max(1, rate or 1)
+        self._capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """blocks until the requested number of tokens is available and consumes them"""
+        if self._rate is None:
+            return
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self._rate
+            time.sleep(wait)
+
+    def try_acquire(self, tokens=1):
+        """consumes the requested number of tokens if available without blocking. returns True on success"""
+        if self._rate is None:
+            return True
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
@@ -0,0 +1,124 @@
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class UnpaywallSnapshot:
+    """A local index of an Unpaywall data snapshot, stored in a SQLite file keyed by the lower-case DOI. Each record is
+    reduced to the fields read by the Unpaywall class and stored in the form of a response of the Unpaywall API, so
+    it can be used instead of a request."""
+
+    def __init__(self, path):
+        """
+        :param path: the path to the SQLite file
+        """
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS records (doi TEXT PRIMARY KEY, payload TEXT NOT NULL) '
+                                     'WITHOUT ROWID')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS imports (source TEXT NOT NULL, records INTEGER NOT '
+                                     'NULL, imported_at REAL NOT NULL)')
+
+    def import_snapshot(self, source, batch_size=10000, on_progress=None):
+        """
+        streams a snapshot file into the index. Records already present are replaced.
+        :param source: the path to the snapshot, a JSON lines file, optionally gzipped
+        :param batch_size: the number of records written in one transaction
+        :param on_progress: an optional function called with the number of records imported so far after each batch
+        :return: the number of records imported
+        """
+        opener = gzip.open if source.endswith('.gz') else open
+        imported = 0
+        batch = []
+        with opener(source, 'rt', encoding='utf-8') as snapshot:
+            for line in snapshot:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if not record.get('doi'):
+                    continue
+                batch.append((record['doi'].lower(), json.dumps(convert_record(record), separators=(',', ':'))))
+                if len(batch) >= batch_size:
+                    imported += self._write(batch)
+                    batch = []
+                    if on_progress is not None:
+                        on_progress(imported)
+        if batch:
+            imported += self._write(batch)
+            if on_progress is not None:
+                on_progress(imported)
+        with self._lock, self._connection:
+            self._connection.execute('INSERT INTO imports (source, records, imported_at) VALUES (?, ?, ?)',
+                                     (os.path.basename(source), imported, time.time()))
+        return imported
+
+    def get(self, doi):
+        """returns the record of a DOI in the form of an Unpaywall API response, an empty dict if it is unknown"""
+        return self.get_many([doi]).get(doi.lower(), {})
+
+    def get_many(self, dois):
+        """
+        looks up several DOIs at once
+        :param dois: the list of DOIs
+        :return: a dictionary holding the records of the known DOIs by lower-case DOI
+        """
+        dois = list(set(doi.lower() for doi in dois))
+        found = {}
+        with self._lock:
+            for index in range(0, len(dois), 500):
+                chunk = dois[index:index + 500]
+                rows = self._connection.execute('SELECT doi, payload FROM records WHERE doi IN ({})'
+                                                .format(','.join('?' * len(chunk))), chunk).fetchall()
+                for doi, payload in rows:
+                    found[doi] = {'results': [json.loads(payload)]}
+        return found
+
+    def statistics(self):
+        """returns the number of records and the last import"""
+        with self._lock:
+            records = self._connection.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+            last_import = self._connection.execute('SELECT source, records, imported_at FROM imports ORDER BY '
+                                                   'imported_at DESC LIMIT 1').fetchone()
+        statistics = {'records': records, 'last_import': None}
+        if last_import is not None:
+            statistics['last_import'] = {'source': last_import[0], 'records': last_import[1],
+                                         'imported_at': last_import[2]}
+        return statistics
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _write(self, batch):
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO records (doi, payload) VALUES (?, ?)', batch)
+        return len(batch)
+
+
+def convert_record(record):
+    """
+    converts a record of an Unpaywall snapshot (schema of the API version 2) to the fields of a response of the API
+    version 1 as read by the Unpaywall class
+    :param record: the snapshot record
+    :return: the converted record
+    """
+    best_location = record.get('best_oa_location') or {}
+    return {'doi': record.get('doi'),
+            'doi_resolver': 'crossref',
+            'evidence': best_location.get('evidence'),
+            'free_fulltext_url': best_location.get('url'),
+            'is_boai_license': best_location.get('license') == 'cc-by',
+            'is_free_to_read': record.get('is_oa', False),
+            'is_subscription_journal': not record.get('journal_is_oa', False),
+            'license': best_location.get('license'),
+            'oa_color': record.get('oa_status'),
+            'reported_noncompliant_copies': [],
+            'title': record.get('title')}
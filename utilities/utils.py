@@ -93,7 +93,6 @@ def convert_search_to_altmetric_seach_string(search):
 
 def generate_scopus_search_from_eid_list(eids):
     """constructs a search string for Scopus based to retrieve data for a list of EIDs"""
-    print(eids)
     search_string = 'EID('
     for eid in eids:
         search_string = search_string + eid + ' OR '
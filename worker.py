@@ -0,0 +1,27 @@
+from logging.config import dictConfig
+
+from app import create_app
+from service import distributed_service
+
+dictConfig({
+    'version': 1,
+    'formatters': {'default': {
+        'format': '[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
+    }},
+    'handlers': {'wsgi': {
+        'class': 'logging.StreamHandler',
+        'stream': 'ext://flask.logging.wsgi_errors_stream',
+        'formatter': 'default'
+    }},
+    'root': {
+        'level': 'INFO',
+        'handlers': ['wsgi']
+    }
+})
+
+# a worker of the distributed data collection, pulling batches of EIDs from the shared Redis queue with the API keys
+# given in its own configuration
+app = create_app()
+with app.app_context():
+    keys = app.config.get("LIBINTEL_SCOPUS_KEYS")
+distributed_service.run_worker(app, keys)